@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu'
+
+    def ready(self):
+        from . import live  # noqa: F401 - registra la versión del menú y los avisos del tema WebSocket
+        from . import images  # noqa: F401 - y la generación de variantes de imagen
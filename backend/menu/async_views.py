@@ -0,0 +1,19 @@
+from django.urls import path
+from restaurant.async_views import async_read_view
+from .snapshot import get_cached_menu_snapshot, snapshot_response
+from .views import CategoryViewSet
+
+
+async def _menu_from_memory(request):
+    # Público: no hace falta autenticar para servir el snapshot
+    snapshot = get_cached_menu_snapshot(request)
+    return None if snapshot is None else snapshot_response(snapshot, request)
+
+
+category_list = async_read_view(
+    CategoryViewSet.as_view({'get': 'list', 'post': 'create'}), fast_path=_menu_from_memory
+)
+
+urlpatterns = [
+    path('categories/', category_list),
+]
@@ -0,0 +1,33 @@
+import json
+import time
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from restaurant.metrics import ws_active, ws_connections, ws_messages, ws_send_latency
+from .live import MENU_GROUP, get_live_version
+
+
+class MenuConsumer(AsyncWebsocketConsumer):
+    """Deltas del menú para tablets de camareros y clientes; no requiere sesión"""
+
+    async def connect(self):
+        await self.channel_layer.group_add(MENU_GROUP, self.channel_name)
+        await self.accept()
+        self.accepted = True
+        ws_connections.inc(consumer='MenuConsumer')
+        ws_active.inc(consumer='MenuConsumer')
+        # Versión de partida: los deltas siguientes llevan version + 1, + 2...
+        await self._send_event({'type': 'menu_version', 'version': await database_sync_to_async(get_live_version)()})
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'accepted', False):
+            ws_active.dec(consumer='MenuConsumer')
+        await self.channel_layer.group_discard(MENU_GROUP, self.channel_name)
+
+    async def menu_event(self, event):
+        await self._send_event(event['event'])
+
+    async def _send_event(self, content):
+        start = time.perf_counter()
+        await self.send(text_data=json.dumps(content))
+        ws_send_latency.observe(time.perf_counter() - start, consumer='MenuConsumer')
+        ws_messages.inc(consumer='MenuConsumer')
@@ -0,0 +1,120 @@
+"""
+Variantes redimensionadas de las imágenes del menú.
+
+La subida solo guarda el original; tras el commit, un pool de hilos genera
+cada ancho de VARIANT_WIDTHS en WebP y JPEG. Los nombres llevan el hash del
+contenido, así que una URL nunca cambia de contenido y puede servirse con
+caché inmutable. Al terminar se guarda el mapa en MenuItem.image_variants, se
+invalida el snapshot del menú y se avisa a los sockets del menú para que recarguen.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+from .live import RELOAD, publish_menu_change
+from .models import MenuItem
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (200, 400, 800)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'menu_items/variants'
+
+
+def render_variants(image_file):
+    """Devuelve [(formato, ancho, bytes)] sin ampliar nunca el original"""
+    with Image.open(image_file) as source:
+        source = ImageOps.exif_transpose(source).convert('RGB')
+        widths = sorted({min(width, source.width) for width in VARIANT_WIDTHS})
+        rendered = []
+        for width in widths:
+            height = max(1, round(source.height * width / source.width))
+            resized = source if width == source.width else source.resize((width, height), Image.LANCZOS)
+            for ext, (pil_format, options) in VARIANT_FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                rendered.append((ext, width, buffer.getvalue()))
+        return rendered
+
+
+def store_variants(storage, menu_item_id, rendered):
+    variants = {}
+    for ext, width, content in rendered:
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        name = f'{VARIANTS_DIR}/{menu_item_id}/{digest}-{width}w.{ext}'
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(content))
+        variants.setdefault(ext, {})[str(width)] = name
+    return variants
+
+
+def process_menu_item_image(menu_item_id):
+    """Generar y registrar las variantes de la imagen actual del producto"""
+    item = MenuItem.objects.filter(pk=menu_item_id).only('id', 'image', 'image_variants').first()
+    if item is None:
+        return
+    storage = item.image.storage
+    variants = {}
+    if item.image:
+        with item.image.open('rb') as image_file:
+            variants = store_variants(storage, item.pk, render_variants(image_file))
+
+    # Solo si la imagen no cambió mientras se procesaba; si no, ya hay otra tarea en cola
+    if not MenuItem.objects.filter(pk=item.pk, image=item.image.name).update(image_variants=variants):
+        return
+
+    current = {name for sizes in variants.values() for name in sizes.values()}
+    for sizes in item.image_variants.values():
+        for name in sizes.values():
+            if name not in current:
+                storage.delete(name)
+    publish_menu_change(RELOAD)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                thread_name_prefix='menu-images'
+            )
+        return _executor
+
+
+def _process_in_background(menu_item_id):
+    try:
+        process_menu_item_image(menu_item_id)
+    except Exception:
+        logger.exception('Error generando variantes de imagen del producto %s', menu_item_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(menu_item_id):
+    """Encolar la generación de variantes cuando la transacción actual confirme"""
+    transaction.on_commit(lambda: _get_executor().submit(_process_in_background, menu_item_id))
+
+
+@receiver(post_save, sender=MenuItem)
+def menu_item_saved(sender, instance, **kwargs):
+    # Con la imagen diferida (.only/.defer) el save no la escribió
+    if 'image' not in instance.__dict__:
+        return
+    if instance.image.name != instance._loaded_image:
+        instance._loaded_image = instance.image.name
+        schedule_variants(instance.pk)
@@ -0,0 +1,142 @@
+"""
+Cambios del menú en tiempo real para el tema WebSocket ws/menu/.
+
+Cuando un cambio solo toca campos que el cliente puede parchear
+(disponibilidad, visibilidad y precio de un producto, o el precio extra de
+una elección) se publica un delta compacto:
+
+    {'type': 'menu_delta', 'version': 7,
+     'items': [{'id': 3, 'is_available': False, 'is_visible': True, 'price': '9.50'}],
+     'choices': []}
+
+Cualquier otro cambio (altas, bajas, nombres, categorías, imágenes) publica
+{'type': 'menu_reload', 'version': 8} y el cliente vuelve a pedir el menú.
+
+La versión es la fila MenuVersion (ver snapshot.bump_menu_version): cada
+cambio que se publica la sube una vez dentro de su propia transacción, así que
+es la misma en todos los procesos y sigue el orden de los commits. Si al
+cliente le llega un salto, recarga; si le llega una que ya tiene, la ignora.
+"""
+import logging
+from decimal import Decimal
+from functools import partial
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, MenuItem, CustomizationOption, CustomizationChoice
+from .snapshot import bump_menu_version, get_menu_version, invalidate_menu_snapshot
+
+logger = logging.getLogger(__name__)
+
+MENU_GROUP = 'menu'
+
+# Campos que viajan en los deltas, por modelo
+DELTA_FIELDS = {
+    MenuItem: ('is_available', 'is_visible', 'price'),
+    CustomizationChoice: ('price_extra',),
+}
+# No cambian lo que ve el cliente
+IGNORED_FIELDS = ('created_at', 'updated_at')
+
+RELOAD = {'type': 'menu_reload'}
+
+
+def get_live_version():
+    return get_menu_version()
+
+
+def publish(message, version):
+    """Enviar un mensaje del menú con su versión a todos los sockets"""
+    message = dict(message, version=version)
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            MENU_GROUP, {'type': 'menu_event', 'event': message}
+        )
+    except Exception:
+        # El cambio ya está confirmado; los clientes lo verán al recargar
+        logger.exception('Error publicando un cambio del menú')
+    return message
+
+
+def publish_menu_change(message):
+    """
+    Subir la versión en la transacción actual y, tras el commit, descartar el
+    snapshot de este proceso y publicar el mensaje con esa versión
+    """
+    version = bump_menu_version()
+    transaction.on_commit(invalidate_menu_snapshot)
+    transaction.on_commit(partial(publish, message, version))
+
+
+def item_delta(item):
+    return {
+        'id': item.id,
+        'is_available': item.is_available,
+        'is_visible': item.is_visible,
+        'price': str(item.price),
+    }
+
+
+def choice_delta(choice):
+    return {'id': choice.id, 'option_id': choice.option_id, 'price_extra': str(choice.price_extra)}
+
+
+def _changed_fields(sender, instance, using, update_fields):
+    """Campos que el save va a cambiar respecto a la fila guardada, o None si no existe"""
+    fields = [
+        field for field in instance._meta.concrete_fields
+        if not field.primary_key
+        and field.attname not in IGNORED_FIELDS
+        # save() no escribe los campos diferidos
+        and field.attname in instance.__dict__
+        and (update_fields is None or field.name in update_fields or field.attname in update_fields)
+    ]
+    names = [field.attname for field in fields]
+    stored = sender._base_manager.using(using).filter(pk=instance.pk).values(*names).first()
+    if stored is None:
+        return None
+    changed = set()
+    for name in names:
+        before, value = stored[name], instance.__dict__[name]
+        if isinstance(value, Decimal) or isinstance(before, Decimal):
+            if Decimal(str(before)) != Decimal(str(value)):
+                changed.add(name)
+        elif before != value:
+            changed.add(name)
+    return changed
+
+
+@receiver(pre_save, sender=MenuItem)
+@receiver(pre_save, sender=CustomizationChoice)
+def remember_changes(sender, instance, using, update_fields, **kwargs):
+    # Solo en actualizaciones, y con una consulta por save: los productos
+    # cargados para leer (órdenes, cocina) no pagan nada
+    instance._live_changed = None if instance._state.adding else _changed_fields(
+        sender, instance, using, update_fields
+    )
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=CustomizationChoice)
+def patchable_saved(sender, instance, created, **kwargs):
+    changed = instance.__dict__.pop('_live_changed', None)
+    if created or changed is None or not changed.issubset(DELTA_FIELDS[sender]):
+        publish_menu_change(RELOAD)
+    elif changed:
+        # Los valores se copian ahora: la instancia puede cambiar antes del commit
+        if sender is MenuItem:
+            publish_menu_change({'type': 'menu_delta', 'items': [item_delta(instance)], 'choices': []})
+        else:
+            publish_menu_change({'type': 'menu_delta', 'items': [], 'choices': [choice_delta(instance)]})
+
+
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=CustomizationChoice)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CustomizationOption)
+@receiver(post_delete, sender=CustomizationOption)
+def structure_changed(sender, **kwargs):
+    publish_menu_change(RELOAD)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from menu.images import process_menu_item_image
+from menu.models import MenuItem
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP/JPEG de las imágenes de productos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Solo productos sin variantes')
+
+    def handle(self, *args, **options):
+        items = MenuItem.objects.exclude(image='').exclude(image__isnull=True)
+        if options['missing']:
+            items = items.filter(image_variants={})
+        ids = list(items.values_list('id', flat=True))
+        for menu_item_id in ids:
+            process_menu_item_image(menu_item_id)
+        self.stdout.write(self.style.SUCCESS(f'Variantes generadas para {len(ids)} productos'))
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:42
+
+from django.db import migrations, models
+import menu.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_alter_menuitem_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='menuitem',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Imagen del producto; las versiones WebP/JPEG por tamaño se generan en segundo plano', null=True, upload_to=menu.models.menu_item_image_path),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('menu', 'MenuVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menuitem_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,11 @@
 from django.db import models
-from django_resized import ResizedImageField
 import os
 
 def menu_item_image_path(instance, filename):
-    # Guardar imagen en: media/menu_items/category_id/nombre_archivo
-    ext = filename.split('.')[-1]
-    filename = f"{instance.name.replace(' ', '_')}_{instance.id}.jpg"  # Siempre JPG
+    # Guardar el original en: media/menu_items/category_id/nombre_archivo
+    # (las variantes redimensionadas se generan aparte, ver menu/images.py)
+    ext = filename.split('.')[-1].lower()
+    filename = f"{instance.name.replace(' ', '_')}_{instance.id}.{ext}"
     return os.path.join('menu_items', str(instance.category.id), filename)
 
 class Category(models.Model):
@@ -29,15 +29,14 @@ class MenuItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='menu_items')
-    image = ResizedImageField(
+    image = models.ImageField(
         upload_to=menu_item_image_path,
-        size=[800, 600],  # Tamaño máximo
-        quality=85,       # Calidad comprimida
-        force_format='JPEG',  # Formato JPG
         blank=True, 
         null=True,
-        help_text="Imagen del producto (recomendado: 800x600px, formato JPG)"
+        help_text="Imagen del producto; las versiones WebP/JPEG por tamaño se generan en segundo plano"
     )
+    # {'webp': {'200': ruta, ...}, 'jpeg': {...}}, rellenado por menu.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     preparation_time = models.IntegerField(help_text="Tiempo en minutos", default=15)
     is_available = models.BooleanField(default=True)
     is_visible = models.BooleanField(default=True)
@@ -45,6 +44,11 @@ class MenuItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Imagen con la que se cargó, para regenerar variantes solo si cambia
+        self._loaded_image = self.__dict__.get('image')
+
     class Meta:
         ordering = ['category__display_order', 'name']
 
@@ -66,4 +70,12 @@ class CustomizationChoice(models.Model):
     price_extra = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
 
     def __str__(self):
-        return f"{self.option.name} - {self.name} (+${self.price_extra})"
\ No newline at end of file
+        return f"{self.option.name} - {self.name} (+${self.price_extra})"
+
+
+class MenuVersion(models.Model):
+    """Versión del menú compartida por todos los procesos; una sola fila"""
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Versión del menú: {self.value}"
@@ -19,26 +19,49 @@ class MenuItemSerializer(serializers.ModelSerializer):
     customization_options = CustomizationOptionSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
     image_thumbnail = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuItem
         fields = [
             'id', 'name', 'description', 'price', 'category', 'category_name',
-            'image', 'image_url', 'image_thumbnail', 'preparation_time', 
+            'image', 'image_url', 'image_thumbnail', 'image_srcset', 'preparation_time', 
             'is_available', 'is_visible', 'allergens', 'customization_options', 
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['image_url', 'image_thumbnail']
+        read_only_fields = ['image_url', 'image_thumbnail', 'image_srcset']
 
     def get_image_url(self, obj):
-        if obj.image:
-            return self.context['request'].build_absolute_uri(obj.image.url)
-        return None
+        # Variante JPEG más grande; el original solo mientras no hay variantes
+        return self._variant_url(obj, 'jpeg', None)
 
     def get_image_thumbnail(self, obj):
-        if obj.image:
-            return self.context['request'].build_absolute_uri(obj.image.url)
-        return None
+        return self._variant_url(obj, 'jpeg', 400)
+
+    def get_image_srcset(self, obj):
+        """{'webp': 'url 200w, url 400w, ...', 'jpeg': ...} para <picture>/srcset"""
+        request = self.context['request']
+        return {
+            ext: ', '.join(
+                f'{request.build_absolute_uri(obj.image.storage.url(name))} {width}w'
+                for width, name in sorted(sizes.items(), key=lambda pair: int(pair[0]))
+            )
+            for ext, sizes in obj.image_variants.items()
+        }
+
+    def _variant_url(self, obj, ext, width):
+        # La variante más pequeña de al menos width, o la mayor disponible
+        if not obj.image:
+            return None
+        sizes = sorted(
+            (int(size), name) for size, name in obj.image_variants.get(ext, {}).items()
+        )
+        if sizes:
+            name = next((name for size, name in sizes if width and size >= width), sizes[-1][1])
+            url = obj.image.storage.url(name)
+        else:
+            url = obj.image.url
+        return self.context['request'].build_absolute_uri(url)
 
 class CategorySerializer(serializers.ModelSerializer):
     menu_items = MenuItemSerializer(many=True, read_only=True)
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from .models import Category, MenuVersion
+from .serializers import CategorySerializer
+
+# Snapshot del menú público ya serializado y renderizado, en memoria del proceso.
+# Cada cambio del menú sube la fila MenuVersion en su misma transacción (las
+# señales están en live.py, que publica el cambio con esa versión); antes
+# de servir un snapshot el proceso comprueba esa versión compartida como mucho
+# cada VERSION_CHECK_INTERVAL segundos, así que un cambio hecho en otro worker
+# se ve a lo sumo con ese retraso.
+VERSION_CHECK_INTERVAL = 2
+
+_lock = threading.Lock()
+_version = None  # versión compartida de los snapshots guardados
+_checked_at = 0.0
+_snapshots = {}
+
+
+class MenuSnapshot:
+    def __init__(self, version, content):
+        self.version = version
+        self.content = content
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def get_menu_version():
+    """Versión del menú confirmada en la base de datos"""
+    return MenuVersion.objects.using(DEFAULT_DB_ALIAS).filter(pk=1).values_list(
+        'value', flat=True
+    ).first() or 0
+
+
+def bump_menu_version():
+    """
+    Subir la versión dentro de la transacción actual y devolverla. La fila
+    queda bloqueada hasta el commit, así que las versiones siguen el orden
+    en que se confirman los cambios.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        version, _ = MenuVersion.objects.select_for_update().get_or_create(pk=1)
+        version.value += 1
+        version.save(update_fields=['value'])
+    return version.value
+
+
+def invalidate_menu_snapshot():
+    """Descartar los snapshots de este proceso; la siguiente lectura comprueba la versión"""
+    global _checked_at
+    with _lock:
+        _snapshots.clear()
+        _checked_at = 0.0
+
+
+def _check_version():
+    global _version, _checked_at
+    checked_at = time.monotonic()
+    version = get_menu_version()
+    with _lock:
+        if version != _version:
+            _snapshots.clear()
+            _version = version
+        _checked_at = checked_at
+
+
+def get_menu_queryset():
+    # Siempre desde la principal: un snapshot leído de una réplica atrasada
+    # quedaría cacheado hasta el siguiente cambio del menú
+    return Category.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).prefetch_related(
+        'menu_items__category',
+        'menu_items__customization_options__choices'
+    )
+
+
+def get_cached_menu_snapshot(request):
+    """
+    Snapshot ya construido para el host de la petición, sin tocar la base de
+    datos: None si no lo hay o si toca comprobar la versión compartida
+    """
+    if time.monotonic() - _checked_at >= VERSION_CHECK_INTERVAL:
+        return None
+    # Las URLs de imagen son absolutas, así que hay un snapshot por host
+    return _snapshots.get(request.build_absolute_uri('/'))
+
+
+def get_menu_snapshot(request):
+    snapshot = get_cached_menu_snapshot(request)
+    if snapshot is not None:
+        return snapshot
+    base_url = request.build_absolute_uri('/')
+    _check_version()
+    snapshot = _snapshots.get(base_url)
+    if snapshot is not None:
+        return snapshot
+
+    version = _version
+    data = CategorySerializer(get_menu_queryset(), many=True, context={'request': request}).data
+    snapshot = MenuSnapshot(version, JSONRenderer().render(data))
+    with _lock:
+        # Si el menú cambió mientras se construía, no guardar un snapshot obsoleto
+        if version == _version:
+            _snapshots[base_url] = snapshot
+    return snapshot
+
+
+def snapshot_response(snapshot, request):
+    """Respuesta con ETag; 304 si el cliente ya tiene esta versión"""
+    if snapshot.etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(snapshot.content, content_type='application/json')
+    response['ETag'] = snapshot.etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
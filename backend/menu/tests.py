@@ -1,3 +1,190 @@
-from django.test import TestCase
+import io
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from .consumers import MenuConsumer
+from .models import Category, MenuItem, CustomizationOption, CustomizationChoice, MenuVersion
+from .snapshot import bump_menu_version, get_cached_menu_snapshot, invalidate_menu_snapshot
 
-# Create your tests here.
+
+class MenuFixturesMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Bebidas')
+        cls.juice = MenuItem.objects.create(
+            name='Jugo', description='', price=Decimal('3.50'), category=cls.category
+        )
+        option = CustomizationOption.objects.create(name='Tamaño', menu_item=cls.juice)
+        cls.large = CustomizationChoice.objects.create(
+            option=option, name='Grande', price_extra=Decimal('1.00')
+        )
+
+
+class MenuSnapshotTests(MenuFixturesMixin, APITestCase):
+    url = '/api/menu/categories/'
+
+    def setUp(self):
+        invalidate_menu_snapshot()
+
+    def test_serves_snapshot_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['menu_items'][0]['name'], 'Jugo')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    def test_changes_invalidate_snapshot(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.large.price_extra = Decimal('1.50')
+            self.large.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        choice = response.json()[0]['menu_items'][0]['customization_options'][0]['choices'][0]
+        self.assertEqual(choice['price_extra'], '1.50')
+
+    def test_changes_from_another_process_are_seen(self):
+        etag = self.client.get(self.url)['ETag']
+        # Otro worker cambia el menú: aquí no llega su on_commit, solo la versión
+        MenuItem.objects.filter(pk=self.juice.pk).update(name='Zumo')
+        bump_menu_version()
+
+        # Hasta la siguiente comprobación se sirve el snapshot de este proceso
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertIsNotNone(get_cached_menu_snapshot(RequestFactory().get(self.url)))
+
+        with mock.patch('menu.snapshot.VERSION_CHECK_INTERVAL', 0):
+            self.assertIsNone(get_cached_menu_snapshot(RequestFactory().get(self.url)))
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['menu_items'][0]['name'], 'Zumo')
+
+
+class ImageVariantTests(MenuFixturesMixin, APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        # El pool de hilos se sustituye por una ejecución inmediata
+        executor = mock.patch('menu.images._get_executor')
+        executor.start().return_value.submit.side_effect = lambda func, *args: func(*args)
+        self.addCleanup(executor.stop)
+
+    def upload(self, size, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        self.juice.image = SimpleUploadedFile('jugo.png', buffer.getvalue(), 'image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juice.save()
+        self.juice.refresh_from_db()
+
+    def test_variants_are_generated_after_upload(self):
+        self.upload((1000, 500), 'orange')
+        variants = self.juice.image_variants
+        self.assertEqual(set(variants), {'webp', 'jpeg'})
+        self.assertEqual(set(variants['webp']), {'200', '400', '800'})
+        self.assertRegex(variants['webp']['400'], r'^menu_items/variants/\d+/[0-9a-f]{16}-400w\.webp$')
+        with self.juice.image.storage.open(variants['jpeg']['200']) as variant:
+            self.assertEqual(Image.open(variant).size, (200, 100))
+
+        data = self.client.get(f'/api/menu/items/{self.juice.id}/').json()
+        self.assertTrue(data['image_thumbnail'].endswith('-400w.jpeg'))
+        self.assertTrue(data['image_url'].endswith('-800w.jpeg'))
+        self.assertEqual(data['image_srcset']['webp'].count('w, '), 2)
+
+        # Una imagen nueva sustituye las variantes y borra las anteriores
+        old = variants['webp']['200']
+        self.upload((300, 300), 'green')
+        self.assertEqual(set(self.juice.image_variants['jpeg']), {'200', '300'})
+        self.assertFalse(self.juice.image.storage.exists(old))
+
+    def test_unchanged_image_is_not_reprocessed(self):
+        self.juice.description = 'Natural'
+        with mock.patch('menu.images.schedule_variants') as schedule:
+            self.juice.save()
+        schedule.assert_not_called()
+
+    def test_saving_with_deferred_image_does_not_regenerate(self):
+        item = MenuItem.objects.only('id', 'price').get(pk=self.juice.pk)
+        with mock.patch('menu.images.schedule_variants') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                item.price = Decimal('4.00')
+                item.save()
+        schedule.assert_not_called()
+        self.assertNotIn('image', item.__dict__)
+
+
+class MenuLiveTests(MenuFixturesMixin, APITestCase):
+    def change(self, model, pk, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance = model.objects.get(pk=pk)
+            for name, value in values.items():
+                setattr(instance, name, value)
+            instance.save()
+
+    def test_patchable_changes_send_deltas_and_others_reload(self):
+        async def scenario():
+            communicator = WebsocketCommunicator(MenuConsumer.as_asgi(), '/ws/menu/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            start = await communicator.receive_json_from()
+            self.assertEqual(start['type'], 'menu_version')
+            version = start['version']
+
+            await sync_to_async(self.change)(MenuItem, self.juice.pk, is_available=False)
+            self.assertEqual(await communicator.receive_json_from(), {
+                'type': 'menu_delta', 'version': version + 1, 'choices': [],
+                'items': [{'id': self.juice.id, 'is_available': False, 'is_visible': True, 'price': '3.50'}],
+            })
+
+            await sync_to_async(self.change)(CustomizationChoice, self.large.pk, price_extra=Decimal('1.50'))
+            delta = await communicator.receive_json_from()
+            self.assertEqual(delta['version'], version + 2)
+            self.assertEqual(delta['choices'], [
+                {'id': self.large.id, 'option_id': self.large.option_id, 'price_extra': '1.50'}
+            ])
+
+            # Guardar sin cambios no avisa; cambiar el nombre obliga a recargar
+            await sync_to_async(self.change)(MenuItem, self.juice.pk, price=Decimal('3.5'))
+            self.assertTrue(await communicator.receive_nothing())
+            await sync_to_async(self.change)(MenuItem, self.juice.pk, name='Zumo')
+            self.assertEqual(
+                await communicator.receive_json_from(), {'type': 'menu_reload', 'version': version + 3}
+            )
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_versions_are_shared_and_only_saves_compare(self):
+        with mock.patch('menu.live.publish') as publish:
+            # Leer productos no guarda nada para comparar
+            loaded = MenuItem.objects.get(pk=self.juice.pk)
+            self.assertNotIn('_live_changed', loaded.__dict__)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                loaded.price = Decimal('4.00')
+                loaded.save()
+        message, version = publish.call_args.args
+        self.assertEqual(message['type'], 'menu_delta')
+        self.assertEqual(message['items'][0]['price'], '4.00')
+        # La versión es la de la base de datos, la misma para todos los procesos
+        self.assertEqual(version, MenuVersion.objects.get(pk=1).value)
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'categories', views.CategoryViewSet)
@@ -11,4 +12,8 @@ router.register(r'customization-choices', views.CustomizationChoiceViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('categories/update-order/', views.CategoryViewSet.as_view({'post': 'update_order'})),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Delante del router: las mismas URLs sirven los GET desde las vistas asíncronas
+    urlpatterns = async_views.urlpatterns + urlpatterns
@@ -3,15 +3,20 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.db import transaction
+from django.views.static import serve
 from .models import Category, MenuItem, CustomizationOption, CustomizationChoice
 from .serializers import (
     CategorySerializer, MenuItemSerializer, CustomizationOptionSerializer,
     CustomizationChoiceSerializer, CategoryOrderSerializer
 )
+from .snapshot import get_menu_snapshot, snapshot_response
+from restaurant.replica import ReplicaReadMixin
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    # El menú público de los comensales se lee de la réplica
+    replica_anonymous_only = True
     
     def get_permissions(self):
         # Permitir acceso público a las operaciones de listado y recuperación
@@ -24,6 +29,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Category.objects.filter(is_active=True).prefetch_related('menu_items')
     
+    def list(self, request, *args, **kwargs):
+        # El menú completo se sirve desde el snapshot en memoria
+        return snapshot_response(get_menu_snapshot(request), request)
+    
     @action(detail=False, methods=['post'])
     def update_order(self, request):
         try:
@@ -39,9 +48,10 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-class MenuItemViewSet(viewsets.ModelViewSet):
+class MenuItemViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = MenuItem.objects.filter(is_visible=True)
     serializer_class = MenuItemSerializer
+    replica_anonymous_only = True
     
     def get_permissions(self):
         # Permitir acceso público a las operaciones de listado y recuperación
@@ -83,4 +93,10 @@ class CustomizationChoiceViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated, IsAdminUser]
-        return [permission() for permission in permission_classes]
\ No newline at end of file
+        return [permission() for permission in permission_classes]
+
+def serve_image_variant(request, path, document_root=None):
+    """Servir variantes en desarrollo; su nombre lleva el hash, nunca cambian"""
+    response = serve(request, path, document_root=document_root)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from . import rollups  # noqa: F401 - registra las señales de los resúmenes de ventas
+        from . import columnar  # noqa: F401 - y las del almacén columnar
+        from . import kitchen  # noqa: F401 - y las de la cola de cocina
+        from . import floor  # noqa: F401 - y las del estado del salón
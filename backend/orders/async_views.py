@@ -0,0 +1,28 @@
+from django.urls import path
+from restaurant.async_views import async_read_view, authenticate_jwt, json_response
+from .kitchen import kitchen_queue
+from .views import OrderViewSet, TableViewSet
+
+
+async def _kitchen_from_memory(request):
+    user = await authenticate_jwt(request)
+    if user is None:
+        return None
+    entries = kitchen_queue.try_snapshot(request.GET.get('status'))
+    return None if entries is None else json_response(entries)
+
+
+order_list = async_read_view(OrderViewSet.as_view({'get': 'list', 'post': 'create'}))
+order_detail = async_read_view(OrderViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'
+}))
+kitchen = async_read_view(OrderViewSet.as_view({'get': 'kitchen'}), fast_path=_kitchen_from_memory)
+table_list = async_read_view(TableViewSet.as_view({'get': 'list', 'post': 'create'}))
+
+# Mismas URLs que el router, que queda detrás para el resto de rutas
+urlpatterns = [
+    path('orders/', order_list),
+    path('orders/kitchen/', kitchen),
+    path('orders/<int:pk>/', order_detail),
+    path('tables/', table_list),
+]
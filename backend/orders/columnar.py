@@ -0,0 +1,484 @@
+"""
+Almacén columnar de órdenes pagadas para el modo ?engine=columnar de
+EconomicsViewSet.
+
+Cada columna es un array NumPy contiguo guardado como .npy y abierto con
+memmap, así que un reinicio del worker no recarga nada. Las órdenes se
+añaden al pasar a 'paid' y se marcan como no válidas al salir de ese
+estado. Las agrupaciones, top-k y cortes temporales se calculan con
+operaciones vectorizadas en lugar de SQL.
+
+Se activa con ANALYTICS_STORE_DIR y requiere NumPy. Con fcntl (POSIX) varios
+procesos pueden compartir el directorio; sin él (Windows) solo uno.
+"""
+import json
+import os
+import shutil
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from menu.models import MenuItem
+from .signals import order_payment_changed
+
+try:
+    import numpy as np
+    from numpy.lib.format import open_memmap
+except ImportError:  # NumPy es opcional
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin cerrojo entre procesos
+    fcntl = None
+
+ORDER_COLUMNS = {
+    'order_id': 'int64',
+    'ts': 'int64',
+    'amount': 'int64',
+    'waiter_id': 'int64',
+    'table_id': 'int64',
+    'valid': 'bool',
+}
+
+ITEM_COLUMNS = {
+    'order_id': 'int64',
+    'ts': 'int64',
+    'menu_item_id': 'int64',
+    'quantity': 'int64',
+    'line_total': 'int64',
+    'valid': 'bool',
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_local_seconds(value):
+    """Segundos de reloj local desde 1970, para cortar horas y días como TruncHour/TruncDate"""
+    if timezone.is_aware(value):
+        value = timezone.make_naive(value)
+    return int((value - _EPOCH).total_seconds())
+
+
+def to_cents(value):
+    return int(value * 100)
+
+
+def from_cents(value):
+    return Decimal(int(value)) / 100
+
+
+def _day_bounds(date_from, date_to):
+    start = datetime.strptime(date_from, '%Y-%m-%d')
+    end = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+    return to_local_seconds(start), to_local_seconds(end)
+
+
+def _buckets(ts, period):
+    seconds = ts.astype('datetime64[s]')
+    if period == 'hour':
+        return seconds.astype('datetime64[h]')
+    days = seconds.astype('datetime64[D]')
+    if period == 'week':
+        # El 1970-01-01 fue jueves: retroceder hasta el lunes como TruncWeek
+        return days - (days.astype('int64') + 3) % 7
+    if period == 'month':
+        return seconds.astype('datetime64[M]').astype('datetime64[D]')
+    if period == 'year':
+        return seconds.astype('datetime64[Y]').astype('datetime64[D]')
+    return days
+
+
+def _group(keys, *weights):
+    """Claves únicas, número de filas y sumas de cada array de pesos"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    sums = [np.bincount(inverse, weights=w, minlength=len(unique)) for w in weights]
+    return unique, counts, sums
+
+
+def _distinct_count(keys, values):
+    """Número de values distintos por cada clave de np.unique(keys)"""
+    pairs = np.unique(np.stack([keys, values], axis=1), axis=0)
+    _, counts = np.unique(pairs[:, 0], return_counts=True)
+    return counts
+
+
+class ColumnTable:
+    """Tabla de columnas .npy de tamaño fijo que crecen duplicando capacidad"""
+    initial_capacity = 4096
+
+    def __init__(self, directory, name, schema):
+        self.directory = directory
+        self.name = name
+        self.schema = schema
+        self.count = 0
+        self.capacity = 0
+        # Sube cada vez que una regeneración sustituye los ficheros
+        self.generation = 0
+        self.columns = {}
+
+    def _path(self, column):
+        return os.path.join(self.directory, f'{self.name}.{column}.npy')
+
+    def _meta_path(self):
+        return os.path.join(self.directory, f'{self.name}.json')
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'count': 0, 'capacity': 0}
+
+    def _write_meta(self):
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'count': self.count, 'capacity': self.capacity, 'generation': self.generation}, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def refresh(self):
+        """Releer el número de filas y reabrir si otro proceso amplió o sustituyó los ficheros"""
+        meta = self._read_meta()
+        generation = meta.get('generation', 0)
+        if meta['capacity'] != self.capacity or generation != self.generation or not self.columns:
+            # Se asigna de una vez: otros lectores pueden estar usando las columnas
+            self.columns = {
+                column: open_memmap(self._path(column), mode='r+')
+                for column in self.schema
+            } if meta['capacity'] else {}
+            self.capacity = meta['capacity']
+            self.generation = generation
+        self.count = meta['count']
+
+    def _grow(self, needed):
+        capacity = max(needed, self.capacity * 2, self.initial_capacity)
+        for column, dtype in self.schema.items():
+            tmp_path = self._path(column) + '.tmp'
+            grown = open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(capacity,))
+            if self.count:
+                grown[:self.count] = self.columns[column][:self.count]
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self._path(column))
+        self.columns = {
+            column: open_memmap(self._path(column), mode='r+') for column in self.schema
+        }
+        self.capacity = capacity
+
+    def append(self, values):
+        size = len(values['order_id'])
+        if not size:
+            return
+        if self.count + size > self.capacity:
+            self._grow(self.count + size)
+        for column in self.schema:
+            data = values.get(column, True) if column == 'valid' else values[column]
+            target = self.columns[column]
+            target[self.count:self.count + size] = data
+            target.flush()
+        self.count += size
+        self._write_meta()
+
+    def invalidate(self, order_ids):
+        if not self.count:
+            return
+        valid = self.columns['valid'][:self.count]
+        valid[np.isin(self.columns['order_id'][:self.count], order_ids)] = False
+        self.columns['valid'].flush()
+
+    def truncate(self):
+        self.count = 0
+        self._write_meta()
+
+    def replace_with(self, other):
+        """Sustituir los ficheros por los de other (otra tabla del mismo sistema de ficheros)"""
+        # Soltar los memmap antes de sustituir los ficheros (en Windows no se puede con ellos abiertos)
+        self.columns = {}
+        for column in self.schema:
+            if other.capacity:
+                os.replace(other._path(column), self._path(column))
+        self.count = other.count
+        self.capacity = other.capacity
+        self.generation = self._read_meta().get('generation', 0) + 1
+        self._write_meta()
+
+    def view(self, column):
+        return self.columns[column][:self.count] if self.count else np.empty(0, self.schema[column])
+
+
+class ColumnarStore:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.orders = ColumnTable(directory, 'orders', ORDER_COLUMNS)
+        self.items = ColumnTable(directory, 'items', ITEM_COLUMNS)
+        # Escrituras del proceso, una a una; las lecturas no lo toman
+        self._write_lock = threading.Lock()
+        # Sin fcntl este cerrojo hace de todo: lecturas y escrituras en serie
+        self._fallback_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self, exclusive=False):
+        """
+        Cerrojo compartido (lecturas) o exclusivo (escrituras). flock se toma
+        sobre un descriptor propio de cada llamada, así que excluye también
+        entre hilos del mismo proceso: las lecturas van en paralelo y una
+        escritura espera a que terminen.
+        """
+        if fcntl is None:
+            with self._fallback_lock:
+                self._refresh()
+                yield
+            return
+        with ExitStack() as stack:
+            if exclusive:
+                stack.enter_context(self._write_lock)
+            lock_file = stack.enter_context(open(os.path.join(self.directory, '.lock'), 'a'))
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        with self._refresh_lock:
+            self.orders.refresh()
+            self.items.refresh()
+
+    # Escritura
+
+    def append_orders(self, orders, items):
+        """
+        orders: tuplas (order_id, created_at, total_amount, waiter_id, table_id)
+        items: tuplas (order_id, created_at, menu_item_id, quantity, total_price)
+        """
+        with self.locked(exclusive=True):
+            self.orders.append(self._order_columns(orders))
+            self.items.append(self._item_columns(items))
+
+    def remove_order(self, order_id):
+        with self.locked(exclusive=True):
+            self.orders.invalidate([order_id])
+            self.items.invalidate([order_id])
+
+    def truncate(self):
+        with self.locked(exclusive=True):
+            self.orders.truncate()
+            self.items.truncate()
+
+    def replace_with(self, other):
+        """Cambiar de golpe al contenido de other: los lectores ven uno u otro, nunca una mezcla"""
+        with self.locked(exclusive=True):
+            self.orders.replace_with(other.orders)
+            self.items.replace_with(other.items)
+
+    def _order_columns(self, rows):
+        return {
+            'order_id': np.array([row[0] for row in rows], dtype='int64'),
+            'ts': np.array([to_local_seconds(row[1]) for row in rows], dtype='int64'),
+            'amount': np.array([to_cents(row[2]) for row in rows], dtype='int64'),
+            'waiter_id': np.array([row[3] for row in rows], dtype='int64'),
+            'table_id': np.array([row[4] for row in rows], dtype='int64'),
+        }
+
+    def _item_columns(self, rows):
+        return {
+            'order_id': np.array([row[0] for row in rows], dtype='int64'),
+            'ts': np.array([to_local_seconds(row[1]) for row in rows], dtype='int64'),
+            'menu_item_id': np.array([row[2] for row in rows], dtype='int64'),
+            'quantity': np.array([row[3] for row in rows], dtype='int64'),
+            'line_total': np.array([to_cents(row[4]) for row in rows], dtype='int64'),
+        }
+
+    # Lectura
+
+    def _mask(self, table, date_range=None, since=None):
+        ts = table.view('ts')
+        mask = table.view('valid').copy()
+        if date_range:
+            start, end = _day_bounds(*date_range)
+            mask &= (ts >= start) & (ts < end)
+        elif since is not None:
+            mask &= ts >= to_local_seconds(since)
+        return mask
+
+    def hourly_revenue(self, date_range=None, since=None):
+        """Mismo formato que EconomicsViewSet._get_hourly_revenue"""
+        with self.locked():
+            mask = self._mask(self.orders, date_range, since)
+            hours, counts, (totals,) = _group(
+                _buckets(self.orders.view('ts')[mask], 'hour'),
+                self.orders.view('amount')[mask]
+            )
+        return [
+            {'hour': hour.astype(datetime), 'total': from_cents(total), 'orders': int(count)}
+            for hour, count, total in zip(hours, counts, totals)
+        ]
+
+    def temporal(self, period, date_range=None):
+        with self.locked():
+            mask = self._mask(self.orders, date_range)
+            buckets, counts, (totals,) = _group(
+                _buckets(self.orders.view('ts')[mask], period),
+                self.orders.view('amount')[mask]
+            )
+        return [
+            {'period': bucket.astype(datetime), 'total': from_cents(total), 'orders': int(count)}
+            for bucket, count, total in zip(buckets, counts, totals)
+        ]
+
+    def waiter_performance(self, date_range=None):
+        with self.locked():
+            mask = self._mask(self.orders, date_range)
+            waiters = self.orders.view('waiter_id')[mask]
+            tables = self.orders.view('table_id')[mask]
+            waiter_ids, counts, (totals,) = _group(waiters, self.orders.view('amount')[mask])
+            tables_served = _distinct_count(waiters, tables) if len(waiters) else counts
+        ranking = np.argsort(-totals, kind='stable')
+
+        names = {
+            user['id']: user
+            for user in User.objects.filter(id__in=waiter_ids.tolist()).values(
+                'id', 'first_name', 'last_name'
+            )
+        }
+        rows = []
+        for index in ranking:
+            user = names.get(int(waiter_ids[index]), {})
+            rows.append({
+                'waiter__id': int(waiter_ids[index]),
+                'waiter__first_name': user.get('first_name', ''),
+                'waiter__last_name': user.get('last_name', ''),
+                'total_orders': int(counts[index]),
+                'total_revenue': from_cents(totals[index]),
+                'tables_served': int(tables_served[index]),
+            })
+        return rows
+
+    def product_analytics(self, limit, date_range=None):
+        """Devuelve (top_products, bottom_products) con las claves de las consultas ORM"""
+        with self.locked():
+            mask = self._mask(self.items, date_range)
+            menu_items = self.items.view('menu_item_id')[mask]
+            menu_item_ids, _, (quantities, totals) = _group(
+                menu_items,
+                self.items.view('quantity')[mask],
+                self.items.view('line_total')[mask]
+            )
+            order_counts = (
+                _distinct_count(menu_items, self.items.view('order_id')[mask])
+                if len(menu_items) else quantities
+            )
+        top = np.argsort(-totals, kind='stable')[:limit]
+        bottom = np.argsort(quantities, kind='stable')[:5]
+
+        wanted = menu_item_ids[np.concatenate([top, bottom])].tolist()
+        names = {
+            item['id']: item
+            for item in MenuItem.objects.filter(id__in=wanted).values('id', 'name', 'category__name')
+        }
+        top_products = [
+            {
+                'menu_item__id': int(menu_item_ids[index]),
+                'menu_item__name': names.get(int(menu_item_ids[index]), {}).get('name'),
+                'menu_item__category__name': names.get(int(menu_item_ids[index]), {}).get('category__name'),
+                'quantity_sold': int(quantities[index]),
+                'total_revenue': from_cents(totals[index]),
+                'orders': int(order_counts[index]),
+            }
+            for index in top
+        ]
+        bottom_products = [
+            {
+                'menu_item__id': int(menu_item_ids[index]),
+                'menu_item__name': names.get(int(menu_item_ids[index]), {}).get('name'),
+                'quantity_sold': int(quantities[index]),
+            }
+            for index in bottom
+        ]
+        return top_products, bottom_products
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_columnar_store():
+    """Almacén del proceso, o None si no está configurado o falta NumPy"""
+    global _store
+    directory = getattr(settings, 'ANALYTICS_STORE_DIR', None)
+    if np is None or not directory:
+        return None
+    with _store_lock:
+        if _store is None or _store.directory != str(directory):
+            _store = ColumnarStore(str(directory))
+        return _store
+
+
+def rebuild_columnar_store(store, chunk_size=10000):
+    """
+    Recargar el almacén desde todas las órdenes pagadas. Se escribe en un
+    directorio aparte y se sustituye al final con el cerrojo exclusivo, así que
+    las lecturas siguen viendo el almacén anterior mientras tanto. Las órdenes
+    que se paguen durante la regeneración pueden quedar fuera: lanzarla con
+    poco tráfico o repetirla.
+    """
+    staging_dir = os.path.join(store.directory, '.rebuild')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    try:
+        staging = ColumnarStore(staging_dir)
+        _load_paid_orders(staging, chunk_size)
+        store.replace_with(staging)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def _load_paid_orders(store, chunk_size):
+    from .models import Order, OrderItem
+
+    orders = Order.objects.filter(status='paid').order_by('id').values_list(
+        'id', 'created_at', 'total_amount', 'waiter_id', 'table_id'
+    )
+    items = OrderItem.objects.filter(order__status='paid').order_by('id').values_list(
+        'order_id', 'order__created_at', 'menu_item_id', 'quantity', 'total_price'
+    )
+    chunk = []
+    for row in orders.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            store.append_orders(chunk, [])
+            chunk = []
+    store.append_orders(chunk, [])
+    chunk = []
+    for row in items.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            store.append_orders([], chunk)
+            chunk = []
+    store.append_orders([], chunk)
+
+
+@receiver(order_payment_changed)
+def update_columnar_store(sender, order, paid, items, **kwargs):
+    store = get_columnar_store()
+    if store is None:
+        return
+    # Los ficheros no son transaccionales: escribir solo tras el commit
+    if paid:
+        orders = [(order.id, order.created_at, order.total_amount, order.waiter_id, order.table_id)]
+        lines = [
+            (order.id, order.created_at, item.menu_item_id, item.quantity, item.total_price)
+            for item in items
+        ]
+        transaction.on_commit(lambda: store.append_orders(orders, lines))
+    else:
+        order_id = order.id
+        transaction.on_commit(lambda: store.remove_order(order_id))
@@ -1,30 +1,44 @@
 import json
+import time
+from urllib.parse import parse_qsl
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Order
+from restaurant.metrics import ws_active, ws_connections, ws_messages, ws_send_latency
+from .topics import subscription_groups
 
 class OrderConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        await self.channel_layer.group_add(
-            "orders",
-            self.channel_name
+        params = dict(parse_qsl(self.scope.get('query_string', b'').decode()))
+        self.subscriptions = await database_sync_to_async(subscription_groups)(
+            self.scope.get('user'), params
         )
+        if not self.subscriptions:
+            await self.close(code=4403)
+            return
+
+        for group in self.subscriptions:
+            await self.channel_layer.group_add(group, self.channel_name)
         await self.accept()
+        self.accepted = True
+        ws_connections.inc(consumer='OrderConsumer')
+        ws_active.inc(consumer='OrderConsumer')
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            "orders",
-            self.channel_name
-        )
+        if getattr(self, 'accepted', False):
+            ws_active.dec(consumer='OrderConsumer')
+        for group in getattr(self, 'subscriptions', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def order_event(self, event):
+        # Evento delta: type, seq, order_id y los campos que cambiaron
+        await self._send_event(event['event'])
 
-    async def order_created(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'order_created',
-            'order': event['order']
-        }))
+    async def order_events(self, event):
+        # Varios eventos publicados en el mismo lote, en orden de secuencia
+        await self._send_event({'type': 'batch', 'events': event['events']})
 
-    async def order_updated(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'order_updated',
-            'order': event['order']
-        }))
\ No newline at end of file
+    async def _send_event(self, content):
+        start = time.perf_counter()
+        await self.send(text_data=json.dumps(content))
+        ws_send_latency.observe(time.perf_counter() - start, consumer='OrderConsumer')
+        ws_messages.inc(consumer='OrderConsumer')
@@ -0,0 +1,135 @@
+"""
+Datos de ejemplo de un restaurante (carta, mesas y personal) para las
+pruebas de carga y el generador de histórico.
+
+seed_restaurant es idempotente: reutiliza lo que ya existe con el mismo
+prefijo, así que puede lanzarse varias veces sobre la misma base de datos.
+"""
+from decimal import Decimal
+from django.contrib.auth.models import User
+from menu.models import Category, MenuItem, CustomizationOption, CustomizationChoice
+from .models import Table
+
+# (categoría, [(producto, precio, minutos de preparación)])
+MENU = [
+    ('Entrantes', [
+        ('Patatas bravas', '5.50', 10),
+        ('Croquetas de jamón', '7.00', 12),
+        ('Ensalada mixta', '6.50', 8),
+        ('Pimientos de padrón', '6.00', 8),
+        ('Calamares a la romana', '9.50', 12),
+        ('Gazpacho', '5.00', 5),
+    ]),
+    ('Principales', [
+        ('Paella valenciana', '14.50', 30),
+        ('Entrecot a la brasa', '19.00', 20),
+        ('Merluza a la plancha', '16.00', 18),
+        ('Hamburguesa de la casa', '12.50', 15),
+        ('Pollo al ajillo', '11.50', 20),
+        ('Risotto de setas', '13.00', 22),
+        ('Lasaña de verduras', '11.00', 18),
+    ]),
+    ('Postres', [
+        ('Tarta de queso', '5.50', 5),
+        ('Flan casero', '4.00', 3),
+        ('Coulant de chocolate', '6.00', 12),
+        ('Fruta de temporada', '3.50', 3),
+    ]),
+    ('Bebidas', [
+        ('Agua mineral', '1.80', 1),
+        ('Refresco', '2.50', 1),
+        ('Caña', '2.20', 1),
+        ('Copa de vino tinto', '3.50', 1),
+        ('Café', '1.50', 3),
+    ]),
+]
+
+# Customizaciones por producto: (opción, obligatoria, [(elección, suplemento)])
+CUSTOMIZATIONS = {
+    'Entrecot a la brasa': [
+        ('Punto', True, [('Poco hecho', '0'), ('Al punto', '0'), ('Muy hecho', '0')]),
+        ('Salsa', False, [('Pimienta', '1.50'), ('Roquefort', '2.00')]),
+    ],
+    'Hamburguesa de la casa': [
+        ('Punto', True, [('Al punto', '0'), ('Muy hecha', '0')]),
+        ('Extras', False, [('Queso', '1.00'), ('Bacon', '1.50'), ('Huevo', '1.00')]),
+    ],
+    'Patatas bravas': [
+        ('Salsa', False, [('Brava', '0'), ('Alioli', '0.50'), ('Mixta', '0.50')]),
+    ],
+    'Ensalada mixta': [
+        ('Extras', False, [('Atún', '1.50'), ('Huevo', '0.80')]),
+    ],
+    'Café': [
+        ('Leche', False, [('Sin lactosa', '0.30'), ('Avena', '0.40')]),
+    ],
+    'Copa de vino tinto': [
+        ('Denominación', True, [('Rioja', '0'), ('Ribera', '0.80')]),
+    ],
+}
+
+
+def _user(username, role, first_name):
+    user, created = User.objects.get_or_create(
+        username=username, defaults={'first_name': first_name}
+    )
+    if created:
+        user.set_unusable_password()
+        user.save()
+    if user.profile.role != role:
+        user.profile.role = role
+        user.profile.save()
+    return user
+
+
+def seed_menu():
+    menu_items = []
+    for display_order, (category_name, products) in enumerate(MENU):
+        category, _ = Category.objects.get_or_create(
+            name=category_name, defaults={'display_order': display_order}
+        )
+        for name, price, preparation_time in products:
+            menu_item, created = MenuItem.objects.get_or_create(
+                name=name, category=category,
+                defaults={
+                    'description': name,
+                    'price': Decimal(price),
+                    'preparation_time': preparation_time,
+                }
+            )
+            if created:
+                for option_name, required, choices in CUSTOMIZATIONS.get(name, []):
+                    option = CustomizationOption.objects.create(
+                        name=option_name, menu_item=menu_item, is_required=required,
+                        max_choices=1 if required else len(choices)
+                    )
+                    CustomizationChoice.objects.bulk_create([
+                        CustomizationChoice(option=option, name=choice, price_extra=Decimal(extra))
+                        for choice, extra in choices
+                    ])
+            menu_items.append(menu_item)
+    return menu_items
+
+
+def seed_restaurant(tables=30, waiters=10, cashiers=2, first_table=1, prefix='demo'):
+    """
+    Carta completa, mesas numeradas desde first_table y personal con perfil.
+    Devuelve un dict con menu_items, tables, waiters y cashiers.
+    """
+    menu_items = seed_menu()
+    table_objs = []
+    for number in range(first_table, first_table + tables):
+        table, _ = Table.objects.get_or_create(
+            number=number, defaults={'capacity': (2, 4, 4, 6)[number % 4]}
+        )
+        table_objs.append(table)
+    return {
+        'menu_items': menu_items,
+        'tables': table_objs,
+        'waiters': [
+            _user(f'{prefix}_waiter_{n}', 'waiter', f'Camarero {n}') for n in range(1, waiters + 1)
+        ],
+        'cashiers': [
+            _user(f'{prefix}_cashier_{n}', 'cashier', f'Caja {n}') for n in range(1, cashiers + 1)
+        ],
+    }
@@ -0,0 +1,179 @@
+"""
+Despachador del outbox de eventos de órdenes.
+
+Las vistas solo escriben OrderEvent dentro de su transacción; tras el commit
+se despierta un hilo en segundo plano que lee los eventos pendientes, agrupa
+los de una misma orden en un único mensaje y los publica en Channels. Así la
+petición HTTP no espera al fan-out y nunca se anuncia una orden que luego se
+revierte.
+
+Con varios workers cada uno tiene su despachador. Cada lote se reclama con
+la fila de OrderEventSequence bloqueada: se marcan los eventos
+(dispatched=True) y se les da seq consecutivos en una transacción corta que
+confirma antes de publicar, así las escrituras de órdenes nunca esperan al
+fan-out. Un evento solo lo envía el worker que lo reclamó. Los lotes de dos
+workers pueden llegar desordenados; el cliente ignora los seq que ya tiene y
+recupera los huecos con /changes/. Si un grupo falla tras SEND_ATTEMPTS
+intentos, sus eventos vuelven a pendientes (sin seq) y se reenvían con uno
+nuevo en la siguiente vuelta.
+"""
+import logging
+import threading
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from .models import OrderEvent, OrderEventSequence
+
+logger = logging.getLogger(__name__)
+
+
+def coalesce_events(events):
+    """
+    Fusionar los eventos de cada orden en un solo mensaje.
+
+    Las actualizaciones se acumulan sobre el mensaje pendiente de la orden
+    (creación o actualización) y el mensaje lleva la secuencia del último
+    evento fusionado. Devuelve pares (mensaje, grupos) ordenados por secuencia.
+    """
+    merged = {}
+    for event in events:
+        message = event.to_message()
+        groups = set(event.groups)
+        pending = merged.get(event.order_id)
+        if pending is not None:
+            pending_message, pending_groups = pending
+            groups |= pending_groups
+            if event.event_type == 'order_updated':
+                message = dict(pending_message, seq=event.seq, changes={
+                    **pending_message['changes'], **event.changes
+                })
+        merged[event.order_id] = (message, groups)
+    return sorted(merged.values(), key=lambda pair: pair[0]['seq'])
+
+
+def last_dispatched_seq():
+    """Último seq publicado (0 si aún no hay ninguno)"""
+    return OrderEvent.objects.aggregate(last=Max('seq'))['last'] or 0
+
+
+def _pending_events(limit):
+    return list(OrderEvent.objects.filter(dispatched=False).order_by('id')[:limit])
+
+
+SEND_ATTEMPTS = 3
+
+
+def _claim_pending(limit):
+    """Reclamar y numerar un lote en una transacción corta; [] si no hay o se perdió la carrera"""
+    with transaction.atomic():
+        # En PostgreSQL el FOR UPDATE deja a los demás despachadores esperando;
+        # en SQLite la primera escritura de otro falla y lo reintenta después
+        sequence, _ = OrderEventSequence.objects.select_for_update().get_or_create(pk=1)
+        events = _pending_events(limit)
+        if not events:
+            return []
+        claimed = OrderEvent.objects.filter(
+            id__in=[event.id for event in events], dispatched=False
+        ).update(dispatched=True)
+        if claimed != len(events):
+            # Otro despachador se adelantó con parte del lote: se reintenta después
+            transaction.set_rollback(True)
+            return []
+        for event in events:
+            sequence.last_seq += 1
+            event.seq = sequence.last_seq
+        OrderEvent.objects.bulk_update(events, ['seq'])
+        sequence.save(update_fields=['last_seq'])
+    return events
+
+
+def _send(channel_layer, group, payload):
+    for attempt in range(1, SEND_ATTEMPTS + 1):
+        try:
+            async_to_sync(channel_layer.group_send)(group, payload)
+            return True
+        except Exception:
+            logger.exception('Error publicando en %s (intento %s)', group, attempt)
+            time.sleep(0.1 * attempt)
+    return False
+
+
+def dispatch_pending(limit=500):
+    """Publicar un lote de eventos pendientes. Devuelve cuántos se procesaron."""
+    events = _claim_pending(limit)
+    if not events:
+        return 0
+
+    # Un solo envío por grupo: si un lote trae varias órdenes, van juntas
+    by_group = {}
+    for message, groups in coalesce_events(events):
+        for group in groups:
+            by_group.setdefault(group, []).append(message)
+
+    channel_layer = get_channel_layer()
+    failed_orders = set()
+    for group, messages in sorted(by_group.items()):
+        if len(messages) == 1:
+            payload = {'type': 'order_event', 'event': messages[0]}
+        else:
+            payload = {'type': 'order_events', 'events': messages}
+        if not _send(channel_layer, group, payload):
+            failed_orders.update(message['order_id'] for message in messages)
+
+    if failed_orders:
+        # Volver a pendientes: se reenvían a todos sus grupos con seq nuevo
+        # (los clientes que ya los recibieron los aplican otra vez sin efecto)
+        OrderEvent.objects.filter(
+            id__in=[event.id for event in events if event.order_id in failed_orders]
+        ).update(dispatched=False, seq=None)
+    return len(events)
+
+
+class OrderEventDispatcher:
+    # Espera tras despertar para juntar ráfagas de cambios en un solo envío
+    batch_window = 0.05
+    # Revisión periódica por si un aviso se perdió (p. ej. reinicio tras el commit)
+    poll_interval = 5
+    batch_size = 500
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Arrancar el hilo si no está en marcha (idempotente)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='order-event-dispatcher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        # La primera vuelta no espera aviso: puede haber eventos de antes de un reinicio
+        while True:
+            time.sleep(self.batch_window)
+            try:
+                while dispatch_pending(self.batch_size) == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception('Error publicando eventos de órdenes')
+            finally:
+                close_old_connections()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+dispatcher = OrderEventDispatcher()
+
+
+def schedule_dispatch():
+    """Despertar al despachador cuando la transacción actual confirme"""
+    transaction.on_commit(dispatcher.wake)
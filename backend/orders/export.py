@@ -0,0 +1,144 @@
+"""
+Exportación en streaming de órdenes y líneas (CSV o NDJSON).
+
+Las filas se leen por bloques con iterator() y cada bloque se convierte en
+un único trozo de texto, así que la memoria no depende del rango exportado
+y los primeros bytes salen en cuanto llega el primer bloque.
+"""
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from .models import Order, OrderItem
+
+CHUNK_SIZE = 2000
+
+ORDER_FIELDS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('table_number', 'table__number'),
+    ('waiter', 'waiter__username'),
+    ('total_amount', 'total_amount'),
+    ('notes', 'notes'),
+]
+
+LINE_FIELDS = [
+    ('order_id', 'order_id'),
+    ('order_created_at', 'order__created_at'),
+    ('order_status', 'order__status'),
+    ('table_number', 'order__table__number'),
+    ('waiter', 'order__waiter__username'),
+    ('line_id', 'id'),
+    ('menu_item_id', 'menu_item_id'),
+    ('menu_item', 'menu_item__name'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('total_price', 'total_price'),
+    ('notes', 'notes'),
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def _filters(prefix, date_from, date_to, status):
+    filters = Q()
+    if date_from and date_to:
+        filters &= Q(**{f'{prefix}created_at__date__range': [date_from, date_to]})
+    if status:
+        filters &= Q(**{f'{prefix}status': status})
+    return filters
+
+
+def iter_export_chunks(level, date_from=None, date_to=None, status=None, chunk_size=None, using=None):
+    """Generar bloques de filas (dicts) de órdenes o de líneas (CHUNK_SIZE por defecto)"""
+    chunk_size = chunk_size or CHUNK_SIZE
+    if level == 'lines':
+        fields = LINE_FIELDS
+        queryset = OrderItem.objects.filter(
+            _filters('order__', date_from, date_to, status)
+        ).order_by('order__created_at', 'order_id', 'id')
+    else:
+        fields = ORDER_FIELDS
+        queryset = Order.objects.filter(
+            _filters('', date_from, date_to, status)
+        ).order_by('created_at', 'id')
+
+    if using:
+        queryset = queryset.using(using)
+    names = [name for name, _ in fields]
+    rows = queryset.values_list(*[lookup for _, lookup in fields]).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = [dict(zip(names, row)) for row in islice(rows, chunk_size)]
+        if not chunk:
+            return
+        if level == 'lines':
+            _attach_customizations(chunk, using)
+        yield chunk
+
+
+def _attach_customizations(chunk, using=None):
+    # Una consulta por bloque para las customizaciones de sus líneas
+    Through = OrderItem.customizations.through
+    names = {}
+    for line_id, name in Through.objects.db_manager(using).filter(
+        orderitem_id__in=[row['line_id'] for row in chunk]
+    ).values_list('orderitem_id', 'customizationchoice__name').order_by('id'):
+        names.setdefault(line_id, []).append(name)
+    for row in chunk:
+        row['customizations'] = names.get(row['line_id'], [])
+
+
+def header_fields(level):
+    fields = LINE_FIELDS if level == 'lines' else ORDER_FIELDS
+    names = [name for name, _ in fields]
+    if level == 'lines':
+        names.append('customizations')
+    return names
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve lo escrito en vez de guardarlo"""
+    def write(self, value):
+        return value
+
+
+def render_csv(level, chunks):
+    writer = csv.writer(_Echo())
+    names = header_fields(level)
+    yield writer.writerow(names)
+    for chunk in chunks:
+        lines = []
+        for row in chunk:
+            if 'customizations' in row:
+                row['customizations'] = '|'.join(row['customizations'])
+            lines.append(writer.writerow([row[name] for name in names]))
+        yield ''.join(lines)
+
+
+def render_ndjson(level, chunks):
+    for chunk in chunks:
+        yield ''.join(json.dumps(row, default=str, ensure_ascii=False) + '\n' for row in chunk)
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'ndjson': render_ndjson,
+}
+
+
+async def iterate_async(iterator):
+    """
+    Consumir un generador síncrono desde ASGI sin cargarlo entero en memoria:
+    cada bloque se pide en el hilo síncrono que mantiene abierto el cursor.
+    """
+    sentinel = object()
+    while True:
+        part = await sync_to_async(next, thread_sensitive=True)(iterator, sentinel)
+        if part is sentinel:
+            return
+        yield part
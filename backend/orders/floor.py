@@ -0,0 +1,121 @@
+"""
+Estado del salón: cada mesa con su ocupación derivada de las órdenes abiertas.
+
+Se calcula con una única consulta agregada y se guarda en la caché de Django
+bajo una clave versionada. La versión es la fila FloorVersion de la base de
+datos, no la caché (que es local a cada proceso): se sube tras el commit solo
+cuando cambia algo que el salón muestra (mesas, órdenes que abren o cierran, o
+la mesa, importe o fecha de una orden abierta), y cada lectura la consulta por
+clave primaria, así que ningún worker sirve un estado que otro ya invalidó.
+"""
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Table, Order, FloorVersion
+from .signals import orders_updated
+from .topics import OPEN_STATUSES
+
+# Red de seguridad por si se pierde una invalidación
+CACHE_TIMEOUT = 60
+
+# Campos de una orden abierta que entran en los agregados del salón
+FLOOR_FIELDS = ('table_id', 'total_amount', 'created_at')
+
+
+def _version():
+    return FloorVersion.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def invalidate_floor():
+    # Incremento atómico en la base de datos: lo ven todos los procesos
+    if not FloorVersion.objects.filter(pk=1).update(value=F('value') + 1):
+        FloorVersion.objects.get_or_create(pk=1, defaults={'value': 1})
+
+
+def build_floor():
+    open_orders = Q(orders__status__in=OPEN_STATUSES)
+    tables = Table.objects.annotate(
+        open_orders=Count('orders', filter=open_orders),
+        running_total=Sum('orders__total_amount', filter=open_orders),
+        seated_at=Min('orders__created_at', filter=open_orders),
+    ).order_by('number').values(
+        'id', 'number', 'capacity', 'is_occupied', 'created_at',
+        'open_orders', 'running_total', 'seated_at'
+    )
+    return list(tables)
+
+
+def get_floor():
+    """Mesas con órdenes abiertas, total acumulado y minutos sentados"""
+    key = f'orders.floor.{_version()}'
+    tables = cache.get(key)
+    if tables is None:
+        tables = build_floor()
+        cache.set(key, tables, CACHE_TIMEOUT)
+
+    now = timezone.now()
+    result = []
+    for table in tables:
+        seated_at = table['seated_at']
+        result.append(dict(
+            table,
+            # Ocupada si tiene órdenes abiertas o si se marcó a mano (p. ej. sin pedir aún)
+            is_occupied=table['is_occupied'] or table['open_orders'] > 0,
+            running_total=str((table['running_total'] or Decimal('0')).quantize(Decimal('0.01'))),
+            minutes_seated=int((now - seated_at).total_seconds() // 60) if seated_at else None,
+        ))
+    return result
+
+
+def _is_open(status):
+    return status in OPEN_STATUSES
+
+
+def order_changes_floor(order):
+    """Si guardar order cambia el salón respecto a cómo se cargó"""
+    if order._state.adding or order._loaded_status is None:
+        return True
+    if _is_open(order._loaded_status) != _is_open(order.status):
+        return True
+    if not _is_open(order.status):
+        return False
+    # Los campos diferidos (None) no se cargaron y no se comparan
+    current = order.sales_values()
+    return any(
+        order._loaded_sales[field] is not None and current[field] != order._loaded_sales[field]
+        for field in FLOOR_FIELDS
+    )
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, **kwargs):
+    # Se decide antes de guardar: tras post_save los valores cargados ya son los nuevos
+    instance._floor_changed = order_changes_floor(instance)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    if instance.__dict__.pop('_floor_changed', True):
+        transaction.on_commit(invalidate_floor)
+
+
+@receiver(orders_updated)
+def orders_changed(sender, changes=None, previous_statuses=None, **kwargs):
+    if changes is None or any(field in changes for field in ('table', *FLOOR_FIELDS)):
+        transaction.on_commit(invalidate_floor)
+    elif 'status' in changes and (previous_statuses is None or any(
+        _is_open(previous) != _is_open(changes['status'])
+        for previous in previous_statuses.values()
+    )):
+        transaction.on_commit(invalidate_floor)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def floor_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_floor)
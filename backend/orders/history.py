@@ -0,0 +1,211 @@
+"""
+Histórico sintético de órdenes para reproducir volúmenes de producción.
+
+Genera órdenes pagadas (y algunas canceladas) con picos de comida y cena,
+más movimiento en fin de semana, popularidad de productos sesgada (Zipf),
+customizaciones frecuentes y camareros por turnos. Con la misma semilla y
+la misma carta el resultado es idéntico.
+
+Se escribe por lotes con un executemany por tabla, sin pasar por
+OrderItem.save ni por señales: los ids se asignan aquí para enlazar líneas y
+customizaciones sin releerlas, y los precios se calculan igual que
+create_order (precio del producto más price_extra de cada elección). Los resúmenes horarios y el
+almacén columnar hay que regenerarlos después.
+
+Cada lote reserva su rango de ids dentro de su transacción, con las tablas
+bloqueadas para escritura (PostgreSQL y SQLite), así que puede ejecutarse
+con la aplicación en marcha: create_order espera al lote y sigue después.
+Con otros motores, ejecutarlo con la base de datos sin uso.
+"""
+import random
+from bisect import bisect
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from django.core.management.color import no_style
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import Max
+from .models import Order, OrderItem
+
+# Peso relativo de cada hora de apertura: comida 12-16 y cena 19-23
+HOUR_WEIGHTS = {12: 3, 13: 9, 14: 10, 15: 5, 16: 1, 19: 1, 20: 5, 21: 9, 22: 7, 23: 2}
+LUNCH_HOURS = range(12, 17)
+# Lunes a domingo
+WEEKDAY_FACTORS = (0.7, 0.8, 0.9, 1.0, 1.3, 1.5, 1.2)
+CANCEL_RATE = 0.03
+OPTIONAL_CHOICE_RATE = 0.25
+
+ORDER_COLUMNS = (
+    'id', 'table_id', 'waiter_id', 'status', 'total_amount', 'notes',
+    'created_at', 'updated_at', 'version',
+)
+ITEM_COLUMNS = ('id', 'order_id', 'menu_item_id', 'quantity', 'unit_price', 'total_price', 'notes')
+CHOICE_COLUMNS = ('orderitem_id', 'customizationchoice_id')
+
+
+def _insert_sql(connection, model, attnames):
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in attnames]
+    return 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+
+
+def _lock_for_insert(connection, cursor):
+    """Bloquear órdenes y líneas para escritura hasta el final de la transacción"""
+    quote = connection.ops.quote_name
+    tables = [quote(model._meta.db_table) for model in (Order, OrderItem)]
+    if connection.vendor == 'postgresql':
+        # Deja leer pero no insertar
+        cursor.execute('LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE' % ', '.join(tables))
+    elif connection.vendor == 'sqlite':
+        # Una escritura (aunque no toque filas) toma el bloqueo de escritura de
+        # toda la base de datos; sin ella dos lecturas de MAX(id) podrían coincidir
+        cursor.execute('UPDATE %s SET id = id WHERE 0' % tables[0])
+
+
+class HistoryGenerator:
+    def __init__(self, menu_items, tables, waiters, seed=0, popularity_skew=1.1):
+        if not menu_items or not tables or not waiters:
+            raise ValueError('Hacen falta productos, mesas y camareros')
+        self.random = random.Random(seed)
+        self.tables = sorted(tables, key=lambda table: table.id)
+        self.waiters = sorted(waiters, key=lambda waiter: waiter.id)
+        self._hours = list(HOUR_WEIGHTS)
+        self._hour_weights = list(accumulate(HOUR_WEIGHTS.values()))
+        self._quantity_weights = [70, 90, 97, 100]
+        # Precio unitario por (producto, elecciones): la carta tiene pocas combinaciones
+        self._unit_prices = {}
+        self._build_menu(sorted(menu_items, key=lambda item: item.id), popularity_skew)
+
+    def _build_menu(self, menu_items, skew):
+        # El orden de popularidad sale de la semilla, no del orden de la carta
+        ranking = list(range(len(menu_items)))
+        self.random.shuffle(ranking)
+        self._menu = []
+        for menu_item, rank in zip(menu_items, ranking):
+            options = []
+            for option in menu_item.customization_options.all():
+                choices = sorted(option.choices.all(), key=lambda choice: choice.id)
+                if choices:
+                    # La primera elección de cada opción es la más pedida
+                    weights = list(accumulate(1 / (n + 1) for n in range(len(choices))))
+                    options.append((option.is_required, choices, weights))
+            self._menu.append((menu_item, options))
+        self._menu_weights = list(accumulate(1 / (rank + 1) ** skew for rank in ranking))
+
+    def _pick(self, cum_weights):
+        # Como random.choices con cum_weights, sin crear listas en cada llamada
+        return bisect(cum_weights, self.random.random() * cum_weights[-1])
+
+    def orders_for_day(self, day, orders_per_day):
+        """
+        Órdenes de un día: (table_id, waiter_id, status, created_at, updated_at,
+        líneas), cada línea (menu_item_id, quantity, unit_price, total_price, choice_ids)
+        """
+        rng = self.random
+        expected = orders_per_day * WEEKDAY_FACTORS[day.weekday()]
+        count = max(0, round(rng.gauss(expected, expected ** 0.5)))
+
+        # Turnos: la mitad del equipo en comidas y la otra mitad en cenas, rotando cada semana
+        week = day.isocalendar()[1]
+        lunch = [w.id for n, w in enumerate(self.waiters) if (n + week) % 2 == 0] or [self.waiters[0].id]
+        dinner = [w.id for n, w in enumerate(self.waiters) if (n + week) % 2 == 1] or lunch
+
+        orders = []
+        for _ in range(count):
+            hour = self._hours[self._pick(self._hour_weights)]
+            created_at = datetime.combine(day, time(hour, rng.randrange(60), rng.randrange(60)))
+            table = rng.choice(self.tables)
+            waiter_id = rng.choice(lunch if hour in LUNCH_HOURS else dinner)
+            lines = [self._line() for _ in range(rng.randint(1, table.capacity + 2))]
+            status = 'cancelled' if rng.random() < CANCEL_RATE else 'paid'
+            updated_at = created_at + timedelta(minutes=rng.randint(30, 120))
+            orders.append((table.id, waiter_id, status, created_at, updated_at, lines))
+        return orders
+
+    def _line(self):
+        rng = self.random
+        menu_item, options = self._menu[self._pick(self._menu_weights)]
+        choices = []
+        for required, option_choices, weights in options:
+            if required or rng.random() < OPTIONAL_CHOICE_RATE:
+                choices.append(option_choices[self._pick(weights)])
+        key = (menu_item.id, *(choice.id for choice in choices))
+        unit_price = self._unit_prices.get(key)
+        if unit_price is None:
+            unit_price = self._unit_prices[key] = menu_item.price + sum(
+                (choice.price_extra for choice in choices), Decimal('0')
+            )
+        quantity = self._pick(self._quantity_weights) + 1
+        return menu_item.id, quantity, unit_price, unit_price * quantity, key[1:]
+
+    def generate(self, start, days, orders_per_day, batch_size=5000, using=DEFAULT_DB_ALIAS, progress=None):
+        """
+        Escribir el histórico de days días desde start (fecha), batch_size
+        órdenes por transacción. Devuelve las filas escritas por tabla
+        (orders, items, customizations).
+        """
+        connection = connections[using]
+        Through = OrderItem.customizations.through
+        order_sql = _insert_sql(connection, Order, ORDER_COLUMNS)
+        item_sql = _insert_sql(connection, OrderItem, ITEM_COLUMNS)
+        choice_sql = _insert_sql(connection, Through, CHOICE_COLUMNS)
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+
+        counts = {'orders': 0, 'items': 0, 'customizations': 0}
+        pending = []
+
+        def build_rows(orders, next_order_id, next_item_id):
+            order_rows, item_rows, choice_rows = [], [], []
+            for table_id, waiter_id, status, created_at, updated_at, lines in orders:
+                total_amount = Decimal('0')
+                for menu_item_id, quantity, unit_price, total_price, choice_ids in lines:
+                    item_rows.append((
+                        next_item_id, next_order_id, menu_item_id, quantity,
+                        unit_price, total_price, ''
+                    ))
+                    choice_rows.extend((next_item_id, choice_id) for choice_id in choice_ids)
+                    total_amount += total_price
+                    next_item_id += 1
+                order_rows.append((
+                    next_order_id, table_id, waiter_id, status, total_amount, '',
+                    adapt_datetime(created_at), adapt_datetime(updated_at), 1
+                ))
+                next_order_id += 1
+            return order_rows, item_rows, choice_rows
+
+        def flush():
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                _lock_for_insert(connection, cursor)
+                # Con las tablas bloqueadas nadie más puede tomar estos ids
+                next_order_id = (Order.objects.using(using).aggregate(last=Max('id'))['last'] or 0) + 1
+                next_item_id = (OrderItem.objects.using(using).aggregate(last=Max('id'))['last'] or 0) + 1
+                order_rows, item_rows, choice_rows = build_rows(pending, next_order_id, next_item_id)
+
+                # executemany directo: bulk_create compila el SQL fila a fila y
+                # con millones de filas ese es casi todo el tiempo
+                cursor.executemany(order_sql, order_rows)
+                cursor.executemany(item_sql, item_rows)
+                if choice_rows:
+                    cursor.executemany(choice_sql, choice_rows)
+                # Con ids explícitos las secuencias de PostgreSQL no avanzan solas:
+                # moverlas antes de soltar el bloqueo
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Order, OrderItem]):
+                    cursor.execute(sql)
+            counts['orders'] += len(order_rows)
+            counts['items'] += len(item_rows)
+            counts['customizations'] += len(choice_rows)
+            pending.clear()
+            if progress is not None:
+                progress(counts)
+
+        for offset in range(days):
+            pending.extend(self.orders_for_day(start + timedelta(days=offset), orders_per_day))
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+        return counts
@@ -0,0 +1,195 @@
+"""
+Cola de cocina en memoria.
+
+Las órdenes activas se mantienen ordenadas por hora estimada de salida
+(creación + mayor preparation_time de sus líneas, que se preparan en
+paralelo), así que refrescar la pantalla de cocina es leer una lista ya
+ordenada. Las señales de Order actualizan la cola tras cada commit de este
+proceso; los cambios hechos por otros procesos se recogen del outbox de
+OrderEvent, como mucho una vez cada sync_interval segundos.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+from functools import partial
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .dispatcher import last_dispatched_seq
+from .models import Order, OrderItem, OrderEvent
+from .signals import orders_updated
+from .topics import ACTIVE_STATUSES
+
+
+def build_entry(order):
+    """Entrada de la cola a partir de una orden con sus líneas precargadas"""
+    items = [
+        {
+            'menu_item': item.menu_item.name,
+            'quantity': item.quantity,
+            'notes': item.notes,
+            'customizations': [choice.name for choice in item.customizations.all()],
+            'preparation_time': item.menu_item.preparation_time,
+        }
+        for item in order.items.all()
+    ]
+    prep_minutes = max((item['preparation_time'] for item in items), default=0)
+    return {
+        'id': order.id,
+        'table_number': order.table.number,
+        'waiter_name': order.waiter.get_full_name() or order.waiter.username,
+        'status': order.status,
+        'notes': order.notes,
+        'created_at': order.created_at,
+        'preparation_time': prep_minutes,
+        'due_at': order.created_at + timedelta(minutes=prep_minutes),
+        'items': items,
+    }
+
+
+def active_orders(ids=None):
+    queryset = Order.objects.filter(status__in=ACTIVE_STATUSES)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.select_related('table', 'waiter').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menu_item').prefetch_related(
+            'customizations'
+        ))
+    )
+
+
+class KitchenQueue:
+    # Segundos entre consultas al outbox para recoger cambios de otros procesos
+    sync_interval = 2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        # Pares (due_at, id) ordenados: la primera es la más urgente
+        self._ranking = []
+        self._loaded = False
+        self._last_seq = 0
+        self._last_sync = 0.0
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def snapshot(self, status=None):
+        """Órdenes activas por urgencia, con los minutos restantes a ahora"""
+        with self._lock:
+            self._ensure_fresh()
+            entries = [self._entries[order_id] for _, order_id in self._ranking]
+        return self._annotate(entries, status)
+
+    def try_snapshot(self, status=None):
+        """
+        Como snapshot, pero sin tocar la base de datos ni esperar al lock:
+        None si la cola no está cargada, toca sincronizar con el outbox u
+        otro hilo la está actualizando. Apto para el bucle de eventos.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if not self._loaded or time.monotonic() - self._last_sync >= self.sync_interval:
+                return None
+            entries = [self._entries[order_id] for _, order_id in self._ranking]
+        finally:
+            self._lock.release()
+        return self._annotate(entries, status)
+
+    def _annotate(self, entries, status):
+        now = timezone.now()
+        result = []
+        for entry in entries:
+            if status and entry['status'] != status:
+                continue
+            remaining = (entry['due_at'] - now).total_seconds() / 60
+            result.append(dict(
+                entry,
+                position=len(result) + 1,
+                minutes_remaining=round(remaining, 1),
+                is_late=remaining < 0,
+            ))
+        return result
+
+    def refresh(self, order_ids):
+        """Releer las órdenes indicadas; las que ya no están activas salen de la cola"""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._apply(order_ids, {order.id: order for order in active_orders(order_ids)})
+
+    def remove(self, order_id):
+        with self._lock:
+            self._discard(order_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = {}
+            self._ranking = []
+            self._loaded = False
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            # La secuencia se lee antes que las órdenes para no perder cambios intermedios
+            self._last_seq = last_dispatched_seq()
+            for order in active_orders():
+                self._insert(build_entry(order))
+            self._loaded = True
+            self._last_sync = time.monotonic()
+            return
+
+        if time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = time.monotonic()
+        changed = set()
+        for seq, order_id in OrderEvent.objects.filter(
+            seq__gt=self._last_seq
+        ).values_list('seq', 'order_id').order_by('seq'):
+            self._last_seq = seq
+            changed.add(order_id)
+        if changed:
+            self._apply(changed, {order.id: order for order in active_orders(changed)})
+
+    def _apply(self, order_ids, orders):
+        for order_id in order_ids:
+            self._discard(order_id)
+            if order_id in orders:
+                self._insert(build_entry(orders[order_id]))
+
+    def _insert(self, entry):
+        self._entries[entry['id']] = entry
+        insort(self._ranking, (entry['due_at'], entry['id']))
+
+    def _discard(self, order_id):
+        entry = self._entries.pop(order_id, None)
+        if entry is not None:
+            index = bisect_left(self._ranking, (entry['due_at'], order_id))
+            del self._ranking[index]
+
+
+kitchen_queue = KitchenQueue()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    # Tras el commit: al crear la orden sus líneas todavía no existen.
+    # Si la cola aún no se cargó, la primera lectura ya verá la orden.
+    if kitchen_queue.is_loaded:
+        transaction.on_commit(partial(kitchen_queue.refresh, [instance.pk]))
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if kitchen_queue.is_loaded:
+        transaction.on_commit(partial(kitchen_queue.remove, instance.pk))
+
+
+@receiver(orders_updated)
+def orders_bulk_updated(sender, order_ids, **kwargs):
+    if kitchen_queue.is_loaded:
+        transaction.on_commit(partial(kitchen_queue.refresh, order_ids))
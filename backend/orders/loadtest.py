@@ -0,0 +1,490 @@
+"""
+Prueba de carga de servicio contra un servidor ASGI en marcha.
+
+Simula un turno: camareros que crean órdenes, pantallas de cocina que las
+hacen avanzar, cajas que consultan la economía y cobran, y cientos de
+tablets de mesa conectadas a ws/orders/. Mide la latencia por endpoint, el
+throughput y el retraso desde que sale la petición que cambia una orden
+hasta que el evento llega a cada socket.
+
+Los clientes HTTP/1.1 y WebSocket son mínimos y usan solo asyncio para no
+añadir dependencias; no sirven como clientes de propósito general.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from django.conf import settings
+from .topics import table_token
+
+# Siguiente estado que marca una pantalla de cocina
+KITCHEN_FLOW = {
+    'pending': 'confirmed',
+    'confirmed': 'preparing',
+    'preparing': 'ready',
+    'ready': 'served',
+}
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(host, port, log_path=None, env=None, timeout=30):
+    """
+    Arrancar daphne con la aplicación del proyecto y esperar a que acepte
+    conexiones. Hereda el entorno (misma base de datos y ajustes) más env.
+    """
+    output = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'daphne', '-b', host, '-p', str(port), 'restaurant.asgi:application'],
+        cwd=settings.BASE_DIR, stdout=output, stderr=subprocess.STDOUT,
+        env={**os.environ, **(env or {})}
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'El servidor terminó al arrancar (código {process.returncode})')
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'El servidor no respondió en {host}:{port}')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def _read_headers(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Conexión cerrada por el servidor')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+class HTTPClient:
+    """Cliente HTTP/1.1 con keep-alive sobre una única conexión"""
+
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=None):
+        # Una conexión reutilizada puede haberla cerrado el servidor: un reintento
+        for attempt in (1, 2):
+            try:
+                return await self._request(method, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt == 2:
+                    raise
+
+    async def _request(self, method, path, body):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        data = json.dumps(body).encode() if body is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Accept: application/json',
+            f'Content-Length: {len(data)}',
+        ]
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        if self.token:
+            lines.append(f'Authorization: Bearer {self.token}')
+        self._writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + data)
+        await self._writer.drain()
+
+        status, headers = await _read_headers(self._reader)
+        if 'content-length' in headers:
+            content = await self._reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            content = await self._read_chunked()
+        else:
+            content = await self._reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self._reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await self._reader.readline()
+                return b''.join(parts)
+            parts.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+
+class WebSocketClient:
+    """Cliente WebSocket (RFC 6455) que solo recibe mensajes de texto"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self, path):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self._writer.write((
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {self.host}:{self.port}\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\n'
+            'Sec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        await self._writer.drain()
+        status, _ = await _read_headers(self._reader)
+        if status != 101:
+            raise ConnectionError(f'Handshake rechazado: {status}')
+
+    async def recv(self):
+        """Siguiente mensaje de texto, o None si el servidor cierra"""
+        message = b''
+        while True:
+            first, second = await self._reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                (length,) = struct.unpack('!H', await self._reader.readexactly(2))
+            elif length == 127:
+                (length,) = struct.unpack('!Q', await self._reader.readexactly(8))
+            mask = await self._reader.readexactly(4) if second & 0x80 else None
+            payload = await self._reader.readexactly(length)
+            if mask:
+                payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                await self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            message += payload
+            if first & 0x80:
+                return message.decode()
+
+    async def _send_frame(self, opcode, payload):
+        # Las tramas del cliente van siempre enmascaradas
+        mask = os.urandom(4)
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+        masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+        self._writer.write(header + mask + masked)
+        await self._writer.drain()
+
+    async def close(self):
+        if self._writer is None:
+            return
+        try:
+            await self._send_frame(0x8, struct.pack('!H', 1000))
+        except (ConnectionError, OSError):
+            pass
+        self._writer.close()
+        self._writer = None
+
+
+class Recorder:
+    """Latencias y resultados por etiqueta de endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.rejected = Counter()
+        self.errors = Counter()
+        # Primer cuerpo de respuesta por (endpoint, código) fallido, para diagnosticar
+        self.samples = {}
+        self.ws_connect = []
+        self.ws_failed = 0
+        self.ws_events = 0
+        self.event_lags = []
+
+    def observe(self, label, seconds, status, content=b''):
+        self.latencies[label].append(seconds)
+        if status >= 400:
+            text = ' '.join(content[:300].decode(errors='replace').split())
+            self.samples.setdefault(f'{label} {status}', text)
+        if status >= 500:
+            self.errors[label] += 1
+        elif status >= 400:
+            # 400/409 esperables con varias pantallas sobre las mismas órdenes
+            self.rejected[label] += 1
+
+    def summary(self, duration):
+        endpoints = {}
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[label])
+            endpoints[label] = {
+                'requests': len(values),
+                'rejected': self.rejected[label],
+                'errors': self.errors[label],
+                'throughput': len(values) / duration,
+                **{f'p{pct}_ms': _ms(percentile(values, pct)) for pct in (50, 95, 99)},
+            }
+        connect = sorted(self.ws_connect)
+        lags = sorted(self.event_lags)
+        return {
+            'duration': duration,
+            'requests': sum(len(values) for values in self.latencies.values()),
+            'throughput': sum(len(values) for values in self.latencies.values()) / duration,
+            'endpoints': endpoints,
+            'failures': self.samples,
+            'websocket': {
+                'connected': len(connect),
+                'failed': self.ws_failed,
+                'connect_p50_ms': _ms(percentile(connect, 50)),
+                'connect_p95_ms': _ms(percentile(connect, 95)),
+                'events': self.ws_events,
+                'matched_events': len(lags),
+                **{f'lag_p{pct}_ms': _ms(percentile(lags, pct)) for pct in (50, 95, 99)},
+            },
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class LoadTest:
+    """
+    plan: dict con waiters y cashiers (listas de tokens JWT), tables (ids) y
+    menu (lista de (menu_item_id, [[choice_id, ...] por opción obligatoria],
+    [choice_id opcional, ...])).
+    """
+
+    def __init__(
+        self, host, port, plan, duration=30, kitchen_screens=4, ws_clients=200,
+        think=0.5, seed=None
+    ):
+        self.host = host
+        self.port = port
+        self.plan = plan
+        self.duration = duration
+        self.kitchen_screens = kitchen_screens
+        self.ws_clients = ws_clients
+        self.think = think
+        self.random = random.Random(seed)
+        self.recorder = Recorder()
+        # Momento de envío de cada cambio, para calcular el retraso del evento
+        self._sent = {}
+        self._stop = None
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        sockets = [
+            asyncio.create_task(self._table_tablet(self.plan['tables'][n % len(self.plan['tables'])]))
+            for n in range(self.ws_clients)
+        ]
+        # Los sockets se conectan antes de empezar a generar eventos
+        await asyncio.sleep(min(5, 0.5 + self.ws_clients / 200))
+
+        actors = [self._waiter(token) for token in self.plan['waiters']]
+        actors += [
+            self._kitchen(self.plan['cashiers'][n % len(self.plan['cashiers'])])
+            for n in range(self.kitchen_screens)
+        ]
+        actors += [self._cashier(token) for token in self.plan['cashiers']]
+        tasks = [asyncio.create_task(actor) for actor in actors]
+
+        start = time.perf_counter()
+        await asyncio.sleep(self.duration)
+        self._stop.set()
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Margen para los últimos eventos en vuelo
+        await asyncio.sleep(0.5)
+        for task in sockets:
+            task.cancel()
+        await asyncio.gather(*sockets, return_exceptions=True)
+        return self.recorder.summary(elapsed)
+
+    async def _pause(self, factor=1):
+        delay = self.random.expovariate(1 / (self.think * factor)) if self.think else 0
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _call(self, client, label, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, content = await client.request(method, path, body)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            self.recorder.observe(label, time.perf_counter() - start, 599, b'conexion perdida')
+            return 599, None
+        self.recorder.observe(label, time.perf_counter() - start, status, content)
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    # Actores
+
+    async def _waiter(self, token):
+        client = HTTPClient(self.host, self.port, token)
+        try:
+            await self._call(client, 'menu.categories', 'GET', '/api/menu/categories/')
+            while not self._stop.is_set():
+                marker = f'loadtest:{uuid.uuid4().hex[:12]}'
+                body = {
+                    'table_id': self.random.choice(self.plan['tables']),
+                    'notes': marker,
+                    'items': [self._order_line() for _ in range(self.random.randint(1, 5))],
+                }
+                self._sent[marker] = time.perf_counter()
+                await self._call(client, 'orders.create', 'POST', '/api/orders/orders/', body)
+                await self._pause()
+        finally:
+            await client.close()
+
+    def _order_line(self):
+        menu_item_id, required, optional = self.random.choice(self.plan['menu'])
+        choice_ids = [self.random.choice(choices) for choices in required]
+        if optional and self.random.random() < 0.3:
+            choice_ids.append(self.random.choice(optional))
+        return {
+            'menu_item_id': menu_item_id,
+            'quantity': self.random.choice((1, 1, 1, 2, 2, 3)),
+            'customization_ids': choice_ids,
+        }
+
+    async def _kitchen(self, token):
+        client = HTTPClient(self.host, self.port, token)
+        try:
+            while not self._stop.is_set():
+                status, queue = await self._call(
+                    client, 'orders.kitchen', 'GET', '/api/orders/orders/kitchen/'
+                )
+                if status == 200 and queue:
+                    # Las pantallas trabajan sobre las más urgentes y a veces coinciden
+                    entry = self.random.choice(queue[:5])
+                    new_status = KITCHEN_FLOW[entry['status']]
+                    self._sent[(entry['id'], new_status)] = time.perf_counter()
+                    await self._call(
+                        client, 'orders.update_status', 'POST',
+                        f"/api/orders/orders/{entry['id']}/update_status/", {'status': new_status}
+                    )
+                await self._pause(0.5)
+        finally:
+            await client.close()
+
+    async def _cashier(self, token):
+        client = HTTPClient(self.host, self.port, token)
+        try:
+            while not self._stop.is_set():
+                await self._call(
+                    client, 'economics.financial_stats', 'GET', '/api/orders/economics/financial_stats/'
+                )
+                await self._call(client, 'tables.floor', 'GET', '/api/orders/tables/floor/')
+                status, page = await self._call(
+                    client, 'orders.list', 'GET', '/api/orders/orders/?status=served&view=compact'
+                )
+                ids = [order['id'] for order in (page or {}).get('results', [])[:10]]
+                if status == 200 and ids:
+                    now = time.perf_counter()
+                    for order_id in ids:
+                        self._sent[(order_id, 'paid')] = now
+                    await self._call(
+                        client, 'orders.bulk_status', 'POST', '/api/orders/orders/bulk_status/',
+                        {'ids': ids, 'status': 'paid'}
+                    )
+                await self._pause(2)
+        finally:
+            await client.close()
+
+    async def _table_tablet(self, table_id):
+        # Las tablets de mesa se suscriben sin sesión a su propia mesa, con su token
+        client = WebSocketClient(self.host, self.port)
+        start = time.perf_counter()
+        try:
+            await client.connect(
+                f'/ws/orders/?topic=table&table_id={table_id}&table_token={table_token(table_id)}'
+            )
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            self.recorder.ws_failed += 1
+            return
+        self.recorder.ws_connect.append(time.perf_counter() - start)
+        try:
+            while True:
+                text = await client.recv()
+                if text is None:
+                    return
+                received = time.perf_counter()
+                message = json.loads(text)
+                events = message['events'] if message.get('type') == 'batch' else [message]
+                for event in events:
+                    self._record_event(event, received)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            await client.close()
+
+    def _record_event(self, event, received):
+        self.recorder.ws_events += 1
+        changes = event.get('changes') or {}
+        if event.get('type') == 'order_created':
+            key = changes.get('notes')
+        elif event.get('type') == 'order_updated' and 'status' in changes:
+            key = (event.get('order_id'), changes['status'])
+        else:
+            return
+        sent = self._sent.get(key)
+        if sent is not None:
+            self.recorder.event_lags.append(received - sent)
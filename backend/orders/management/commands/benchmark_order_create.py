@@ -0,0 +1,118 @@
+import time
+from decimal import Decimal
+from statistics import median
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from menu.models import Category, MenuItem, CustomizationOption, CustomizationChoice
+from orders.models import Table, Order, OrderItem
+from orders.services import create_order
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_create_order(table_id, waiter, items, notes=''):
+    """Ruta original de OrderViewSet.create: consultas por línea y por customización"""
+    table = Table.objects.get(id=table_id)
+    order = Order.objects.create(table=table, waiter=waiter, notes=notes)
+
+    total_amount = 0
+    for item_data in items:
+        menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
+        order_item = OrderItem.objects.create(
+            order=order,
+            menu_item=menu_item,
+            quantity=item_data['quantity'],
+            notes=item_data.get('notes', ''),
+            unit_price=0,
+            total_price=0
+        )
+        for choice_id in item_data.get('customization_ids', []):
+            choice = CustomizationChoice.objects.get(id=choice_id)
+            order_item.customizations.add(choice)
+        order_item.save()
+        total_amount += order_item.total_price
+
+    order.total_amount = total_amount
+    order.save()
+    return order
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas y latencia de la creación de órdenes (ruta original vs. ruta por lotes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--choices-per-line', type=int, default=2)
+
+    def handle(self, *args, **options):
+        # Todo se ejecuta dentro de una transacción que se revierte al final
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        table, waiter, menu_items = self._seed(max(options['lines']))
+        paths = [('legacy', legacy_create_order), ('batched', create_order)]
+
+        self.stdout.write(f"{'lines':>6} {'path':>8} {'queries':>8} {'p50 ms':>9} {'max ms':>9}")
+        for line_count in options['lines']:
+            items = [
+                {
+                    'menu_item_id': menu_item.id,
+                    'quantity': 1 + index % 3,
+                    'customization_ids': [
+                        choice.id
+                        for choice in menu_item.bench_choices[:options['choices_per_line']]
+                    ],
+                }
+                for index, menu_item in enumerate(menu_items[:line_count])
+            ]
+            totals = set()
+            for name, func in paths:
+                timings = []
+                query_count = 0
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as ctx:
+                        start = time.perf_counter()
+                        order = func(table.id, waiter, items)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    query_count = len(ctx.captured_queries)
+                order.refresh_from_db()
+                totals.add(order.total_amount)
+                self.stdout.write(
+                    f"{line_count:>6} {name:>8} {query_count:>8} "
+                    f"{median(timings):>9.2f} {max(timings):>9.2f}"
+                )
+            if len(totals) != 1:
+                self.stderr.write(f"Los totales no coinciden para {line_count} líneas: {totals}")
+
+    def _seed(self, line_count):
+        waiter = User.objects.create_user(username='benchmark_waiter')
+        table = Table.objects.create(number=-1)
+        category = Category.objects.create(name='Benchmark')
+
+        menu_items = []
+        for index in range(line_count):
+            menu_item = MenuItem.objects.create(
+                name=f'Producto {index}',
+                description='',
+                price=Decimal('5.00') + index,
+                category=category,
+            )
+            option = CustomizationOption.objects.create(name='Extra', menu_item=menu_item)
+            menu_item.bench_choices = [
+                CustomizationChoice.objects.create(
+                    option=option, name=f'Extra {n}', price_extra=Decimal('0.50') * (n + 1)
+                )
+                for n in range(3)
+            ]
+            menu_items.append(menu_item)
+        return table, waiter, menu_items
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.tokens import RefreshToken
+from orders.demo_data import seed_restaurant
+from orders.loadtest import HTTPClient, percentile, free_port, start_server, stop_server
+from orders.models import Order
+from orders.services import create_order
+from orders.topics import ACTIVE_STATUSES
+
+# Entorno del servidor en cada modo: DRF síncrono, vistas asíncronas y
+# vistas asíncronas con pool de hilos propio
+MODES = {
+    'sync': {'ASYNC_READ_VIEWS': 'False'},
+    'async': {'ASYNC_READ_VIEWS': 'True', 'ASYNC_READ_THREADS': '0'},
+    'pool': {'ASYNC_READ_VIEWS': 'True', 'ASYNC_READ_THREADS': '8'},
+}
+
+DEFAULT_PATHS = [
+    '/api/orders/orders/?view=compact',
+    '/api/orders/orders/{order_id}/',
+    '/api/orders/tables/',
+    '/api/menu/categories/',
+    '/api/orders/orders/kitchen/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la concurrencia de los endpoints de lectura con las vistas DRF síncronas '
+        'y con las asíncronas (ASYNC_READ_VIEWS, ASYNC_READ_THREADS) sobre un servidor ASGI real'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--duration', type=float, default=5, help='Segundos por medida')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=['sync', 'async'])
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+        parser.add_argument('--orders', type=int, default=100, help='Órdenes activas a sembrar')
+        parser.add_argument('--migrate', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['migrate']:
+            call_command('migrate', verbosity=0)
+        token, order_id = self._seed(options['orders'])
+        paths = [path.format(order_id=order_id) for path in options['paths']]
+
+        self.stdout.write(
+            f"{'mode':>6} {'conc':>5} {'path':<36} {'req/s':>8} {'p50 ms':>9} "
+            f"{'p95 ms':>9} {'p99 ms':>9} {'err':>5}"
+        )
+        for mode in options['modes']:
+            host, port = '127.0.0.1', free_port()
+            try:
+                process = start_server(host, port, env=MODES[mode])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            try:
+                for path in paths:
+                    for concurrency in options['concurrency']:
+                        stats = asyncio.run(self._hammer(
+                            host, port, token, path, concurrency, options['duration']
+                        ))
+                        self.stdout.write(
+                            f"{mode:>6} {concurrency:>5} {path[:36]:<36} {stats['throughput']:>8.1f} "
+                            f"{stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f} "
+                            f"{stats['errors']:>5}"
+                        )
+            finally:
+                stop_server(process)
+
+    def _seed(self, order_count):
+        data = seed_restaurant(tables=20, waiters=4, cashiers=1, first_table=800, prefix='bench')
+        waiter = data['waiters'][0]
+        active = Order.objects.filter(waiter__in=data['waiters'], status__in=ACTIVE_STATUSES)
+        with transaction.atomic():
+            for index in range(max(0, order_count - active.count())):
+                create_order(
+                    data['tables'][index % len(data['tables'])].id,
+                    data['waiters'][index % len(data['waiters'])],
+                    [
+                        {'menu_item_id': menu_item.id, 'quantity': 1}
+                        for menu_item in data['menu_items'][index % 7:index % 7 + 3]
+                    ]
+                )
+        order = active.first()
+        return str(RefreshToken.for_user(waiter).access_token), order.id
+
+    async def _hammer(self, host, port, token, path, concurrency, duration):
+        latencies = []
+        errors = 0
+
+        async def client_loop(deadline):
+            nonlocal errors
+            client = HTTPClient(host, port, token)
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        status, _ = await client.request('GET', path)
+                    except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                        status = 599
+                    latencies.append(time.perf_counter() - start)
+                    if status >= 400:
+                        errors += 1
+            finally:
+                await client.close()
+
+        # Calentamiento: snapshot del menú, cola de cocina y conexiones abiertas
+        await client_loop(time.perf_counter() + 0.3)
+        latencies.clear()
+        errors = 0
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(start + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'errors': errors,
+            **{f'p{pct}': percentile(latencies, pct) * 1000 for pct in (50, 95, 99)},
+        }
@@ -0,0 +1,69 @@
+import time
+from datetime import date, timedelta
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from menu.models import MenuItem
+from orders.demo_data import seed_restaurant
+from orders.history import HistoryGenerator
+from orders.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera histórico sintético de órdenes pagadas con executemany por lotes '
+        '(determinista con --seed) para reproducir volúmenes de producción'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90)
+        parser.add_argument('--orders-per-day', type=int, default=400, help='Media en un jueves')
+        parser.add_argument('--end', type=date.fromisoformat, default=None,
+                            help='Último día generado (AAAA-MM-DD); por defecto ayer')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skew', type=float, default=1.1, help='Exponente Zipf de popularidad')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Órdenes por transacción')
+        parser.add_argument('--tables', type=int, default=30)
+        parser.add_argument('--waiters', type=int, default=10)
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Regenerar después los resúmenes horarios y el almacén columnar')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days y --batch-size deben ser positivos')
+
+        # Carta, mesas y camareros de ejemplo (se reutilizan si ya existen)
+        data = seed_restaurant(tables=options['tables'], waiters=options['waiters'], cashiers=0)
+        menu_items = MenuItem.objects.filter(
+            id__in=[item.id for item in data['menu_items']]
+        ).prefetch_related('customization_options__choices')
+
+        generator = HistoryGenerator(
+            menu_items, data['tables'], data['waiters'],
+            seed=options['seed'], popularity_skew=options['skew']
+        )
+        end = options['end'] or date.today() - timedelta(days=1)
+        start = end - timedelta(days=options['days'] - 1)
+
+        started = time.perf_counter()
+
+        def progress(counts):
+            self.stdout.write(f"  {counts['orders']} órdenes, {counts['items']} líneas...")
+
+        counts = generator.generate(
+            start, options['days'], options['orders_per_day'],
+            batch_size=options['batch_size'], progress=progress
+        )
+        elapsed = time.perf_counter() - started
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['orders']} órdenes, {counts['items']} líneas y {counts['customizations']} "
+            f"customizaciones del {start} al {end} en {elapsed:.1f} s ({rows / elapsed:,.0f} filas/s)"
+        ))
+
+        if options['rebuild']:
+            rebuild_sales_rollups()
+            self.stdout.write(self.style.SUCCESS('Resúmenes horarios regenerados'))
+            try:
+                call_command('rebuild_columnar_store', stdout=self.stdout)
+            except CommandError as e:
+                self.stdout.write(f'Almacén columnar no regenerado: {e}')
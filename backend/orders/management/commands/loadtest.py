@@ -0,0 +1,129 @@
+import asyncio
+import json
+from urllib.parse import urlsplit
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+from orders.demo_data import seed_restaurant
+from orders.loadtest import LoadTest, free_port, start_server, stop_server
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga: levanta el servidor ASGI y simula camareros, cocina, caja '
+        'y tablets de mesa por WebSocket; informa de p50/p95/p99, throughput y retraso de eventos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=30, help='Segundos de carga')
+        parser.add_argument('--waiters', type=int, default=20)
+        parser.add_argument('--kitchen', type=int, default=4, help='Pantallas de cocina')
+        parser.add_argument('--cashiers', type=int, default=2)
+        parser.add_argument('--ws-clients', type=int, default=200, help='Tablets de mesa conectadas')
+        parser.add_argument('--tables', type=int, default=30)
+        parser.add_argument('--first-table', type=int, default=900, help='Número de la primera mesa de la prueba')
+        parser.add_argument('--think', type=float, default=0.5, help='Pausa media entre acciones (s)')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--url', help='Usar un servidor ya arrancado (p. ej. http://127.0.0.1:8000)')
+        parser.add_argument('--migrate', action='store_true', help='Aplicar migraciones antes de sembrar')
+        parser.add_argument('--server-log', help='Fichero para la salida del servidor')
+        parser.add_argument('--json', help='Guardar el resumen en un fichero JSON')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Base de datos: {connection.settings_dict['NAME']}")
+        if options['migrate']:
+            call_command('migrate', verbosity=0)
+        plan = self._seed(options)
+
+        process = None
+        if options['url']:
+            parts = urlsplit(options['url'])
+            host, port = parts.hostname, parts.port or 80
+        else:
+            host, port = '127.0.0.1', free_port()
+            try:
+                process = start_server(host, port, options['server_log'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f'Servidor ASGI en {host}:{port}')
+
+        try:
+            load_test = LoadTest(
+                host, port, plan,
+                duration=options['duration'],
+                kitchen_screens=options['kitchen'],
+                ws_clients=options['ws_clients'],
+                think=options['think'],
+                seed=options['seed'],
+            )
+            summary = asyncio.run(load_test.run())
+        finally:
+            if process is not None:
+                stop_server(process)
+
+        self._report(summary)
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(summary, output, indent=2)
+
+    def _seed(self, options):
+        data = seed_restaurant(
+            tables=options['tables'], waiters=options['waiters'],
+            cashiers=max(1, options['cashiers']), first_table=options['first_table'],
+            prefix='loadtest'
+        )
+        menu = []
+        for menu_item in data['menu_items']:
+            required, optional = [], []
+            for option in menu_item.customization_options.prefetch_related('choices'):
+                choice_ids = [choice.id for choice in option.choices.all()]
+                if option.is_required:
+                    required.append(choice_ids)
+                else:
+                    optional.extend(choice_ids)
+            menu.append((menu_item.id, required, optional))
+
+        def token(user):
+            return str(RefreshToken.for_user(user).access_token)
+
+        return {
+            'waiters': [token(user) for user in data['waiters']],
+            'cashiers': [token(user) for user in data['cashiers']][:max(1, options['cashiers'])],
+            'tables': [table.id for table in data['tables']],
+            'menu': menu,
+        }
+
+    def _report(self, summary):
+        self.stdout.write(
+            f"\n{'endpoint':<28} {'reqs':>7} {'rej':>5} {'err':>5} {'req/s':>8} "
+            f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        )
+        for label, stats in summary['endpoints'].items():
+            self.stdout.write(
+                f"{label:<28} {stats['requests']:>7} {stats['rejected']:>5} {stats['errors']:>5} "
+                f"{stats['throughput']:>8.1f} {_fmt(stats['p50_ms'])} {_fmt(stats['p95_ms'])} "
+                f"{_fmt(stats['p99_ms'])}"
+            )
+        self.stdout.write(
+            f"{'total':<28} {summary['requests']:>7} {'':>5} {'':>5} {summary['throughput']:>8.1f}"
+        )
+
+        for key, content in summary['failures'].items():
+            self.stdout.write(f'  {key}: {content}')
+
+        ws = summary['websocket']
+        self.stdout.write(
+            f"\nWebSocket: {ws['connected']} conectados ({ws['failed']} fallidos), "
+            f"conexión p50 {_fmt(ws['connect_p50_ms']).strip()} ms / p95 {_fmt(ws['connect_p95_ms']).strip()} ms"
+        )
+        self.stdout.write(
+            f"Eventos recibidos: {ws['events']} ({ws['matched_events']} con retraso medido); "
+            f"retraso p50 {_fmt(ws['lag_p50_ms']).strip()} ms, p95 {_fmt(ws['lag_p95_ms']).strip()} ms, "
+            f"p99 {_fmt(ws['lag_p99_ms']).strip()} ms"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Prueba completada en {summary['duration']:.1f} s"))
+
+
+def _fmt(value):
+    return f"{'-':>9}" if value is None else f'{value:>9.2f}'
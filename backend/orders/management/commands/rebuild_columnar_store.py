@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from orders.columnar import get_columnar_store, rebuild_columnar_store
+
+
+class Command(BaseCommand):
+    help = 'Regenera el almacén columnar de analítica desde las órdenes pagadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        store = get_columnar_store()
+        if store is None:
+            raise CommandError('Configura ANALYTICS_STORE_DIR e instala NumPy')
+        rebuild_columnar_store(store, chunk_size=options['chunk_size'])
+        with store.locked():
+            self.stdout.write(self.style.SUCCESS(
+                f"{store.orders.count} órdenes y {store.items.count} líneas en {store.directory}"
+            ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from orders.models import HourlySalesRollup, HourlyProductRollup
+from orders.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Regenera los resúmenes horarios de ventas desde las órdenes pagadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuild_sales_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{HourlySalesRollup.objects.count()} filas de ventas y "
+            f"{HourlyProductRollup.objects.count()} filas de productos regeneradas"
+        ))
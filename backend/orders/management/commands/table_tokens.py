@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from orders.models import Table
+from orders.topics import table_token
+
+
+class Command(BaseCommand):
+    help = (
+        'Muestra el token de cada mesa para instalar su tablet: '
+        'ws/orders/?topic=table&table_id=N&table_token=...'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('numbers', nargs='*', type=int, help='Números de mesa (por defecto todas)')
+
+    def handle(self, *args, **options):
+        tables = Table.objects.order_by('number')
+        if options['numbers']:
+            tables = tables.filter(number__in=options['numbers'])
+        for table in tables:
+            self.stdout.write(f'Mesa {table.number}\ttable_id={table.id}\ttable_token={table_token(table.id)}')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderevent',
+            name='dispatched',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='groups',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:17
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_events(apps, schema_editor):
+    # Los clientes ya conocen los ids como seq: la secuencia sigue desde ahí
+    OrderEvent = apps.get_model('orders', 'OrderEvent')
+    OrderEventSequence = apps.get_model('orders', 'OrderEventSequence')
+    OrderEvent.objects.filter(dispatched=True).update(seq=F('id'))
+    last_id = OrderEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    OrderEventSequence.objects.create(pk=1, last_seq=last_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEventSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('orders', 'FloorVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_event_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FloorVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
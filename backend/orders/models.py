@@ -29,9 +29,31 @@ class Order(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Se incrementa en cada escritura de la API; las escrituras se condicionan
+    # a la versión leída para no pisar cambios concurrentes
+    version = models.PositiveIntegerField(default=1)
+
+    # Campos que cuentan en los resúmenes de ventas y el almacén columnar
+    SALES_FIELDS = ('total_amount', 'table_id', 'waiter_id', 'created_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Estado con el que se cargó, para detectar transiciones al guardar,
+        # y campos de ventas, para corregir los resúmenes si se edita pagada
+        self._loaded_status = self.__dict__.get('status')
+        self._loaded_sales = self.sales_values()
+
+    def sales_values(self):
+        # None si el campo está diferido
+        return {field: self.__dict__.get(field) for field in self.SALES_FIELDS}
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginación por cursor sobre (created_at, id), con y sin filtro de estado
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ]
 
     def __str__(self):
         return f"Orden #{self.id} - Mesa {self.table.number}"
@@ -62,4 +84,99 @@ class OrderItem(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.quantity}x {self.menu_item.name} - Orden #{self.order.id}"
\ No newline at end of file
+        return f"{self.quantity}x {self.menu_item.name} - Orden #{self.order.id}"
+
+class OrderEvent(models.Model):
+    """
+    Registro de cambios de órdenes. También hace de outbox: se escribe en la
+    misma transacción que el cambio y orders.dispatcher lo publica después
+    del commit.
+
+    seq es el número de secuencia que reciben los clientes por WebSocket y
+    con el que piden los cambios que se perdieron al reconectar. Lo asigna
+    el despachador al publicar, bajo el bloqueo de OrderEventSequence, así
+    que se confirma en orden y sin huecos (el id no: en PostgreSQL dos
+    transacciones pueden confirmar sus ids en orden inverso).
+    """
+    EVENT_CHOICES = [
+        ('order_created', 'Orden creada'),
+        ('order_updated', 'Orden actualizada'),
+        ('order_deleted', 'Orden eliminada'),
+    ]
+
+    # Sin FK para que el registro sobreviva al borrado de la orden
+    order_id = models.BigIntegerField(db_index=True)
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    changes = models.JSONField(default=dict)
+    # Outbox: grupos de Channels destino y si ya se publicó
+    groups = models.JSONField(default=list)
+    dispatched = models.BooleanField(default=False, db_index=True)
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.id} {self.event_type} - Orden #{self.order_id}"
+
+    def to_message(self):
+        return {
+            'type': self.event_type,
+            'seq': self.seq,
+            'order_id': self.order_id,
+            'changes': self.changes,
+        }
+
+
+class OrderEventSequence(models.Model):
+    """Último seq asignado; una sola fila, que los despachadores bloquean"""
+    last_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Secuencia de eventos: {self.last_seq}"
+
+
+class FloorVersion(models.Model):
+    """Versión del estado del salón; una sola fila, compartida por todos los procesos"""
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Versión del salón: {self.value}"
+
+
+class HourlySalesRollup(models.Model):
+    """Ventas pagadas agregadas por hora, camarero y mesa"""
+    hour = models.DateTimeField()
+    waiter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='+')
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['hour']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'waiter', 'table'], name='sales_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 - {self.waiter_id}/{self.table_id}"
+
+
+class HourlyProductRollup(models.Model):
+    """Líneas pagadas agregadas por hora y producto"""
+    hour = models.DateTimeField()
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Órdenes distintas que incluyen el producto
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['hour']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'menu_item'], name='product_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 - {self.menu_item_id}"
@@ -0,0 +1,115 @@
+"""
+Tablas de resumen horario de ventas pagadas.
+
+Se mantienen de forma incremental cuando una orden pasa a 'paid' o deja de
+estarlo, o cuando se edita una ya pagada (se resta como estaba y se suma
+como queda; ver signals.order_payment_changed), y EconomicsViewSet responde desde ellas en lugar de recorrer todas
+las órdenes. rebuild_sales_rollups las regenera desde el histórico.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncHour
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import HourlySalesRollup, HourlyProductRollup
+from .signals import order_payment_changed
+
+
+def hour_bucket(value):
+    """Truncar a la hora igual que TruncHour (en la zona horaria actual)"""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _bump(model, key, **deltas):
+    """Sumar deltas a la fila de key, creándola si no existe"""
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**key).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Otro proceso la creó entre el update y el insert
+        model.objects.filter(**key).update(**increments)
+
+
+def apply_order_to_rollups(order, sign, items=None):
+    """Sumar (sign=1) o restar (sign=-1) una orden pagada de los resúmenes"""
+    hour = hour_bucket(order.created_at)
+    _bump(
+        HourlySalesRollup,
+        {'hour': hour, 'waiter_id': order.waiter_id, 'table_id': order.table_id},
+        order_count=sign,
+        revenue=sign * order.total_amount
+    )
+
+    if items is None:
+        items = order.items.all()
+    products = defaultdict(lambda: [0, Decimal('0')])
+    for item in items:
+        products[item.menu_item_id][0] += item.quantity
+        products[item.menu_item_id][1] += item.total_price
+    for menu_item_id, (quantity, revenue) in products.items():
+        _bump(
+            HourlyProductRollup,
+            {'hour': hour, 'menu_item_id': menu_item_id},
+            quantity=sign * quantity,
+            revenue=sign * revenue,
+            order_count=sign
+        )
+
+    if sign < 0:
+        # No dejar filas vacías que aparecerían como períodos sin ventas
+        HourlySalesRollup.objects.filter(hour=hour, order_count__lte=0).delete()
+        HourlyProductRollup.objects.filter(hour=hour, order_count__lte=0).delete()
+
+
+def rebuild_sales_rollups(apps=global_apps, batch_size=1000):
+    """Regenerar los resúmenes desde las órdenes pagadas"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    SalesRollup = apps.get_model('orders', 'HourlySalesRollup')
+    ProductRollup = apps.get_model('orders', 'HourlyProductRollup')
+
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        ProductRollup.objects.all().delete()
+
+        sales = Order.objects.filter(status='paid').annotate(
+            bucket=TruncHour('created_at')
+        ).values('bucket', 'waiter_id', 'table_id').annotate(
+            orders=Count('id'),
+            total=Sum('total_amount')
+        ).order_by()
+        SalesRollup.objects.bulk_create((
+            SalesRollup(
+                hour=row['bucket'], waiter_id=row['waiter_id'], table_id=row['table_id'],
+                order_count=row['orders'], revenue=row['total']
+            )
+            for row in sales.iterator(chunk_size=batch_size)
+        ), batch_size=batch_size)
+
+        products = OrderItem.objects.filter(order__status='paid').annotate(
+            bucket=TruncHour('order__created_at')
+        ).values('bucket', 'menu_item_id').annotate(
+            units=Sum('quantity'),
+            total=Sum('total_price'),
+            orders=Count('order', distinct=True)
+        ).order_by()
+        ProductRollup.objects.bulk_create((
+            ProductRollup(
+                hour=row['bucket'], menu_item_id=row['menu_item_id'],
+                quantity=row['units'], revenue=row['total'], order_count=row['orders']
+            )
+            for row in products.iterator(chunk_size=batch_size)
+        ), batch_size=batch_size)
+
+
+@receiver(order_payment_changed)
+def update_rollups(sender, order, paid, items, **kwargs):
+    apply_order_to_rollups(order, 1 if paid else -1, items)
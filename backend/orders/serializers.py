@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Table, Order, OrderItem
+from .models import Table, Order, OrderItem, OrderEvent
 from menu.serializers import MenuItemSerializer, CustomizationChoiceSerializer
 
 class TableSerializer(serializers.ModelSerializer):
@@ -28,13 +28,38 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             'id', 'table', 'table_number', 'waiter', 'waiter_name', 'status',
-            'total_amount', 'notes', 'items', 'created_at', 'updated_at'
+            'total_amount', 'notes', 'items', 'created_at', 'updated_at', 'version'
         ]
+        read_only_fields = ['version']
     
     def create(self, validated_data):
         order = Order.objects.create(**validated_data)
         return order
 
+class CompactOrderItemSerializer(serializers.ModelSerializer):
+    menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
+    customizations = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+    
+    class Meta:
+        model = OrderItem
+        fields = [
+            'id', 'menu_item', 'menu_item_name', 'quantity', 'unit_price',
+            'total_price', 'notes', 'customizations'
+        ]
+
+class CompactOrderSerializer(serializers.ModelSerializer):
+    """Representación reducida para pantallas de camarero y cocina (?view=compact)"""
+    items = CompactOrderItemSerializer(many=True, read_only=True)
+    waiter_name = serializers.CharField(source='waiter.get_full_name', read_only=True)
+    table_number = serializers.IntegerField(source='table.number', read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'table', 'table_number', 'waiter', 'waiter_name', 'status',
+            'total_amount', 'notes', 'items', 'created_at', 'version'
+        ]
+
 class CreateOrderItemSerializer(serializers.Serializer):
     menu_item_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1)
@@ -48,4 +73,18 @@ class CreateOrderItemSerializer(serializers.Serializer):
 class CreateOrderSerializer(serializers.Serializer):
     table_id = serializers.IntegerField()
     items = CreateOrderItemSerializer(many=True)
-    notes = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+class OrderDeltaSerializer(serializers.ModelSerializer):
+    """Campos escalares de la orden que pueden viajar en un evento de cambio"""
+    class Meta:
+        model = Order
+        fields = ['table', 'waiter', 'status', 'total_amount', 'notes', 'updated_at', 'version']
+
+class OrderEventSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='event_type', read_only=True)
+    
+    class Meta:
+        model = OrderEvent
+        fields = ['seq', 'type', 'order_id', 'changes', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,255 @@
+from decimal import Decimal
+from django.db.models import F, prefetch_related_objects
+from django.utils import timezone
+from .models import Table, Order, OrderItem, OrderEvent
+from .serializers import CompactOrderSerializer, OrderDeltaSerializer
+from .dispatcher import schedule_dispatch
+from .signals import (
+    notify_paid_order_changed, notify_status_change, orders_updated, sales_changed
+)
+from .topics import order_groups
+from menu.models import MenuItem, CustomizationChoice
+
+
+def create_order(table_id, waiter, items, notes=''):
+    """
+    Crear una orden con todas sus líneas en un número fijo de consultas.
+
+    Se cargan todos los productos y customizaciones en una sola pasada,
+    se calculan los precios en memoria y se insertan las líneas y las
+    filas de la tabla intermedia con bulk_create. Debe llamarse dentro
+    de transaction.atomic().
+    """
+    table = Table.objects.get(id=table_id)
+
+    menu_items = MenuItem.objects.in_bulk({item['menu_item_id'] for item in items})
+    choices = CustomizationChoice.objects.in_bulk({
+        choice_id
+        for item in items
+        for choice_id in item.get('customization_ids', [])
+    })
+
+    # Calcular precios en memoria
+    lines = []
+    total_amount = Decimal('0')
+    for item_data in items:
+        menu_item = menu_items.get(item_data['menu_item_id'])
+        if menu_item is None:
+            raise MenuItem.DoesNotExist(
+                f"MenuItem {item_data['menu_item_id']} does not exist."
+            )
+
+        # dict.fromkeys elimina duplicados conservando el orden, igual que customizations.add
+        line_choices = []
+        for choice_id in dict.fromkeys(item_data.get('customization_ids', [])):
+            choice = choices.get(choice_id)
+            if choice is None:
+                raise CustomizationChoice.DoesNotExist(
+                    f"CustomizationChoice {choice_id} does not exist."
+                )
+            line_choices.append(choice)
+
+        unit_price = menu_item.price + sum(choice.price_extra for choice in line_choices)
+        total_price = unit_price * item_data['quantity']
+        total_amount += total_price
+        lines.append((
+            OrderItem(
+                menu_item=menu_item,
+                quantity=item_data['quantity'],
+                notes=item_data.get('notes', ''),
+                unit_price=unit_price,
+                total_price=total_price,
+            ),
+            line_choices,
+        ))
+
+    order = Order.objects.create(
+        table=table,
+        waiter=waiter,
+        notes=notes,
+        total_amount=total_amount,
+    )
+
+    order_items = []
+    for order_item, _ in lines:
+        order_item.order = order
+        order_items.append(order_item)
+    # bulk_create no pasa por OrderItem.save, los precios ya están calculados
+    OrderItem.objects.bulk_create(order_items)
+
+    Through = OrderItem.customizations.through
+    Through.objects.bulk_create([
+        Through(orderitem_id=order_item.id, customizationchoice_id=choice.id)
+        for order_item, line_choices in lines
+        for choice in line_choices
+    ])
+
+    return order
+
+
+def record_order_event(order, event_type, fields=None, groups=()):
+    """
+    Registrar un evento de cambio de la orden en el outbox.
+
+    Para order_created se guarda la representación compacta completa; para
+    order_updated solo los campos indicados en fields. El evento se publica
+    en groups cuando la transacción confirma.
+    """
+    event = OrderEvent.objects.create(
+        order_id=order.id,
+        event_type=event_type,
+        changes=_event_changes(order, event_type, fields),
+        groups=list(groups)
+    )
+    schedule_dispatch()
+    return event
+
+
+class OrderVersionConflict(Exception):
+    """La orden cambió desde que el cliente la leyó"""
+    def __init__(self, current_version):
+        super().__init__('La orden fue modificada por otro usuario')
+        self.current_version = current_version
+
+
+def update_order(order, changes, expected_version):
+    """
+    Guardar solo los campos de changes con un UPDATE condicionado a la versión.
+
+    Lanza OrderVersionConflict si otra escritura se adelantó. Actualiza la
+    instancia, avisa a los resúmenes si cambia el pago y registra el evento.
+    Debe llamarse dentro de transaction.atomic().
+    """
+    if not changes:
+        return
+    previous_status = order.status
+    loaded_sales = order.sales_values()
+    now = timezone.now()
+    updated = Order.objects.filter(pk=order.pk, version=expected_version).update(
+        **changes, updated_at=now, version=F('version') + 1
+    )
+    if not updated:
+        raise OrderVersionConflict(
+            Order.objects.filter(pk=order.pk).values_list('version', flat=True).first()
+        )
+
+    for field, value in changes.items():
+        setattr(order, field, value)
+    order.updated_at = now
+    order.version = expected_version + 1
+    order._loaded_status = order.status
+    order._loaded_sales = order.sales_values()
+
+    if previous_status == 'paid' == order.status:
+        # Editar una orden ya pagada corrige los resúmenes con la diferencia
+        if sales_changed(order, loaded_sales):
+            notify_paid_order_changed(order, loaded_sales)
+    else:
+        notify_status_change(order, previous_status)
+    orders_updated.send(
+        sender=Order, order_ids=[order.pk], changes=changes,
+        previous_statuses={order.pk: previous_status}
+    )
+    record_order_event(
+        order, 'order_updated', [*changes, 'updated_at', 'version'],
+        groups=order_groups(order, previous_status)
+    )
+
+
+def _event_changes(order, event_type, fields):
+    if event_type == 'order_created':
+        return CompactOrderSerializer(order).data
+    if event_type == 'order_updated':
+        data = OrderDeltaSerializer(order).data
+        return {field: data[field] for field in fields or []}
+    return {}
+
+
+# Máquina de estados: solo se avanza en el flujo, se cancela mientras la
+# orden está en cocina, y una cuenta cobrada por error puede reabrirse.
+STATUS_TRANSITIONS = {
+    'pending': ('confirmed', 'preparing', 'ready', 'served', 'paid', 'cancelled'),
+    'confirmed': ('preparing', 'ready', 'served', 'paid', 'cancelled'),
+    'preparing': ('ready', 'served', 'paid', 'cancelled'),
+    'ready': ('served', 'paid', 'cancelled'),
+    'served': ('paid',),
+    'paid': ('served',),
+    'cancelled': (),
+}
+
+
+def can_transition(current, new):
+    return new in STATUS_TRANSITIONS.get(current, ())
+
+
+def transition_orders(order_ids, new_status):
+    """
+    Cambiar el estado de varias órdenes con un único UPDATE condicional.
+
+    Solo se actualizan las órdenes cuyo estado actual admite la transición.
+    Registra los eventos con un solo INSERT y un único aviso al despachador.
+    Devuelve (actualizadas, rechazadas) donde rechazadas es una lista de
+    (id, estado_actual) con estado_actual None si la orden no existe. Debe
+    llamarse dentro de transaction.atomic().
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = {
+        order.id: order
+        for order in Order.objects.select_for_update().filter(id__in=order_ids)
+    }
+    sources = [current for current in STATUS_TRANSITIONS if can_transition(current, new_status)]
+    candidates = [
+        orders[order_id] for order_id in order_ids
+        if order_id in orders and orders[order_id].status in sources
+    ]
+
+    now = timezone.now()
+    updated = Order.objects.filter(
+        id__in=[order.id for order in candidates], status__in=sources
+    ).update(status=new_status, updated_at=now, version=F('version') + 1)
+    if updated != len(candidates):
+        # Sin bloqueo de filas (SQLite) otra escritura pudo adelantarse
+        applied = set(Order.objects.filter(
+            id__in=[order.id for order in candidates], status=new_status, updated_at=now
+        ).values_list('id', flat=True))
+        candidates = [order for order in candidates if order.id in applied]
+
+    changed = []
+    for order in candidates:
+        changed.append((order, order.status))
+        order.status = new_status
+        order.updated_at = now
+        order.version += 1
+        order._loaded_status = new_status
+
+    # Resúmenes de ventas y almacén columnar para las que entran o salen de 'paid'
+    prefetch_related_objects(
+        [order for order, previous in changed if 'paid' in (previous, new_status)], 'items'
+    )
+    for order, previous in changed:
+        notify_status_change(order, previous)
+
+    OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order_id=order.id,
+            event_type='order_updated',
+            changes=_event_changes(order, 'order_updated', ['status', 'updated_at', 'version']),
+            groups=order_groups(order, previous)
+        )
+        for order, previous in changed
+    ])
+    if changed:
+        orders_updated.send(
+            sender=Order, order_ids=[order.id for order, _ in changed],
+            changes={'status': new_status},
+            previous_statuses={order.id: previous for order, previous in changed}
+        )
+        schedule_dispatch()
+
+    updated_ids = {order.id for order, _ in changed}
+    rejected = [
+        (order_id, orders[order_id].status if order_id in orders else None)
+        for order_id in order_ids
+        if order_id not in updated_ids
+    ]
+    return [order for order, _ in changed], rejected
@@ -0,0 +1,89 @@
+import copy
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.dispatch import Signal, receiver
+from .models import Order, OrderItem
+
+# Se envía cuando una orden entra (paid=True) o sale (paid=False) del estado
+# 'paid', con sus líneas ya cargadas. La usan los resúmenes de ventas y el
+# almacén columnar. Si se edita una orden ya pagada (importe, mesa, camarero,
+# fecha o líneas) se envía paid=False con cómo estaba y paid=True con cómo queda.
+order_payment_changed = Signal()
+
+# Se envía cuando se modifican órdenes con UPDATE directo, sin pasar por save(),
+# con los ids afectados y, si se conocen, los cambios aplicados (changes) y el
+# estado previo de cada orden (previous_statuses). La usan la cola de cocina y
+# el estado del salón.
+orders_updated = Signal()
+
+
+def notify_status_change(order, previous_status, items=None):
+    if previous_status == order.status or 'paid' not in (previous_status, order.status):
+        return
+    if items is None:
+        items = list(order.items.all())
+    order_payment_changed.send(
+        sender=Order, order=order, paid=order.status == 'paid', items=items
+    )
+
+
+def sales_changed(order, loaded):
+    """Si cambió algún campo de ventas cargado respecto a loaded"""
+    current = order.sales_values()
+    return any(value is not None and current[field] != value for field, value in loaded.items())
+
+
+def notify_paid_order_changed(order, loaded, items_before=None, items_after=None):
+    """Restar una orden pagada como estaba (loaded, items_before) y sumarla como está"""
+    before = copy.copy(order)
+    for field, value in loaded.items():
+        if value is not None:
+            setattr(before, field, value)
+    if items_after is None:
+        items_after = list(order.items.all())
+    if items_before is None:
+        items_before = items_after
+    order_payment_changed.send(sender=Order, order=before, paid=False, items=items_before)
+    order_payment_changed.send(sender=Order, order=order, paid=True, items=items_after)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    previous_status = None if created else instance._loaded_status
+    loaded = instance._loaded_sales
+    instance._loaded_status = instance.status
+    instance._loaded_sales = instance.sales_values()
+    if previous_status == 'paid' == instance.status:
+        if sales_changed(instance, loaded):
+            notify_paid_order_changed(instance, loaded)
+    else:
+        notify_status_change(instance, previous_status)
+
+
+@receiver(pre_save, sender=OrderItem)
+@receiver(pre_delete, sender=OrderItem)
+def paid_item_changing(sender, instance, origin=None, **kwargs):
+    # Al borrar la orden entera, order_deleted ya la resta
+    if isinstance(origin, Order):
+        return
+    order = Order.objects.filter(pk=instance.order_id, status='paid').first()
+    if order is not None:
+        instance._paid_change = (order, list(order.items.all()))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def paid_item_changed(sender, instance, **kwargs):
+    change = instance.__dict__.pop('_paid_change', None)
+    if change is not None:
+        order, items_before = change
+        notify_paid_order_changed(order, order.sales_values(), items_before)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # pre_delete: las líneas todavía existen. Se consulta el estado guardado
+    # porque la instancia que se borra puede estar desactualizada.
+    if Order.objects.filter(pk=instance.pk, status='paid').exists():
+        order_payment_changed.send(
+            sender=Order, order=instance, paid=False, items=list(instance.items.all())
+        )
@@ -1,3 +1,1097 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from datetime import date, datetime
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from menu.models import Category, MenuItem, CustomizationOption, CustomizationChoice
+from restaurant.layers import SQLiteChannelLayer
+from restaurant.metrics import render_metrics
+from restaurant.replica import PIN_COOKIE, ReplicaRouter
+from users.auth import user_cache
+from .models import (
+    Table, Order, OrderItem, OrderEvent, FloorVersion, HourlySalesRollup, HourlyProductRollup
+)
+from .columnar import ColumnarStore, get_columnar_store, rebuild_columnar_store
+from .consumers import OrderConsumer
+from .demo_data import seed_restaurant
+from .dispatcher import dispatch_pending, dispatcher
+from .export import iter_export_chunks
+from .history import HOUR_WEIGHTS, HistoryGenerator
+from .kitchen import kitchen_queue
+from .rollups import rebuild_sales_rollups
+from .services import create_order, transition_orders, update_order
+from .topics import (
+    KITCHEN_GROUP, CASHIER_GROUP, waiter_group, table_group,
+    order_groups, subscription_groups, table_token
+)
 
-# Create your tests here.
+
+class OrderFixturesMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.waiter = User.objects.create_user(username='waiter', password='secret')
+        cls.table = Table.objects.create(number=1)
+        cls.category = Category.objects.create(name='Platos')
+        cls.burger = MenuItem.objects.create(
+            name='Hamburguesa', description='', price=Decimal('10.00'), category=cls.category
+        )
+        cls.juice = MenuItem.objects.create(
+            name='Jugo', description='', price=Decimal('3.50'), category=cls.category
+        )
+        option = CustomizationOption.objects.create(name='Extras', menu_item=cls.burger)
+        cls.cheese = CustomizationChoice.objects.create(
+            option=option, name='Queso', price_extra=Decimal('1.25')
+        )
+        cls.bacon = CustomizationChoice.objects.create(
+            option=option, name='Bacon', price_extra=Decimal('2.00')
+        )
+
+
+class CreateOrderTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+
+    def test_prices_and_customizations_are_batched(self):
+        payload = {
+            'table_id': self.table.id,
+            'items': [
+                {
+                    'menu_item_id': self.burger.id,
+                    'quantity': 2,
+                    'customization_ids': [self.cheese.id, self.bacon.id, self.cheese.id],
+                },
+                {'menu_item_id': self.juice.id, 'quantity': 1},
+            ],
+        }
+        response = self.client.post('/api/orders/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('30.00'))
+        burger_line = order.items.get(menu_item=self.burger)
+        self.assertEqual(burger_line.unit_price, Decimal('13.25'))
+        self.assertEqual(burger_line.total_price, Decimal('26.50'))
+        self.assertEqual(set(burger_line.customizations.all()), {self.cheese, self.bacon})
+
+    def test_query_count_does_not_grow_with_lines(self):
+        items = [
+            {'menu_item_id': self.burger.id, 'quantity': 1, 'customization_ids': [self.cheese.id]}
+            for _ in range(20)
+        ]
+        # table, productos, customizaciones, orden, líneas, tabla intermedia
+        with self.assertNumQueries(6):
+            create_order(self.table.id, self.waiter, items)
+
+    def test_unknown_menu_item_rolls_back(self):
+        payload = {'table_id': self.table.id, 'items': [{'menu_item_id': 999, 'quantity': 1}]}
+        response = self.client.post('/api/orders/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class OrderCursorPaginationTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        self.orders = [
+            Order.objects.create(
+                table=self.table, waiter=self.waiter,
+                status='paid' if index % 2 else 'pending'
+            )
+            for index in range(7)
+        ]
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_order_newest_first(self):
+        # Varias órdenes comparten created_at; el id desempata
+        Order.objects.update(created_at=self.orders[0].created_at)
+        ids = self.collect('/api/orders/orders/?page_size=3')
+        self.assertEqual(ids, sorted((order.id for order in self.orders), reverse=True))
+
+    def test_status_filter_is_kept_across_pages(self):
+        ids = self.collect('/api/orders/orders/?status=paid&page_size=2')
+        expected = [order.id for order in self.orders if order.status == 'paid']
+        self.assertEqual(sorted(ids), sorted(expected))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/orders/orders/?cursor=nope')
+        self.assertEqual(response.status_code, 404)
+
+
+class OrderListQueryTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+
+    def create_orders(self, count):
+        items = [
+            {'menu_item_id': self.burger.id, 'quantity': 1, 'customization_ids': [self.cheese.id]},
+            {'menu_item_id': self.juice.id, 'quantity': 2},
+        ]
+        for _ in range(count):
+            create_order(self.table.id, self.waiter, items)
+
+    def count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        for url in ['/api/orders/orders/', '/api/orders/orders/?view=compact']:
+            self.create_orders(2)
+            few = self.count_list_queries(url)
+            self.create_orders(8)
+            many = self.count_list_queries(url)
+            self.assertEqual(few, many, url)
+
+    def test_compact_view(self):
+        self.create_orders(1)
+        response = self.client.get('/api/orders/orders/?view=compact')
+        order = response.data['results'][0]
+        burger_line = next(item for item in order['items'] if item['menu_item'] == self.burger.id)
+        self.assertEqual(burger_line['menu_item_name'], 'Hamburguesa')
+        self.assertEqual(burger_line['customizations'], ['Queso'])
+        self.assertNotIn('updated_at', order)
+
+
+class OrderEventTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+
+    def test_status_change_records_delta(self):
+        since = self.client.get('/api/orders/orders/changes/').data['last_seq']
+        response = self.client.post('/api/orders/orders/', {
+            'table_id': self.table.id,
+            'items': [{'menu_item_id': self.juice.id, 'quantity': 1}],
+        }, format='json')
+        order_id = response.data['id']
+        self.client.post(f'/api/orders/orders/{order_id}/update_status/', {'status': 'ready'})
+        # Hasta que se publican no tienen seq
+        self.assertEqual(self.client.get(f'/api/orders/orders/changes/?since={since}').data['events'], [])
+        dispatch_pending()
+
+        data = self.client.get(f'/api/orders/orders/changes/?since={since}').data
+        created, updated = data['events']
+        self.assertEqual(created['type'], 'order_created')
+        self.assertEqual(created['changes']['items'][0]['menu_item_name'], 'Jugo')
+        self.assertEqual(updated['type'], 'order_updated')
+        self.assertEqual(updated['order_id'], order_id)
+        self.assertEqual(set(updated['changes']), {'status', 'updated_at', 'version'})
+        self.assertEqual(updated['changes']['status'], 'ready')
+        self.assertGreater(updated['seq'], created['seq'])
+        self.assertEqual(data['last_seq'], updated['seq'])
+
+        data = self.client.get(f'/api/orders/orders/changes/?since={since}&limit=1').data
+        self.assertTrue(data['has_more'])
+        self.assertEqual(data['last_seq'], created['seq'])
+
+    def test_changes_follow_the_subscription(self):
+        other_waiter = User.objects.create_user(username='other')
+        other_table = Table.objects.create(number=2)
+        since = self.client.get('/api/orders/orders/changes/').data['last_seq']
+        own = create_order(self.table.id, self.waiter, [{'menu_item_id': self.juice.id, 'quantity': 1}])
+        other = create_order(other_table.id, other_waiter, [{'menu_item_id': self.juice.id, 'quantity': 1}])
+        for order in (own, other):
+            OrderEvent.objects.create(order_id=order.id, event_type='order_created', groups=order_groups(order))
+        dispatch_pending()
+
+        def changes(query=''):
+            return self.client.get(f'/api/orders/orders/changes/?since={since}&{query}')
+
+        data = changes().data
+        self.assertEqual([event['order_id'] for event in data['events']], [own.id])
+        self.assertEqual(data['last_seq'], since + 2)
+        table_events = changes(f'topic=table&table_id={other_table.id}').data['events']
+        self.assertEqual([event['order_id'] for event in table_events], [other.id])
+        self.assertEqual(changes(f'topic=waiter&waiter_id={other_waiter.id}').status_code, 403)
+        self.assertEqual(changes('topic=cashier').status_code, 403)
+
+    def test_late_commit_gets_a_later_seq(self):
+        # Dos transacciones: la del id menor confirma después que la otra
+        groups = [waiter_group(self.waiter.id)]
+        late = OrderEvent.objects.create(order_id=1, event_type='order_updated', groups=groups)
+        early = OrderEvent.objects.create(order_id=2, event_type='order_updated', groups=groups)
+        with mock.patch('orders.dispatcher._pending_events', return_value=[early]):
+            dispatch_pending()
+        since = self.client.get('/api/orders/orders/changes/').data['last_seq']
+        dispatch_pending()
+
+        data = self.client.get(f'/api/orders/orders/changes/?since={since}').data
+        self.assertEqual([event['order_id'] for event in data['events']], [late.order_id])
+        self.assertEqual(data['last_seq'], since + 1)
+
+
+class OrderTopicTests(OrderFixturesMixin, APITestCase):
+    def test_subscription_by_role(self):
+        cashier = User.objects.create_user(username='cashier')
+        cashier.profile.role = 'cashier'
+        cashier.profile.save()
+
+        self.assertEqual(subscription_groups(cashier, {}), [CASHIER_GROUP])
+        self.assertEqual(subscription_groups(self.waiter, {}), [waiter_group(self.waiter.id)])
+        self.assertEqual(subscription_groups(self.waiter, {'topic': 'kitchen'}), [KITCHEN_GROUP])
+        self.assertEqual(subscription_groups(self.waiter, {'topic': 'cashier'}), [])
+        self.assertEqual(
+            subscription_groups(self.waiter, {'topic': 'waiter', 'waiter_id': str(cashier.id)}), []
+        )
+        self.assertEqual(
+            subscription_groups(cashier, {'topic': 'waiter', 'waiter_id': str(self.waiter.id)}),
+            [waiter_group(self.waiter.id)]
+        )
+        self.assertEqual(subscription_groups(AnonymousUser(), {}), [])
+
+    def test_anonymous_table_topic_needs_that_tables_token(self):
+        anonymous = AnonymousUser()
+        params = {'topic': 'table', 'table_id': '3'}
+        self.assertEqual(subscription_groups(anonymous, params), [])
+        self.assertEqual(subscription_groups(anonymous, dict(params, table_token='falso')), [])
+        self.assertEqual(subscription_groups(anonymous, dict(params, table_token=table_token(4))), [])
+        self.assertEqual(
+            subscription_groups(anonymous, dict(params, table_token=table_token(3))), [table_group(3)]
+        )
+        # El personal con sesión no necesita token
+        self.assertEqual(subscription_groups(self.waiter, params), [table_group(3)])
+
+        async def connect(query_string):
+            communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), f'/ws/orders/?{query_string}')
+            communicator.scope['user'] = anonymous
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+
+        self.assertFalse(async_to_sync(connect)('topic=table&table_id=3'))
+        self.assertTrue(async_to_sync(connect)(f'topic=table&table_id=3&table_token={table_token(3)}'))
+
+    def test_kitchen_only_hears_about_active_orders(self):
+        order = Order(table=self.table, waiter=self.waiter, status='preparing')
+        self.assertIn(KITCHEN_GROUP, order_groups(order))
+        order.status = 'served'
+        self.assertIn(KITCHEN_GROUP, order_groups(order, previous_status='ready'))
+        order.status = 'paid'
+        self.assertEqual(
+            order_groups(order, previous_status='served'),
+            [CASHIER_GROUP, waiter_group(self.waiter.id), table_group(self.table.id)]
+        )
+
+
+class OrderConsumerTests(SimpleTestCase):
+    async def connect(self, query_string):
+        communicator = WebsocketCommunicator(OrderConsumer.as_asgi(), f'/ws/orders/?{query_string}')
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def test_table_socket_receives_only_its_table(self):
+        async def scenario():
+            own, connected = await self.connect(f'topic=table&table_id=1&table_token={table_token(1)}')
+            self.assertTrue(connected)
+            other, _ = await self.connect(f'topic=table&table_id=2&table_token={table_token(2)}')
+
+            event = {'type': 'order_updated', 'seq': 1, 'order_id': 5, 'changes': {'status': 'ready'}}
+            await get_channel_layer().group_send(
+                table_group(1), {'type': 'order_event', 'event': event}
+            )
+            self.assertEqual(await own.receive_json_from(), event)
+            self.assertTrue(await other.receive_nothing())
+            self.assertIn('websocket_active_connections{consumer="OrderConsumer"} 2', render_metrics())
+            await own.disconnect()
+            await other.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_anonymous_without_topic_is_rejected(self):
+        async def scenario():
+            communicator, connected = await self.connect('')
+            self.assertFalse(connected)
+
+        async_to_sync(scenario)()
+
+
+class OrderOutboxTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(CASHIER_GROUP, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.channel_layer.group_discard)(CASHIER_GROUP, self.channel)
+
+    def receive(self):
+        return async_to_sync(self.channel_layer.receive)(self.channel)['event']
+
+    def test_events_are_published_after_commit_and_coalesced(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/orders/orders/', {
+                'table_id': self.table.id,
+                'items': [{'menu_item_id': self.juice.id, 'quantity': 1}],
+            }, format='json')
+        self.assertIn(dispatcher.wake, callbacks)
+        order_id = response.data['id']
+        for new_status in ['confirmed', 'preparing']:
+            self.client.post(f'/api/orders/orders/{order_id}/update_status/', {'status': new_status})
+
+        self.assertEqual(OrderEvent.objects.filter(dispatched=False).count(), 3)
+        self.assertEqual(dispatch_pending(), 3)
+
+        message = self.receive()
+        last_event = OrderEvent.objects.latest('id')
+        self.assertEqual(message['type'], 'order_created')
+        self.assertEqual(message['seq'], last_event.seq)
+        self.assertEqual(message['changes']['status'], 'preparing')
+        self.assertEqual(message['changes']['items'][0]['menu_item_name'], 'Jugo')
+        self.assertFalse(OrderEvent.objects.filter(dispatched=False).exists())
+        self.assertEqual(dispatch_pending(), 0)
+
+    def test_events_claimed_by_another_worker_are_not_resent(self):
+        for order_id in (1, 2):
+            OrderEvent.objects.create(order_id=order_id, event_type='order_updated', groups=[CASHIER_GROUP])
+        # Lectura de este worker, y después otro worker reclama el primero
+        stale_read = list(OrderEvent.objects.all())
+        OrderEvent.objects.filter(order_id=1).update(dispatched=True)
+        with mock.patch('orders.dispatcher._pending_events', return_value=stale_read):
+            self.assertEqual(dispatch_pending(), 0)
+        self.assertEqual(OrderEvent.objects.filter(dispatched=False).count(), 1)
+        self.assertEqual(dispatch_pending(), 1)
+        # Lo primero que llega es el segundo: el reclamado por el otro worker no se envió
+        self.assertEqual(self.receive()['order_id'], 2)
+
+    def test_publishing_happens_after_the_claim_commits(self):
+        OrderEvent.objects.create(order_id=1, event_type='order_updated', groups=[CASHIER_GROUP])
+        outer = len(connection.atomic_blocks)
+        depths = []
+
+        def send(channel_layer, group, payload):
+            depths.append(len(connection.atomic_blocks))
+            return True
+
+        with mock.patch('orders.dispatcher._send', side_effect=send):
+            self.assertEqual(dispatch_pending(), 1)
+        # Sin transacción abierta (ni el bloqueo de la secuencia) durante el envío
+        self.assertEqual(depths, [outer])
+
+    def test_failed_sends_go_back_to_pending(self):
+        OrderEvent.objects.create(order_id=1, event_type='order_updated', groups=[CASHIER_GROUP])
+        with mock.patch.object(get_channel_layer(), 'group_send', side_effect=ChannelFull), \
+                mock.patch('orders.dispatcher.time.sleep'), self.assertLogs('orders.dispatcher', 'ERROR'):
+            self.assertEqual(dispatch_pending(), 1)
+        event = OrderEvent.objects.get()
+        self.assertFalse(event.dispatched)
+        self.assertIsNone(event.seq)
+
+        self.assertEqual(dispatch_pending(), 1)
+        self.assertEqual(self.receive()['order_id'], 1)
+
+    def test_rolled_back_order_is_never_announced(self):
+        response = self.client.post('/api/orders/orders/', {
+            'table_id': self.table.id,
+            'items': [{'menu_item_id': 999, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderEvent.objects.exists())
+
+
+class SalesRollupTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        items = [
+            {'menu_item_id': self.burger.id, 'quantity': 2, 'customization_ids': [self.cheese.id]},
+            {'menu_item_id': self.juice.id, 'quantity': 1},
+        ]
+        self.orders = [create_order(self.table.id, self.waiter, items) for _ in range(3)]
+
+    def pay(self, order, new_status='paid'):
+        self.client.post(f'/api/orders/orders/{order.id}/update_status/', {'status': new_status})
+
+    def test_rollups_follow_paid_transitions(self):
+        for order in self.orders:
+            self.pay(order)
+        self.pay(self.orders[0], 'served')
+
+        sales = HourlySalesRollup.objects.get()
+        self.assertEqual(sales.order_count, 2)
+        self.assertEqual(sales.revenue, Decimal('52.00'))
+        burger = HourlyProductRollup.objects.get(menu_item=self.burger)
+        self.assertEqual((burger.quantity, burger.revenue, burger.order_count), (4, Decimal('45.00'), 2))
+
+        self.orders[1].delete()
+        self.assertEqual(HourlySalesRollup.objects.get().order_count, 1)
+
+        def snapshot():
+            return (
+                list(HourlySalesRollup.objects.values_list('hour', 'waiter', 'table', 'order_count', 'revenue')),
+                list(HourlyProductRollup.objects.order_by('menu_item').values_list(
+                    'hour', 'menu_item', 'quantity', 'revenue', 'order_count'
+                )),
+            )
+
+        incremental = snapshot()
+        rebuild_sales_rollups()
+        self.assertEqual(snapshot(), incremental)
+
+    def test_editing_paid_orders_keeps_rollups_exact(self):
+        for order in self.orders:
+            self.pay(order)
+        other_table = Table.objects.create(number=7)
+
+        # Por la API: importe y mesa de una orden ya pagada
+        response = self.client.patch(f'/api/orders/orders/{self.orders[0].id}/', {
+            'total_amount': '30.00', 'table': other_table.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Por el ORM (p. ej. el admin): el camarero, y las líneas
+        order = Order.objects.get(pk=self.orders[1].pk)
+        order.waiter = User.objects.create_user(username='otro')
+        order.save()
+        item = order.items.get(menu_item=self.juice)
+        item.quantity = 3
+        item.save()
+        order.items.get(menu_item=self.burger).delete()
+        # Cambios que no tocan las ventas no generan nada
+        order.notes = 'sin sal'
+        order.save()
+
+        def snapshot():
+            return (
+                sorted(HourlySalesRollup.objects.values_list('hour', 'waiter', 'table', 'order_count', 'revenue')),
+                sorted(HourlyProductRollup.objects.values_list(
+                    'hour', 'menu_item', 'quantity', 'revenue', 'order_count'
+                )),
+            )
+
+        incremental = snapshot()
+        rebuild_sales_rollups()
+        self.assertEqual(snapshot(), incremental)
+        self.assertEqual(
+            HourlySalesRollup.objects.get(table=other_table).revenue, Decimal('30.00')
+        )
+
+    def test_economics_answers_from_rollups(self):
+        for order in self.orders[:2]:
+            self.pay(order)
+
+        stats = self.client.get('/api/orders/economics/financial_stats/').data
+        self.assertEqual(stats['order_count'], 2)
+        self.assertEqual(stats['total_revenue'], 52.0)
+        self.assertEqual(stats['average_order_value'], 26.0)
+
+        products = self.client.get('/api/orders/economics/product_analytics/').data
+        self.assertEqual(products['top_products'][0]['product_name'], 'Hamburguesa')
+        self.assertEqual(products['top_products'][0]['order_count'], 2)
+
+        waiters = self.client.get('/api/orders/economics/waiter_performance/').data
+        self.assertEqual(waiters[0]['total_orders'], 2)
+        self.assertEqual(waiters[0]['tables_served'], 1)
+
+        temporal = self.client.get('/api/orders/economics/temporal_analytics/?period=hour').data
+        self.assertEqual(temporal[0]['average_order_value'], 26.0)
+
+
+class FinancialStatsTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        items = [{'menu_item_id': self.juice.id, 'quantity': 2}]
+        placed = [
+            (datetime(2025, 3, 1, 13, 10), 'paid'),
+            (datetime(2025, 3, 4, 20, 5), 'paid'),
+            (datetime(2025, 3, 5, 20, 45), 'paid'),
+            (datetime(2025, 3, 5, 21, 0), 'paid'),
+            (datetime(2025, 3, 5, 21, 30), 'served'),
+        ]
+        for created_at, order_status in placed:
+            order = create_order(self.table.id, self.waiter, items)
+            Order.objects.filter(pk=order.pk).update(created_at=created_at, status=order_status)
+        rebuild_sales_rollups()
+
+    def test_single_query(self):
+        url = '/api/orders/economics/financial_stats/?date_from=2025-03-04&date_to=2025-03-05&period=day'
+        with self.assertNumQueries(1):
+            data = self.client.get(url).data
+
+        self.assertEqual(data['order_count'], 3)
+        self.assertEqual(data['total_revenue'], 21.0)
+        self.assertEqual(data['average_order_value'], 7.0)
+        # Período anterior (2 y 3 de marzo) sin ventas
+        self.assertEqual(data['revenue_growth'], 100.0)
+        self.assertEqual(data['best_selling_hour'], '20:00')
+        self.assertEqual(data['revenue_by_period'], [
+            {'period': '2025-03-04', 'revenue': 7.0},
+            {'period': '2025-03-05', 'revenue': 14.0},
+        ])
+
+    def test_growth_against_previous_window(self):
+        url = '/api/orders/economics/financial_stats/?date_from=2025-03-02&date_to=2025-03-05&period=month'
+        data = self.client.get(url).data
+        # 21 frente a 7 en los cuatro días anteriores
+        self.assertEqual(data['revenue_growth'], 200.0)
+        self.assertEqual(data['revenue_by_period'], [{'period': '2025-03-01', 'revenue': 21.0}])
+
+
+class ColumnarEngineTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(ANALYTICS_STORE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        other_table = Table.objects.create(number=2)
+        placed = [
+            (datetime(2025, 3, 3, 13, 10), self.table, [self.burger, self.juice]),
+            (datetime(2025, 3, 4, 20, 5), other_table, [self.burger]),
+            (datetime(2025, 3, 4, 20, 40), self.table, [self.juice, self.juice]),
+            (datetime(2025, 3, 12, 9, 0), other_table, [self.juice]),
+        ]
+        self.orders = []
+        for created_at, table, menu_items in placed:
+            items = [{'menu_item_id': menu_item.id, 'quantity': 1} for menu_item in menu_items]
+            order = create_order(table.id, self.waiter, items)
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            self.orders.append(order)
+
+        # Solo interesan los callbacks del almacén; el despachador no debe arrancar
+        with mock.patch.object(dispatcher, 'wake'), self.captureOnCommitCallbacks(execute=True):
+            for order in self.orders:
+                self.client.post(f'/api/orders/orders/{order.id}/update_status/', {'status': 'paid'})
+            self.client.post(f'/api/orders/orders/{self.orders[2].id}/update_status/', {'status': 'served'})
+
+    def test_columnar_matches_rollups(self):
+        urls = [
+            '/api/orders/economics/financial_stats/?date_from=2025-03-04&date_to=2025-03-12&period=week',
+            '/api/orders/economics/financial_stats/?date_from=2025-03-01&date_to=2025-03-31&period=day',
+            '/api/orders/economics/temporal_analytics/?period=hour',
+            '/api/orders/economics/temporal_analytics/?period=month',
+            '/api/orders/economics/waiter_performance/',
+            '/api/orders/economics/product_analytics/?date_from=2025-03-01&date_to=2025-03-05',
+        ]
+        for url in urls:
+            expected = self.client.get(url)
+            columnar = self.client.get(url + '&engine=columnar' if '?' in url else url + '?engine=columnar')
+            self.assertEqual(expected.status_code, 200, url)
+            self.assertEqual(columnar.data, expected.data, url)
+
+    def test_default_window_counts_the_boundary_hour_in_both_engines(self):
+        url = '/api/orders/economics/financial_stats/'
+        # Hace 30 días fueron las 13:05: la orden de las 13:10 entra en los dos motores
+        with mock.patch('django.utils.timezone.now', return_value=datetime(2025, 4, 2, 13, 5)):
+            expected = self.client.get(url).data
+            columnar = self.client.get(url + '?engine=columnar').data
+        self.assertEqual(columnar, expected)
+        self.assertEqual(expected['order_count'], 3)
+
+    def test_rebuild_matches_incremental(self):
+        store = get_columnar_store()
+        url = '/api/orders/economics/product_analytics/?engine=columnar'
+        incremental = self.client.get(url).data
+        rebuild_columnar_store(store, chunk_size=2)
+        self.assertEqual(self.client.get(url).data, incremental)
+
+    def test_readers_never_see_a_partial_rebuild(self):
+        store = get_columnar_store()
+        url = '/api/orders/economics/product_analytics/?engine=columnar'
+        expected = self.client.get(url).data
+        self.assertTrue(expected['top_products'])
+        seen = []
+        append = ColumnarStore.append_orders
+
+        def append_and_read(staging, orders, items):
+            append(staging, orders, items)
+            # Una lectura entre bloques de la regeneración
+            seen.append(self.client.get(url).data)
+
+        with mock.patch.object(ColumnarStore, 'append_orders', append_and_read):
+            rebuild_columnar_store(store, chunk_size=1)
+        self.assertTrue(seen)
+        self.assertEqual(seen, [expected] * len(seen))
+        self.assertEqual(self.client.get(url).data, expected)
+        self.assertFalse(os.path.exists(os.path.join(store.directory, '.rebuild')))
+
+    def test_reads_share_the_lock(self):
+        store = get_columnar_store()
+        # Si las lecturas fueran en serie, la segunda no entraría mientras la primera espera
+        both_inside = threading.Barrier(2, timeout=5)
+
+        def read():
+            with store.locked():
+                both_inside.wait()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        read()
+        reader.join()
+
+    def test_unconfigured_engine(self):
+        with override_settings(ANALYTICS_STORE_DIR=''):
+            response = self.client.get('/api/orders/economics/waiter_performance/?engine=columnar')
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        items = [
+            {'menu_item_id': self.burger.id, 'quantity': 1, 'customization_ids': [self.cheese.id, self.bacon.id]},
+            {'menu_item_id': self.juice.id, 'quantity': 3},
+        ]
+        self.orders = [create_order(self.table.id, self.waiter, items) for _ in range(5)]
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_lines(self):
+        with mock.patch('orders.export.CHUNK_SIZE', 3):
+            self.assertEqual([len(chunk) for chunk in iter_export_chunks('lines')], [3, 3, 3, 1])
+            response = self.client.get('/api/orders/economics/export/?level=lines')
+            rows = list(csv.DictReader(io.StringIO(self.content(response))))
+        self.assertEqual(len(rows), 10)
+        # Las customizaciones se cargan bloque a bloque: todas las hamburguesas las llevan
+        burgers = [row for row in rows if row['menu_item'] == 'Hamburguesa']
+        self.assertEqual([row['customizations'] for row in burgers], ['Queso|Bacon'] * 5)
+        self.assertEqual(burgers[0]['unit_price'], '13.25')
+
+    def test_ndjson_orders(self):
+        response = self.client.get('/api/orders/economics/export/?export_format=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        orders = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([order['id'] for order in orders], [order.id for order in self.orders])
+        self.assertEqual(orders[0]['total_amount'], '23.75')
+
+    def test_invalid_parameters(self):
+        response = self.client.get('/api/orders/economics/export/?export_format=xlsx')
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch.object(dispatcher, 'wake')
+class KitchenQueueTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        kitchen_queue.invalidate()
+        self.addCleanup(kitchen_queue.invalidate)
+        MenuItem.objects.filter(pk=self.juice.pk).update(preparation_time=5)
+
+    def create(self, menu_item):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/orders/', {
+                'table_id': self.table.id,
+                'items': [{'menu_item_id': menu_item.id, 'quantity': 1}],
+            }, format='json')
+        return response.data['id']
+
+    def test_ranked_by_eta_and_kept_in_sync(self, wake):
+        burger_order = self.create(self.burger)
+        response = self.client.get('/api/orders/orders/kitchen/')
+        self.assertEqual([entry['id'] for entry in response.data], [burger_order])
+
+        # La bebida es más nueva pero sale antes
+        juice_order = self.create(self.juice)
+        with self.assertNumQueries(0):
+            queue = kitchen_queue.snapshot()
+        self.assertEqual([entry['id'] for entry in queue], [juice_order, burger_order])
+        self.assertEqual(queue[1]['preparation_time'], 15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f'/api/orders/orders/{juice_order}/update_status/', {'status': 'served'}, format='json'
+            )
+        self.assertEqual([entry['id'] for entry in kitchen_queue.snapshot()], [burger_order])
+
+    def test_picks_up_changes_from_other_processes(self, wake):
+        order_id = self.create(self.burger)
+        kitchen_queue.snapshot()
+        # Cambio sin señales locales, solo visible a través del outbox
+        Order.objects.filter(pk=order_id).update(status='cancelled')
+        OrderEvent.objects.create(order_id=order_id, event_type='order_updated')
+        dispatch_pending()
+        with mock.patch.object(kitchen_queue, 'sync_interval', 0):
+            self.assertEqual(kitchen_queue.snapshot(), [])
+
+
+class FloorTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        cache.clear()
+        self.free_table = Table.objects.create(number=2)
+        items = [{'menu_item_id': self.juice.id, 'quantity': 2}]
+        self.orders = [create_order(self.table.id, self.waiter, items) for _ in range(2)]
+        paid = create_order(self.table.id, self.waiter, items)
+        paid.status = 'paid'
+        paid.save()
+
+    def test_derived_state_is_cached_until_orders_change(self):
+        # Versión y agregado
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/tables/floor/')
+        occupied, free = response.data
+        self.assertEqual(occupied['open_orders'], 2)
+        self.assertEqual(occupied['running_total'], '14.00')
+        self.assertTrue(occupied['is_occupied'])
+        self.assertEqual(occupied['minutes_seated'], 0)
+        self.assertEqual(free['open_orders'], 0)
+        self.assertFalse(free['is_occupied'])
+        self.assertIsNone(free['minutes_seated'])
+
+        # Solo la versión
+        with self.assertNumQueries(1):
+            self.client.get('/api/orders/tables/floor/')
+
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(dispatcher, 'wake'):
+            self.client.post(
+                f'/api/orders/orders/{self.orders[0].id}/update_status/', {'status': 'paid'}, format='json'
+            )
+        occupied = self.client.get('/api/orders/tables/floor/').data[0]
+        self.assertEqual(occupied['open_orders'], 1)
+        self.assertEqual(occupied['running_total'], '7.00')
+
+    def test_version_is_shared_between_processes(self):
+        self.client.get('/api/orders/tables/floor/')
+        # Otro worker confirma un cambio y sube la versión; la caché de este
+        # proceso no se entera, solo la fila de la base de datos
+        self.orders[0].status = 'paid'
+        self.orders[0].save()
+        FloorVersion.objects.filter(pk=1).update(value=F('value') + 1)
+
+        occupied = self.client.get('/api/orders/tables/floor/').data[0]
+        self.assertEqual(occupied['open_orders'], 1)
+
+    def floor_bumped(self, change):
+        """Si change, confirmado, sube la versión del salón"""
+        version = FloorVersion.objects.values_list('value', flat=True).first()
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(dispatcher, 'wake'):
+            with transaction.atomic():
+                change(Order.objects.get(pk=self.orders[0].pk))
+        return FloorVersion.objects.values_list('value', flat=True).first() != version
+
+    def test_only_changes_shown_on_the_floor_bump_the_version(self):
+        def edit_notes(order):
+            order.notes = 'sin sal'
+            order.save()
+        self.assertFalse(self.floor_bumped(edit_notes))
+        self.assertFalse(self.floor_bumped(
+            lambda order: update_order(order, {'notes': 'sin hielo'}, order.version)
+        ))
+        # Sigue abierta: el salón solo cuenta órdenes abiertas
+        self.assertFalse(self.floor_bumped(
+            lambda order: transition_orders([order.id], 'confirmed')
+        ))
+        self.assertTrue(self.floor_bumped(
+            lambda order: update_order(order, {'table': self.free_table}, order.version)
+        ))
+        self.assertTrue(self.floor_bumped(
+            lambda order: transition_orders([order.id], 'cancelled')
+        ))
+        # Ya cerrada, nada de lo que se edite aparece en el salón
+        self.assertFalse(self.floor_bumped(edit_notes))
+
+
+class BulkStatusTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        items = [{'menu_item_id': self.juice.id, 'quantity': 1}]
+        self.orders = [create_order(self.table.id, self.waiter, items) for _ in range(3)]
+        Order.objects.filter(pk=self.orders[2].pk).update(status='cancelled')
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(CASHIER_GROUP, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.channel_layer.group_discard)(CASHIER_GROUP, self.channel)
+
+    def test_single_update_and_one_notification(self):
+        ids = [order.id for order in self.orders] + [999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/orders/orders/bulk_status/', {'ids': ids, 'status': 'paid'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], [self.orders[0].id, self.orders[1].id])
+        self.assertEqual(
+            [(entry['id'], entry['status']) for entry in response.data['rejected']],
+            [(self.orders[2].id, 'cancelled'), (999, None)]
+        )
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "orders_order"')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(HourlySalesRollup.objects.get().order_count, 2)
+        self.assertEqual(dispatch_pending(), 2)
+        message = async_to_sync(self.channel_layer.receive)(self.channel)
+        self.assertEqual(message['type'], 'order_events')
+        self.assertEqual([event['changes']['status'] for event in message['events']], ['paid', 'paid'])
+
+    def test_state_machine_rejects_going_back(self):
+        self.client.post('/api/orders/orders/bulk_status/', {
+            'ids': [self.orders[0].id], 'status': 'paid'
+        }, format='json')
+        response = self.client.post(
+            f'/api/orders/orders/{self.orders[0].id}/update_status/', {'status': 'pending'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).status, 'paid')
+
+
+class OrderVersionTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.waiter)
+        self.order = create_order(self.table.id, self.waiter, [{'menu_item_id': self.juice.id, 'quantity': 1}])
+
+    def test_stale_version_is_rejected(self):
+        url = f'/api/orders/orders/{self.order.id}/update_status/'
+        response = self.client.post(url, {'status': 'confirmed', 'version': 1})
+        self.assertEqual(response.data['version'], 2)
+
+        # Otro cliente que todavía tiene la versión 1
+        response = self.client.post(url, {'status': 'cancelled', 'version': 1})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'confirmed')
+
+    def test_status_change_skips_the_serializer_graph(self):
+        # Sin categorías ni opciones de customización: la orden y sus líneas compactas
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/orders/orders/{self.order.id}/update_status/', {'status': 'confirmed'})
+        self.assertEqual(response.data['order']['status'], 'confirmed')
+        self.assertEqual(response.data['order']['items'][0]['menu_item_name'], 'Jugo')
+        tables = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('menu_category', tables)
+        self.assertNotIn('menu_customizationoption', tables)
+
+    def test_update_writes_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/orders/orders/{self.order.id}/', {'notes': 'Sin hielo', 'version': 1}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 2)
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE "orders_order"'))
+        self.assertIn('"notes"', update)
+        self.assertNotIn('"total_amount"', update)
+        self.assertNotIn('"status"', update)
+        self.assertEqual(OrderEvent.objects.get().changes['notes'], 'Sin hielo')
+
+
+@mock.patch.object(dispatcher, 'wake')
+class AsyncReadViewTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        kitchen_queue.invalidate()
+        self.addCleanup(kitchen_queue.invalidate)
+        user_cache.clear()
+        create_order(self.table.id, self.waiter, [{'menu_item_id': self.burger.id, 'quantity': 1}])
+        token = RefreshToken.for_user(self.waiter).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_kitchen_served_from_memory_once_loaded(self, wake):
+        # La primera lectura carga la cola por la vista DRF
+        loaded = self.client.get('/api/orders/orders/kitchen/').json()
+        self.assertEqual(len(loaded), 1)
+
+        # Después sin consultas: el usuario del token ya está en la caché de users.auth
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/orders/orders/kitchen/')
+        self.assertFalse(hasattr(response, 'data'))
+        self.assertEqual(
+            [entry['id'] for entry in response.json()], [entry['id'] for entry in loaded]
+        )
+
+        # Sin token válido o con la cola pendiente de sincronizar, la vista DRF de siempre
+        with mock.patch.object(kitchen_queue, 'sync_interval', 0):
+            self.assertIsNone(kitchen_queue.try_snapshot())
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalido')
+        self.assertEqual(self.client.get('/api/orders/orders/kitchen/').status_code, 401)
+
+    def test_order_reads_keep_drf_behaviour(self, wake):
+        order = Order.objects.get()
+        response = self.client.get(f'/api/orders/orders/{order.id}/')
+        self.assertEqual(response.data['id'], order.id)
+        self.assertEqual(self.client.get('/api/orders/orders/?view=compact').data['results'][0]['id'], order.id)
+        self.assertEqual(self.client.get('/api/orders/orders/999999/').status_code, 404)
+        self.client.credentials()
+        self.assertEqual(self.client.get('/api/orders/tables/').status_code, 401)
+
+class ReplicaRoutingTests(OrderFixturesMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.waiter)
+        # Sin alias real de réplica: se registra a dónde iría cada lectura y se lee de default
+        self.routed = []
+        route = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            self.routed.append(route(router, model, **hints))
+            return None
+
+        patches = [
+            mock.patch('restaurant.replica.replica_available', return_value=True),
+            mock.patch.object(ReplicaRouter, 'db_for_read', spy),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_economics_reads_replica_until_user_writes(self):
+        self.client.get('/api/orders/economics/financial_stats/')
+        self.assertEqual(set(self.routed), {'replica'})
+
+        # Las lecturas de las órdenes nunca van a la réplica
+        self.routed.clear()
+        self.client.post('/api/orders/orders/', {
+            'table_id': self.table.id,
+            'items': [{'menu_item_id': self.juice.id, 'quantity': 1}],
+        }, format='json')
+        self.assertNotIn('replica', self.routed)
+
+        # Tras escribir, sus estadísticas salen de la principal
+        self.routed.clear()
+        self.client.get('/api/orders/economics/financial_stats/')
+        self.assertTrue(self.routed)
+        self.assertNotIn('replica', self.routed)
+
+    def test_pin_is_a_signed_cookie_for_that_user(self):
+        self.client.post('/api/orders/orders/', {
+            'table_id': self.table.id,
+            'items': [{'menu_item_id': self.juice.id, 'quantity': 1}],
+        }, format='json')
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+        # La cookie no sirve para otro usuario ni manipulada
+        other = User.objects.create_user(username='otro', password='secret')
+        self.client.force_authenticate(other)
+        self.routed.clear()
+        self.client.get('/api/orders/economics/financial_stats/')
+        self.assertIn('replica', self.routed)
+
+        self.client.force_authenticate(self.waiter)
+        self.client.cookies[PIN_COOKIE] = str(self.waiter.pk)
+        self.routed.clear()
+        self.client.get('/api/orders/economics/financial_stats/')
+        self.assertIn('replica', self.routed)
+
+    def test_only_anonymous_menu_reads_use_replica(self):
+        self.client.get(f'/api/menu/items/{self.juice.id}/')
+        self.assertNotIn('replica', self.routed)
+        self.client.force_authenticate(None)
+        self.client.get(f'/api/menu/items/{self.juice.id}/')
+        self.assertIn('replica', self.routed)
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/channels.sqlite3'
+
+    def test_group_send_reaches_other_processes(self):
+        async def scenario():
+            # Dos instancias sobre el mismo fichero, como dos workers
+            worker, sender = SQLiteChannelLayer(self.path), SQLiteChannelLayer(self.path)
+            channel = await worker.new_channel()
+            other = await worker.new_channel()
+            await worker.group_add(KITCHEN_GROUP, channel)
+            await sender.group_send(KITCHEN_GROUP, {'type': 'order_event', 'event': {'seq': 1}, 'raw': b'\x00'})
+            message = await asyncio.wait_for(worker.receive(channel), 2)
+            self.assertEqual(message, {'type': 'order_event', 'event': {'seq': 1}, 'raw': b'\x00'})
+
+            await worker.group_discard(KITCHEN_GROUP, channel)
+            await sender.group_send(KITCHEN_GROUP, {'type': 'order_event'})
+            await sender.send(other, {'type': 'direct'})
+            self.assertEqual((await asyncio.wait_for(worker.receive(other), 2))['type'], 'direct')
+            self.assertTrue(worker._queues[channel].empty())
+
+        async_to_sync(scenario)()
+
+    def test_capacity_and_expiry(self):
+        async def scenario():
+            layer = SQLiteChannelLayer(self.path, capacity=2, expiry=1)
+            for _ in range(2):
+                await layer.send('worker.tasks', {'type': 'task'})
+            with self.assertRaises(ChannelFull):
+                await layer.send('worker.tasks', {'type': 'task'})
+            self.assertEqual(await layer.receive('worker.tasks'), {'type': 'task'})
+
+            with mock.patch('restaurant.layers.time.time', return_value=time.time() + 5):
+                await layer.send('worker.tasks', {'type': 'fresh'})
+                self.assertEqual(await layer.receive('worker.tasks'), {'type': 'fresh'})
+
+        async_to_sync(scenario)()
+
+
+class MetricsTests(OrderFixturesMixin, APITestCase):
+    def sample(self, text, line_prefix):
+        line = next(line for line in text.splitlines() if line.startswith(line_prefix))
+        return float(line.rsplit(' ', 1)[1])
+
+    def test_per_view_metrics(self):
+        self.client.force_authenticate(self.waiter)
+        before = render_metrics()
+        prefix = 'http_db_queries_count{view="OrderViewSet.list"}'
+        previous = self.sample(before, prefix) if prefix in before else 0
+        create_order(self.table.id, self.waiter, [{'menu_item_id': self.juice.id, 'quantity': 1}])
+        self.client.get('/api/orders/orders/')
+
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_requests_total{view="OrderViewSet.list",method="GET",status="200"}', text)
+        self.assertEqual(self.sample(text, prefix), previous + 1)
+        self.assertGreater(self.sample(text, 'http_db_queries_sum{view="OrderViewSet.list"}'), 0)
+        self.assertGreater(self.sample(text, 'http_serializer_duration_seconds_sum{view="OrderViewSet.list"}'), 0)
+        self.assertIn('http_db_queries_bucket{view="OrderViewSet.list",le="+Inf"}', text)
+
+
+class HistoryGeneratorTests(APITestCase):
+    def generator(self, data, seed=7):
+        menu_items = MenuItem.objects.prefetch_related('customization_options__choices')
+        return HistoryGenerator(menu_items, data['tables'], data['waiters'], seed=seed)
+
+    def test_history_prices_and_determinism(self):
+        data = seed_restaurant(tables=4, waiters=2, cashiers=0)
+        day = date(2024, 3, 1)
+        self.assertEqual(
+            self.generator(data).orders_for_day(day, 20), self.generator(data).orders_for_day(day, 20)
+        )
+
+        counts = self.generator(data).generate(day, 3, 20, batch_size=25)
+        self.assertEqual(Order.objects.count(), counts['orders'])
+        self.assertEqual(OrderItem.customizations.through.objects.count(), counts['customizations'])
+        orders = Order.objects.prefetch_related('items__menu_item', 'items__customizations')
+        for order in orders:
+            self.assertIn(order.created_at.hour, HOUR_WEIGHTS)
+            self.assertEqual(order.created_at.date().isoformat()[:7], '2024-03')
+            self.assertEqual(order.total_amount, sum(item.total_price for item in order.items.all()))
+            for item in order.items.all():
+                extras = sum(choice.price_extra for choice in item.customizations.all())
+                self.assertEqual(item.unit_price, item.menu_item.price + extras)
+                self.assertEqual(item.total_price, item.unit_price * item.quantity)
+
+        # Las órdenes nuevas siguen numerándose después del histórico
+        order = create_order(data['tables'][0].id, data['waiters'][0], [
+            {'menu_item_id': data['menu_items'][0].id, 'quantity': 1}
+        ])
+        self.assertGreater(order.id, max(Order.objects.exclude(pk=order.pk).values_list('id', flat=True)))
@@ -0,0 +1,94 @@
+"""
+Grupos de Channels por los que se reparten los eventos de órdenes.
+
+Cada socket se suscribe a un único tema al conectar (cocina, caja, camarero
+o mesa) y las vistas publican cada evento solo en los grupos interesados.
+
+Las tablets de mesa no tienen sesión: se suscriben con table_token, un token
+firmado para su mesa que se genera al instalarlas (manage.py table_tokens).
+"""
+from django.core import signing
+
+ACTIVE_STATUSES = ('pending', 'confirmed', 'preparing', 'ready')
+# Cuenta todavía abierta en la mesa: en cocina o servida sin pagar
+OPEN_STATUSES = ACTIVE_STATUSES + ('served',)
+
+KITCHEN_GROUP = 'orders.kitchen'
+CASHIER_GROUP = 'orders.cashier'
+
+MANAGER_ROLES = ('cashier', 'admin')
+
+TABLE_TOKEN_SALT = 'orders.table_token'
+
+
+def waiter_group(waiter_id):
+    return f'orders.waiter.{waiter_id}'
+
+
+def table_group(table_id):
+    return f'orders.table.{table_id}'
+
+
+def table_token(table_id):
+    """Token firmado con el que la tablet de una mesa sigue sus órdenes"""
+    return signing.dumps(int(table_id), salt=TABLE_TOKEN_SALT)
+
+
+def check_table_token(token, table_id):
+    try:
+        return signing.loads(token, salt=TABLE_TOKEN_SALT) == int(table_id)
+    except signing.BadSignature:
+        return False
+
+
+def order_groups(order, previous_status=None):
+    """Grupos que deben recibir un evento de la orden"""
+    groups = [CASHIER_GROUP, waiter_group(order.waiter_id), table_group(order.table_id)]
+    # La cocina también se entera cuando una orden sale de los estados activos
+    if order.status in ACTIVE_STATUSES or previous_status in ACTIVE_STATUSES:
+        groups.append(KITCHEN_GROUP)
+    return groups
+
+
+def get_user_role(user):
+    profile = getattr(user, 'profile', None)
+    if profile is not None:
+        return profile.role
+    return 'admin' if user.is_staff else None
+
+
+def subscription_groups(user, params):
+    """
+    Grupos a los que se suscribe un socket según el rol del usuario y los
+    query params (topic, waiter_id, table_id). Lista vacía si no tiene acceso.
+    """
+    topic = params.get('topic')
+    table_id = params.get('table_id')
+
+    if user is None or not user.is_authenticated:
+        # Las tablets de mesa siguen sus propias órdenes sin sesión, con el
+        # token firmado de esa mesa: las órdenes llevan notas, camarero y total
+        token = params.get('table_token')
+        if topic == 'table' and table_id and table_id.isdigit() and token \
+                and check_table_token(token, table_id):
+            return [table_group(int(table_id))]
+        return []
+
+    role = get_user_role(user)
+    if topic is None:
+        topic = 'cashier' if role in MANAGER_ROLES else 'waiter'
+
+    if topic == 'cashier':
+        return [CASHIER_GROUP] if role in MANAGER_ROLES else []
+    if topic == 'kitchen':
+        return [KITCHEN_GROUP]
+    if topic == 'waiter':
+        waiter_id = params.get('waiter_id', str(user.id))
+        if not waiter_id.isdigit():
+            return []
+        if int(waiter_id) != user.id and role not in MANAGER_ROLES:
+            return []
+        return [waiter_group(int(waiter_id))]
+    if topic == 'table' and table_id and table_id.isdigit():
+        return [table_group(int(table_id))]
+    return []
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import EconomicsViewSet
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'tables', views.TableViewSet)
@@ -10,4 +11,8 @@ router.register(r'economics', views.EconomicsViewSet, basename='economics')
 
 urlpatterns = [
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Delante del router: las mismas URLs sirven los GET desde las vistas asíncronas
+    urlpatterns = async_views.urlpatterns + urlpatterns
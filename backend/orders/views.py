@@ -1,77 +1,92 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from .models import Table, Order, OrderItem
+from .models import (
+    Table, Order, OrderItem, OrderEvent, HourlySalesRollup, HourlyProductRollup
+)
 from .serializers import (
     TableSerializer, OrderSerializer, CreateOrderSerializer,
-    CreateOrderItemSerializer
+    CreateOrderItemSerializer, CompactOrderSerializer, OrderEventSerializer
+)
+from .services import (
+    create_order, record_order_event, can_transition, transition_orders,
+    update_order, OrderVersionConflict
 )
-from menu.models import MenuItem, CustomizationChoice
+from .pagination import OrderCursorPagination
+from .topics import order_groups, subscription_groups
+from .columnar import get_columnar_store
+from restaurant.replica import ReplicaReadMixin, read_alias
+from .dispatcher import last_dispatched_seq
+from .kitchen import kitchen_queue
+from .floor import get_floor
+from .export import EXPORT_FORMATS, RENDERERS, iter_export_chunks, iterate_async
 
 class TableViewSet(viewsets.ModelViewSet):
     queryset = Table.objects.all()
     serializer_class = TableSerializer
+    
+    @action(detail=False, methods=['get'])
+    def floor(self, request):
+        """Todas las mesas con ocupación, órdenes abiertas, total y tiempo sentados"""
+        return Response(get_floor())
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = OrderCursorPagination
     
     def get_queryset(self):
         queryset = Order.objects.all()
         status_filter = self.request.query_params.get('status')
         if status_filter:
             queryset = queryset.filter(status=status_filter)
-        return queryset.select_related('table', 'waiter').prefetch_related('items')
+        return queryset.select_related('table', 'waiter').prefetch_related(
+            Prefetch('items', queryset=self.get_items_queryset())
+        )
+    
+    def is_compact(self):
+        return self.request.query_params.get('view') == 'compact'
+    
+    def get_items_queryset(self):
+        # Precargar todo el grafo que necesita el serializer para no hacer N+1
+        items = OrderItem.objects.select_related('menu_item')
+        if self.is_compact():
+            return items.prefetch_related('customizations')
+        return items.select_related('menu_item__category').prefetch_related(
+            'customizations',
+            'menu_item__customization_options__choices'
+        )
+    
+    def get_serializer_class(self):
+        if self.is_compact():
+            return CompactOrderSerializer
+        return OrderSerializer
     
     def create(self, request):
         serializer = CreateOrderSerializer(data=request.data)
         if serializer.is_valid():
             try:
                 with transaction.atomic():
-                    table = Table.objects.get(id=serializer.validated_data['table_id'])
-                    order = Order.objects.create(
-                        table=table,
+                    order = create_order(
+                        table_id=serializer.validated_data['table_id'],
                         waiter=request.user,
+                        items=serializer.validated_data['items'],
                         notes=serializer.validated_data.get('notes', '')
                     )
                     
-                    total_amount = 0
-                    for item_data in serializer.validated_data['items']:
-                        menu_item = MenuItem.objects.get(id=item_data['menu_item_id'])
-                        
-                        # Crear OrderItem sin customizaciones primero
-                        order_item = OrderItem.objects.create(
-                            order=order,
-                            menu_item=menu_item,
-                            quantity=item_data['quantity'],
-                            notes=item_data.get('notes', ''),
-                            # Inicializar precios a 0, se calcularán después
-                            unit_price=0,
-                            total_price=0
-                        )
-                        
-                        # Agregar customizaciones después de crear el OrderItem
-                        customization_ids = item_data.get('customization_ids', [])
-                        for choice_id in customization_ids:
-                            choice = CustomizationChoice.objects.get(id=choice_id)
-                            order_item.customizations.add(choice)
-                        
-                        # Ahora recalcular y guardar con los precios correctos
-                        order_item.save()  # Esto activará el método save actualizado
-                        total_amount += order_item.total_price
-                    
-                    order.total_amount = total_amount
-                    order.save()
-                    
-                    # Notificar via WebSocket
-                    self.notify_order_created(order)
+                    # Releer con el grafo precargado para serializar sin N+1
+                    order = self.get_queryset().get(pk=order.pk)
+                    # El evento se publica por WebSocket tras el commit
+                    record_order_event(order, 'order_created', groups=order_groups(order))
                     
                     return Response(
-                        OrderSerializer(order).data,
+                        self.get_serializer(order).data,
                         status=status.HTTP_201_CREATED
                     )
                     
@@ -82,44 +97,166 @@ class OrderViewSet(viewsets.ModelViewSet):
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except OrderVersionConflict as e:
+            return self._conflict_response(e)
+    
+    def perform_update(self, serializer):
+        # Solo se escriben los campos que cambian, condicionados a la versión
+        order = serializer.instance
+        changes = {
+            field: value for field, value in serializer.validated_data.items()
+            if getattr(order, field) != value
+        }
+        if 'status' in changes and not can_transition(order.status, changes['status']):
+            raise ValidationError({'status': f"Transición inválida: {order.status} -> {changes['status']}"})
+        with transaction.atomic():
+            update_order(order, changes, self._expected_version(order))
+    
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
-        order = self.get_object()
+        """
+        Cambiar el estado de una orden.
+        Body: status, version (opcional, la última que vio el cliente)
+        """
+        # Solo la fila de la orden: get_object cargaría todo el grafo del serializer
+        order = get_object_or_404(Order, pk=pk)
         new_status = request.data.get('status')
         
-        if new_status in dict(Order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
-            
-            # Notificar cambio de estado
-            self.notify_order_updated(order)
-            
-            return Response({'status': 'updated'})
+        if new_status not in dict(Order.STATUS_CHOICES):
+            return Response(
+                {'error': 'Estado inválido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not can_transition(order.status, new_status):
+            return Response(
+                {'error': f'Transición inválida: {order.status} -> {new_status}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            with transaction.atomic():
+                update_order(order, {'status': new_status}, self._expected_version(order))
+        except OrderVersionConflict as e:
+            return self._conflict_response(e)
+        
+        prefetch_related_objects([order], Prefetch(
+            'items', queryset=OrderItem.objects.select_related('menu_item').prefetch_related('customizations')
+        ))
+        return Response({
+            'status': 'updated',
+            'version': order.version,
+            'order': CompactOrderSerializer(order).data,
+        })
+    
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """
+        Cambiar el estado de varias órdenes a la vez (p. ej. toda la comanda
+        de cocina o las órdenes de una mesa). Body: ids, status
+        """
+        order_ids = request.data.get('ids')
+        new_status = request.data.get('status')
+        if (
+            new_status not in dict(Order.STATUS_CHOICES)
+            or not isinstance(order_ids, list)
+            or not all(isinstance(order_id, int) for order_id in order_ids)
+        ):
+            return Response(
+                {'error': 'Parámetros inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with transaction.atomic():
+            updated, rejected = transition_orders(order_ids, new_status)
+        
+        return Response({
+            'updated': [order.id for order in updated],
+            'rejected': [
+                {
+                    'id': order_id,
+                    'status': current,
+                    'error': 'No encontrada' if current is None else 'Transición inválida'
+                }
+                for order_id, current in rejected
+            ],
+        })
+    
+    def _expected_version(self, order):
+        # Sin versión del cliente se protege al menos el intervalo lectura-escritura
+        version = self.request.data.get('version', order.version)
+        try:
+            return int(version)
+        except (TypeError, ValueError):
+            raise ValidationError({'version': 'Versión inválida'})
+    
+    def _conflict_response(self, conflict):
         return Response(
-            {'error': 'Estado inválido'},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': str(conflict), 'version': conflict.current_version},
+            status=status.HTTP_409_CONFLICT
         )
     
-    def notify_order_created(self, order):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'orders',
-            {
-                'type': 'order_created',
-                'order': OrderSerializer(order).data
-            }
-        )
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_order_event(instance, 'order_deleted', groups=order_groups(instance))
+            instance.delete()
     
-    def notify_order_updated(self, order):
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'orders',
-            {
-                'type': 'order_updated',
-                'order': OrderSerializer(order).data
-            }
-        )
+    @action(detail=False, methods=['get'])
+    def kitchen(self, request):
+        """
+        Órdenes activas ordenadas por hora estimada de salida, servidas desde
+        la cola en memoria. Query params: status (opcional)
+        """
+        return Response(kitchen_queue.snapshot(request.query_params.get('status')))
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Eventos posteriores a una secuencia, para que un cliente que
+        reconecta se ponga al día sin volver a pedir todas las órdenes.
+        Query params: since, limit y los del WebSocket (topic, waiter_id,
+        table_id): solo se devuelven los eventos de esa suscripción.
+        Sin since solo devuelve la última secuencia.
+        """
+        subscriptions = set(subscription_groups(request.user, request.query_params))
+        if not subscriptions:
+            return Response(
+                {'error': 'Sin acceso a ese tema'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        since = request.query_params.get('since')
+        if since is None:
+            return Response({
+                'last_seq': last_dispatched_seq(),
+                'events': [],
+                'has_more': False,
+            })
         
+        try:
+            since = int(since)
+            limit = min(int(request.query_params.get('limit', 500)), 1000)
+        except ValueError:
+            return Response(
+                {'error': 'Parámetros inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Por seq, no por id: los eventos aún sin publicar no tienen seq y
+        # llegarán después del último seq devuelto
+        scanned = list(OrderEvent.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+        has_more = len(scanned) > limit
+        scanned = scanned[:limit]
+        # Filtro en Python (JSONField sin contains en SQLite); last_seq avanza
+        # también sobre los eventos de otras suscripciones
+        events = [event for event in scanned if subscriptions.intersection(event.groups)]
+        return Response({
+            'last_seq': scanned[-1].seq if scanned else since,
+            'events': OrderEventSerializer(events, many=True).data,
+            'has_more': has_more,
+        })
+    
 from django.db.models import Sum, Count, Avg, F, Q
 from django.db.models.functions import TruncDate, TruncHour, TruncWeek, TruncMonth, TruncYear
 from django.utils import timezone
@@ -127,9 +264,10 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 import json        
         
-class EconomicsViewSet(viewsets.ViewSet):
+class EconomicsViewSet(ReplicaReadMixin, viewsets.ViewSet):
     """
-    ViewSet para estadísticas económicas
+    ViewSet para estadísticas económicas.
+    Responde desde los resúmenes horarios de orders.rollups.
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -145,35 +283,37 @@ class EconomicsViewSet(viewsets.ViewSet):
             date_to = request.query_params.get('date_to')
             period = request.query_params.get('period', 'month')
 
-            # Construir filtros de fecha
-            date_filter = Q()
+            # Una sola consulta agrupada por hora que cubre la ventana actual
+            # y la anterior; el resto se deriva en memoria
             if date_from and date_to:
-                date_filter = Q(created_at__date__range=[date_from, date_to])
+                start = datetime.strptime(date_from, '%Y-%m-%d').date()
+                end = datetime.strptime(date_to, '%Y-%m-%d').date()
+                previous_start = start - timedelta(days=(end - start).days + 1)
+                hourly = self._get_hourly_revenue(request, date_range=(str(previous_start), date_to))
+                current = [row for row in hourly if row['hour'].date() >= start]
+                previous = [row for row in hourly if row['hour'].date() < start]
             else:
-                # Por defecto, último mes
-                last_month = timezone.now() - timedelta(days=30)
-                date_filter = Q(created_at__gte=last_month)
-
-            # Filtrar órdenes pagadas
-            orders = Order.objects.filter(date_filter, status='paid')
+                # Por defecto, último mes, desde el inicio de la hora: los
+                # resúmenes son por hora y el motor columnar filtra por
+                # created_at, así los dos cuentan la misma hora frontera
+                last_month = (timezone.now() - timedelta(days=30)).replace(minute=0, second=0, microsecond=0)
+                current = self._get_hourly_revenue(request, since=last_month)
+                previous = []
 
             # Métricas básicas
-            total_revenue = orders.aggregate(
-                total=Sum('total_amount')
-            )['total'] or Decimal('0')
-
-            order_count = orders.count()
+            total_revenue = sum((row['total'] for row in current), Decimal('0'))
+            order_count = sum(row['orders'] for row in current)
             average_order_value = total_revenue / order_count if order_count > 0 else Decimal('0')
 
             # Cálculo de crecimiento vs período anterior
-            previous_period_revenue = self._get_previous_period_revenue(date_from, date_to, period)
+            previous_period_revenue = sum((row['total'] for row in previous), Decimal('0'))
             revenue_growth = self._calculate_growth(total_revenue, previous_period_revenue)
 
             # Ingresos por período para gráfico
-            revenue_by_period = self._get_revenue_by_period(orders, period)
+            revenue_by_period = self._get_revenue_by_period(current, period)
 
             # Hora pico de ventas
-            best_selling_hour = self._get_best_selling_hour(orders)
+            best_selling_hour = self._get_best_selling_hour(current)
 
             data = {
                 'total_revenue': float(total_revenue),
@@ -204,21 +344,14 @@ class EconomicsViewSet(viewsets.ViewSet):
 
             date_filter = Q()
             if date_from and date_to:
-                date_filter = Q(order__created_at__date__range=[date_from, date_to])
-
-            # Obtener productos más vendidos
-            top_products = OrderItem.objects.filter(
-                date_filter,
-                order__status='paid'
-            ).values(
-                'menu_item__id',
-                'menu_item__name',
-                'menu_item__category__name'
-            ).annotate(
-                quantity_sold=Sum('quantity'),
-                total_revenue=Sum('total_price'),
-                order_count=Count('order', distinct=True)
-            ).order_by('-total_revenue')[:limit]
+                date_filter = Q(hour__date__range=[date_from, date_to])
+
+            store = self._get_columnar_store(request)
+            if store is not None:
+                date_range = (date_from, date_to) if date_from and date_to else None
+                top_products, bottom_products = store.product_analytics(limit, date_range)
+            else:
+                top_products, bottom_products = self._get_product_rankings(date_filter, limit)
 
             # Calcular porcentajes
             total_revenue_all = sum(item['total_revenue'] for item in top_products) or 1
@@ -232,21 +365,10 @@ class EconomicsViewSet(viewsets.ViewSet):
                     'category': item['menu_item__category__name'],
                     'quantity_sold': item['quantity_sold'],
                     'total_revenue': float(item['total_revenue']),
-                    'order_count': item['order_count'],
+                    'order_count': item['orders'],
                     'percentage_of_total': round(percentage, 2)
                 })
 
-            # Productos menos vendidos
-            bottom_products = OrderItem.objects.filter(
-                date_filter,
-                order__status='paid'
-            ).values(
-                'menu_item__id',
-                'menu_item__name'
-            ).annotate(
-                quantity_sold=Sum('quantity')
-            ).order_by('quantity_sold')[:5]
-
             bottom_products_data = [
                 {
                     'product_id': item['menu_item__id'],
@@ -279,27 +401,31 @@ class EconomicsViewSet(viewsets.ViewSet):
 
             date_filter = Q()
             if date_from and date_to:
-                date_filter = Q(created_at__date__range=[date_from, date_to])
-
-            orders = Order.objects.filter(date_filter, status='paid')
+                date_filter = Q(hour__date__range=[date_from, date_to])
 
-            # Agrupar por período
-            if period == 'hour':
-                orders = orders.annotate(period=TruncHour('created_at'))
-            elif period == 'week':
-                orders = orders.annotate(period=TruncWeek('created_at'))
-            elif period == 'month':
-                orders = orders.annotate(period=TruncMonth('created_at'))
-            elif period == 'year':
-                orders = orders.annotate(period=TruncYear('created_at'))
-            else:  # day
-                orders = orders.annotate(period=TruncDate('created_at'))
+            store = self._get_columnar_store(request)
+            if store is not None:
+                date_range = (date_from, date_to) if date_from and date_to else None
+                temporal_data = store.temporal(period, date_range)
+            else:
+                rollups = HourlySalesRollup.objects.filter(date_filter)
 
-            temporal_data = orders.values('period').annotate(
-                revenue=Sum('total_amount'),
-                order_count=Count('id'),
-                average_order_value=Avg('total_amount')
-            ).order_by('period')
+                # Agrupar por período
+                if period == 'hour':
+                    rollups = rollups.annotate(period=TruncHour('hour'))
+                elif period == 'week':
+                    rollups = rollups.annotate(period=TruncWeek('hour'))
+                elif period == 'month':
+                    rollups = rollups.annotate(period=TruncMonth('hour'))
+                elif period == 'year':
+                    rollups = rollups.annotate(period=TruncYear('hour'))
+                else:  # day
+                    rollups = rollups.annotate(period=TruncDate('hour'))
+
+                temporal_data = rollups.values('period').annotate(
+                    total=Sum('revenue'),
+                    orders=Sum('order_count')
+                ).order_by('period')
 
             formatted_data = []
             for item in temporal_data:
@@ -310,9 +436,9 @@ class EconomicsViewSet(viewsets.ViewSet):
                 
                 formatted_data.append({
                     'period': period_label,
-                    'revenue': float(item['revenue']),
-                    'order_count': item['order_count'],
-                    'average_order_value': float(item['average_order_value'])
+                    'revenue': float(item['total']),
+                    'order_count': item['orders'],
+                    'average_order_value': float(item['total'] / item['orders'])
                 })
 
             return Response(formatted_data)
@@ -334,21 +460,24 @@ class EconomicsViewSet(viewsets.ViewSet):
 
             date_filter = Q()
             if date_from and date_to:
-                date_filter = Q(created_at__date__range=[date_from, date_to])
-
-            waiter_data = Order.objects.filter(
-                date_filter, 
-                status='paid'
-            ).values(
-                'waiter__id',
-                'waiter__first_name',
-                'waiter__last_name'
-            ).annotate(
-                total_orders=Count('id'),
-                total_revenue=Sum('total_amount'),
-                average_order_value=Avg('total_amount'),
-                tables_served=Count('table', distinct=True)
-            ).order_by('-total_revenue')
+                date_filter = Q(hour__date__range=[date_from, date_to])
+
+            store = self._get_columnar_store(request)
+            if store is not None:
+                date_range = (date_from, date_to) if date_from and date_to else None
+                waiter_data = store.waiter_performance(date_range)
+            else:
+                waiter_data = HourlySalesRollup.objects.filter(
+                    date_filter
+                ).values(
+                    'waiter__id',
+                    'waiter__first_name',
+                    'waiter__last_name'
+                ).annotate(
+                    total_orders=Sum('order_count'),
+                    total_revenue=Sum('revenue'),
+                    tables_served=Count('table', distinct=True)
+                ).order_by('-total_revenue')
 
             performance_data = []
             for data in waiter_data:
@@ -357,7 +486,7 @@ class EconomicsViewSet(viewsets.ViewSet):
                     'waiter_name': f"{data['waiter__first_name']} {data['waiter__last_name']}",
                     'total_orders': data['total_orders'],
                     'total_revenue': float(data['total_revenue']),
-                    'average_order_value': float(data['average_order_value']),
+                    'average_order_value': float(data['total_revenue'] / data['total_orders']),
                     'tables_served': data['tables_served']
                 })
 
@@ -369,30 +498,103 @@ class EconomicsViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    # Métodos auxiliares
-    def _get_previous_period_revenue(self, date_from, date_to, period):
-        """Calcular ingresos del período anterior para comparación"""
-        # Implementación simplificada - en producción sería más compleja
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exportación en streaming de órdenes o líneas
+        Query params: date_from, date_to, status, level (orders|lines), export_format (csv|ndjson)
+        """
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        order_status = request.query_params.get('status')
+        level = request.query_params.get('level', 'orders')
+        export_format = request.query_params.get('export_format', 'csv')
+
+        if level not in ('orders', 'lines') or export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': 'Parámetros de exportación inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         try:
-            if date_from and date_to:
-                start = datetime.strptime(date_from, '%Y-%m-%d')
-                end = datetime.strptime(date_to, '%Y-%m-%d')
-                days_diff = (end - start).days
-                
-                previous_start = start - timedelta(days=days_diff + 1)
-                previous_end = start - timedelta(days=1)
-                
-                previous_orders = Order.objects.filter(
-                    created_at__date__range=[previous_start, previous_end],
-                    status='paid'
-                )
-                
-                return previous_orders.aggregate(
-                    total=Sum('total_amount')
-                )['total'] or Decimal('0')
-        except:
-            pass
-        return Decimal('0')
+            for value in (date_from, date_to):
+                if value:
+                    datetime.strptime(value, '%Y-%m-%d')
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # El streaming sigue después de que la vista devuelva, así que el alias se fija aquí
+        chunks = iter_export_chunks(level, date_from, date_to, order_status, using=read_alias())
+        content = RENDERERS[export_format](level, chunks)
+        if isinstance(request._request, ASGIRequest):
+            # Bajo ASGI un iterador síncrono se leería entero antes de enviarlo
+            content = iterate_async(content)
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"{level}_{date_from or 'inicio'}_{date_to or 'hoy'}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    # Métodos auxiliares
+    def _get_columnar_store(self, request):
+        """Almacén columnar si se pidió ?engine=columnar"""
+        if request.query_params.get('engine') != 'columnar':
+            return None
+        store = get_columnar_store()
+        if store is None:
+            raise ValueError('El motor columnar no está configurado')
+        return store
+
+    def _get_hourly_revenue(self, request, date_range=None, since=None):
+        """Ingresos y número de órdenes por hora, en hora local y orden cronológico"""
+        store = self._get_columnar_store(request)
+        if store is not None:
+            return store.hourly_revenue(date_range, since)
+
+        if date_range:
+            date_filter = Q(hour__date__range=list(date_range))
+        else:
+            date_filter = Q(hour__gte=since)
+        rows = HourlySalesRollup.objects.filter(date_filter).values('hour').annotate(
+            total=Sum('revenue'),
+            orders=Sum('order_count')
+        ).order_by('hour')
+        hourly = []
+        for row in rows:
+            if timezone.is_aware(row['hour']):
+                row['hour'] = timezone.localtime(row['hour'])
+            hourly.append(row)
+        return hourly
+
+    def _get_product_rankings(self, date_filter, limit):
+        """Productos más y menos vendidos desde los resúmenes horarios"""
+        # Obtener productos más vendidos
+        top_products = HourlyProductRollup.objects.filter(
+            date_filter
+        ).values(
+            'menu_item__id',
+            'menu_item__name',
+            'menu_item__category__name'
+        ).annotate(
+            quantity_sold=Sum('quantity'),
+            total_revenue=Sum('revenue'),
+            orders=Sum('order_count')
+        ).order_by('-total_revenue')[:limit]
+
+        # Productos menos vendidos
+        bottom_products = HourlyProductRollup.objects.filter(
+            date_filter
+        ).values(
+            'menu_item__id',
+            'menu_item__name'
+        ).annotate(
+            quantity_sold=Sum('quantity')
+        ).order_by('quantity_sold')[:5]
+
+        return top_products, bottom_products
 
     def _calculate_growth(self, current, previous):
         """Calcular porcentaje de crecimiento"""
@@ -400,43 +602,37 @@ class EconomicsViewSet(viewsets.ViewSet):
             return 100.0 if current > 0 else 0.0
         return float(((current - previous) / previous) * 100)
 
-    def _get_revenue_by_period(self, orders, period):
-        if period == 'hour':
-            orders_grouped = orders.annotate(period=TruncHour('created_at'))
-        elif period == 'day':
-            orders_grouped = orders.annotate(period=TruncDate('created_at'))
-        elif period == 'week':
-            orders_grouped = orders.annotate(period=TruncWeek('created_at'))
-        elif period == 'month':
-            orders_grouped = orders.annotate(period=TruncMonth('created_at'))
-        else:  # default to day
-            orders_grouped = orders.annotate(period=TruncDate('created_at'))
-        
-        revenue_data = list(orders_grouped.values('period').annotate(
-            revenue=Sum('total_amount')
-        ).order_by('period'))
+    def _get_revenue_by_period(self, hourly, period):
+        """Agrupar en memoria las filas horarias como TruncHour/Date/Week/Month"""
+        revenue_data = {}
+        for row in hourly:
+            hour = row['hour']
+            if period == 'hour':
+                key = hour
+            elif period == 'week':
+                key = hour.date() - timedelta(days=hour.weekday())
+            elif period == 'month':
+                key = hour.date().replace(day=1)
+            else:  # day
+                key = hour.date()
+            revenue_data[key] = revenue_data.get(key, Decimal('0')) + row['total']
         
         # Formatear los datos para el frontend
         formatted_data = []
-        for item in revenue_data:
+        for key, revenue in revenue_data.items():
             if period == 'hour':
-                period_label = item['period'].strftime('%H:%M')
+                period_label = key.strftime('%H:%M')
             else:
-                period_label = item['period'].strftime('%Y-%m-%d')
+                period_label = key.strftime('%Y-%m-%d')
             
             formatted_data.append({
                 'period': period_label,
-                'revenue': float(item['revenue']) if item['revenue'] else 0.0
+                'revenue': float(revenue) if revenue else 0.0
             })
         
         return formatted_data
 
-    def _get_best_selling_hour(self, orders):
+    def _get_best_selling_hour(self, hourly):
         """Encontrar la hora con más ventas"""
-        hourly_data = orders.annotate(
-            hour=TruncHour('created_at')
-        ).values('hour').annotate(
-            revenue=Sum('total_amount')
-        ).order_by('-revenue').first()
-        
-        return hourly_data['hour'].strftime('%H:%M') if hourly_data else 'N/A'        
\ No newline at end of file
+        best = max(hourly, key=lambda row: row['total'], default=None)
+        return best['hour'].strftime('%H:%M') if best else 'N/A'
@@ -2,15 +2,27 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
-import orders.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant.settings')
 
+# Cargar Django antes de importar nada que use modelos
+django_asgi_app = get_asgi_application()
+
+import menu.routing  # noqa: E402
+import orders.routing  # noqa: E402
+from orders.dispatcher import dispatcher  # noqa: E402
+from users.auth import JWTAuthMiddleware  # noqa: E402
+
+# Publicar ya los eventos que quedaran pendientes de antes de arrancar
+dispatcher.start()
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            orders.routing.websocket_urlpatterns
+        JWTAuthMiddleware(
+            URLRouter(
+                orders.routing.websocket_urlpatterns + menu.routing.websocket_urlpatterns
+            )
         )
     ),
-})
\ No newline at end of file
+})
@@ -0,0 +1,93 @@
+"""
+Versiones asíncronas de las lecturas más consultadas (ASYNC_READ_VIEWS).
+
+En ASGI Django ejecuta cada vista síncrona en un único hilo compartido, así
+que cientos de tablets consultando a la vez hacen cola en ese hilo. Las
+vistas de async_read_view sirven desde el bucle de eventos lo que está en
+memoria (snapshot del menú, cola de cocina) sin pasar por ningún hilo. El
+resto de GET ejecuta la vista DRF de siempre, en ese mismo hilo o, con
+ASYNC_READ_THREADS > 0, en un pool propio donde las consultas avanzan en
+paralelo. Las escrituras no cambian.
+
+El ORM asíncrono de Django 4.2 envía cada consulta al mismo hilo compartido,
+así que solo se usa para cargar el usuario del token cuando no está en la
+caché de users.auth.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from users.auth import authenticate_token
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    threads = getattr(settings, 'ASYNC_READ_THREADS', 0)
+    if not threads:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='async-reads')
+        return _executor
+
+
+def _run_view(view, request, *args, **kwargs):
+    try:
+        response = view(request, *args, **kwargs)
+        # Renderizar aquí: si no, Django lo haría después en el hilo compartido
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        # Como al terminar una petición normal, pero en el hilo del pool
+        close_old_connections()
+
+
+async def authenticate_jwt(request):
+    """Usuario activo del token Bearer, o None si no hay token válido"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    return await authenticate_token(raw_token)
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def async_read_view(view, fast_path=None):
+    """
+    Envolver una vista DRF (ViewSet.as_view(...)) en una vista asíncrona.
+
+    fast_path(request, *args, **kwargs) es una corrutina que responde desde
+    memoria o devuelve None para seguir por la vista DRF (también cuando
+    falta autenticación o algo no cuadra: la vista DRF da el error de siempre).
+    """
+    async def async_view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await sync_to_async(view)(request, *args, **kwargs)
+        # La API navegable de DRF sigue por la vista normal
+        if fast_path is not None and 'text/html' not in request.headers.get('Accept', ''):
+            response = await fast_path(request, *args, **kwargs)
+            if response is not None:
+                return response
+        executor = _get_executor()
+        if executor is None:
+            return await sync_to_async(_run_view)(view, request, *args, **kwargs)
+        return await sync_to_async(_run_view, thread_sensitive=False, executor=executor)(
+            view, request, *args, **kwargs
+        )
+
+    update_wrapper(async_view, view)
+    # update_wrapper copia cls y actions (etiquetas de métricas) y csrf_exempt
+    return async_view
@@ -0,0 +1,242 @@
+"""
+Channel layer sobre un fichero SQLite compartido, para varios workers ASGI
+en la misma máquina sin Redis.
+
+Los mensajes y la pertenencia a grupos viven en el fichero (modo WAL), así
+que un group_send de cualquier proceso llega a los sockets de todos. Cada
+proceso tiene un prefijo propio para sus canales y una única tarea que
+recoge sus mensajes por lotes y los reparte en colas locales, en lugar de
+una consulta por socket.
+"""
+import asyncio
+import base64
+import json
+import random
+import sqlite3
+import string
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, id);
+CREATE TABLE IF NOT EXISTS channel_groups (
+    group_name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (group_name, channel)
+);
+"""
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode()}
+    raise TypeError(f'{type(value).__name__} no es serializable en el channel layer')
+
+
+def _decode(value):
+    if '__bytes__' in value and len(value) == 1:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+        poll_interval=0.05, min_poll_interval=0.005
+    ):
+        super().__init__(expiry=expiry, capacity=capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        # Espera entre consultas: mínima tras recibir algo, crece hasta poll_interval
+        self.poll_interval = poll_interval
+        self.min_poll_interval = min_poll_interval
+        self.client_prefix = f'specific.{uuid.uuid4().hex}!'
+        # Un solo hilo con la conexión: sqlite3 no se comparte entre hilos
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='channel-layer')
+        self._connection = None
+        self._queues = {}
+        self._poller = None
+
+    # Acceso al fichero (siempre en el hilo del executor)
+
+    def _db(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _insert(self, db, channel, payload, expires):
+        """Encolar si el canal tiene hueco; devuelve False si está lleno"""
+        (pending,) = db.execute(
+            'SELECT COUNT(*) FROM channel_messages WHERE channel = ? AND expires > ?',
+            (channel, time.time())
+        ).fetchone()
+        if pending >= self.get_capacity(channel):
+            return False
+        db.execute(
+            'INSERT INTO channel_messages (channel, payload, expires) VALUES (?, ?, ?)',
+            (channel, payload, expires)
+        )
+        return True
+
+    def _send(self, channel, payload):
+        db = self._db()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            return self._insert(db, channel, payload, time.time() + self.expiry)
+
+    def _group_send(self, group, payload):
+        db = self._db()
+        now = time.time()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            channels = [row[0] for row in db.execute(
+                'SELECT channel FROM channel_groups WHERE group_name = ? AND expires > ?',
+                (group, now)
+            )]
+            for channel in channels:
+                # Como en los demás layers, un canal lleno pierde el mensaje del grupo
+                self._insert(db, channel, payload, now + self.expiry)
+
+    def _take(self, low, high, limit):
+        """Sacar (borrándolos) los mensajes vigentes de los canales en [low, high)"""
+        db = self._db()
+        now = time.time()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            rows = db.execute(
+                'SELECT id, channel, payload, expires FROM channel_messages '
+                'WHERE channel >= ? AND channel < ? ORDER BY id LIMIT ?',
+                (low, high, limit)
+            ).fetchall()
+            if rows:
+                db.execute(
+                    'DELETE FROM channel_messages WHERE id IN (%s)' % ','.join('?' * len(rows)),
+                    [row[0] for row in rows]
+                )
+        return [(channel, payload) for _, channel, payload, expires in rows if expires > now]
+
+    def _expire(self):
+        db = self._db()
+        now = time.time()
+        with db:
+            db.execute('DELETE FROM channel_messages WHERE expires <= ?', (now,))
+            db.execute('DELETE FROM channel_groups WHERE expires <= ?', (now,))
+
+    def _execute(self, sql, params=()):
+        db = self._db()
+        with db:
+            db.execute(sql, params)
+
+    # API de channel layer
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.valid_channel_name(channel)
+        payload = json.dumps(message, default=_encode)
+        if not await self._run(self._send, channel, payload):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.valid_channel_name(channel)
+        if not channel.startswith(self.client_prefix):
+            return await self._receive_shared(channel)
+
+        queue = self._queues.setdefault(channel, asyncio.Queue())
+        self._ensure_poller()
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # El consumidor terminó: su cola ya no la leerá nadie
+            if queue.empty():
+                self._queues.pop(channel, None)
+            raise
+
+    async def _receive_shared(self, channel):
+        # Canales normales (no de este proceso): consulta directa con espera creciente
+        delay = self.min_poll_interval
+        while True:
+            messages = await self._run(self._take, channel, channel + '\0', 1)
+            if messages:
+                return json.loads(messages[0][1], object_hook=_decode)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_interval)
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        # El carácter siguiente a '!' acota el rango de los canales del prefijo
+        low, high = self.client_prefix, self.client_prefix[:-1] + '"'
+        delay = self.min_poll_interval
+        last_expiry = time.monotonic()
+        while self._queues:
+            messages = await self._run(self._take, low, high, 500)
+            for channel, payload in messages:
+                queue = self._queues.get(channel)
+                if queue is not None:
+                    queue.put_nowait(json.loads(payload, object_hook=_decode))
+            if messages:
+                delay = self.min_poll_interval
+                continue
+            if time.monotonic() - last_expiry > self.expiry:
+                await self._run(self._expire)
+                last_expiry = time.monotonic()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_interval)
+
+    async def new_channel(self, prefix='specific.'):
+        suffix = ''.join(random.choices(string.ascii_letters, k=12))
+        channel = f'{self.client_prefix}{prefix}{suffix}'
+        # La cola existe desde ya para no perder lo que llegue antes del primer receive
+        self._queues[channel] = asyncio.Queue()
+        self._ensure_poller()
+        return channel
+
+    async def group_add(self, group, channel):
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        await self._run(
+            self._execute,
+            'INSERT OR REPLACE INTO channel_groups (group_name, channel, expires) VALUES (?, ?, ?)',
+            (group, channel, time.time() + self.group_expiry)
+        )
+
+    async def group_discard(self, group, channel):
+        self.valid_group_name(group)
+        self.valid_channel_name(channel)
+        await self._run(
+            self._execute,
+            'DELETE FROM channel_groups WHERE group_name = ? AND channel = ?',
+            (group, channel)
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.valid_group_name(group)
+        await self._run(self._group_send, group, json.dumps(message, default=_encode))
+
+    async def flush(self):
+        await self._run(self._execute, 'DELETE FROM channel_messages')
+        await self._run(self._execute, 'DELETE FROM channel_groups')
+        self._queues.clear()
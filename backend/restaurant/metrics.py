@@ -0,0 +1,281 @@
+"""
+Métricas por endpoint en formato de texto de Prometheus (GET /metrics).
+
+MetricsMiddleware etiqueta cada petición con la vista y acción de DRF
+(p. ej. OrderViewSet.create) y registra latencia, tamaño de respuesta,
+número de consultas y tiempo en base de datos. Las consultas se cuentan con
+un execute_wrapper instalado en cada conexión, que apunta a las estadísticas
+de la petición en curso por una ContextVar: así también se cuentan las de
+vistas asíncronas que consultan desde otros hilos. El tiempo de
+serialización se mide envolviendo BaseSerializer.data, que solo se llama en
+el serializer de nivel superior. Los contadores de WebSocket los actualiza
+OrderConsumer.
+
+Los valores son del proceso: con varios workers, Prometheus debe leer cada
+uno por separado.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_format_labels(key)} {value}']
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Un contador por bucket (no acumulado), más suma y total
+                counts = self._values[key] = [0] * len(self.buckets) + [0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def _samples(self, key, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(key + (("le", bound),))} {cumulative}')
+        lines.append(f'{self.name}_bucket{_format_labels(key + (("le", "+Inf"),))} {counts[-1]}')
+        lines.append(f'{self.name}_sum{_format_labels(key)} {counts[-2]}')
+        lines.append(f'{self.name}_count{_format_labels(key)} {counts[-1]}')
+        return lines
+
+
+REGISTRY = []
+
+http_requests = Counter(
+    'http_requests_total', 'Peticiones HTTP por vista, método y código', ('view', 'method', 'status')
+)
+http_latency = Histogram(
+    'http_request_duration_seconds', 'Latencia de la petición', ('view',)
+)
+http_response_size = Histogram(
+    'http_response_size_bytes', 'Tamaño del cuerpo de la respuesta', ('view',), SIZE_BUCKETS
+)
+db_queries = Histogram(
+    'http_db_queries', 'Consultas SQL por petición', ('view',), QUERY_BUCKETS
+)
+db_time = Histogram(
+    'http_db_duration_seconds', 'Tiempo en base de datos por petición', ('view',)
+)
+serializer_time = Histogram(
+    'http_serializer_duration_seconds', 'Tiempo de serialización DRF por petición', ('view',)
+)
+ws_connections = Counter(
+    'websocket_connections_total', 'Conexiones WebSocket aceptadas', ('consumer',)
+)
+ws_active = Gauge(
+    'websocket_active_connections', 'Conexiones WebSocket abiertas', ('consumer',)
+)
+ws_messages = Counter(
+    'websocket_messages_sent_total', 'Mensajes enviados por WebSocket', ('consumer',)
+)
+ws_send_latency = Histogram(
+    'websocket_send_duration_seconds', 'Tiempo de envío de un mensaje por WebSocket', ('consumer',)
+)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper de Django: se llama en cada consulta
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_tracking(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+# Las conexiones son por hilo: cada una se instrumenta al abrirse
+connection_created.connect(install_query_tracking)
+
+_serializer_data = serializers.BaseSerializer.data
+
+
+def _timed_data(self):
+    stats = _current.get()
+    if stats is None:
+        return _serializer_data.fget(self)
+    start = time.perf_counter()
+    try:
+        return _serializer_data.fget(self)
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+
+
+def install_serializer_timing():
+    if serializers.BaseSerializer.data is _serializer_data:
+        serializers.BaseSerializer.data = property(_timed_data)
+
+
+def view_label(view_func, method):
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_serializer_timing()
+        # Conexiones ya abiertas en este hilo antes de cargar el middleware
+        for connection in connections.all(initialized_only=True):
+            install_query_tracking(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.path == '/metrics':
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        if request.path == '/metrics':
+            return await self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, stats, start)
+        return response
+
+    def _observe(self, request, response, stats, start):
+        # Sin process_view: en ASGI Django lo ejecutaría en el hilo síncrono
+        match = getattr(request, 'resolver_match', None)
+        view = view_label(match.func, request.method) if match else 'unmatched'
+        http_requests.inc(view=view, method=request.method, status=response.status_code)
+        http_latency.observe(time.perf_counter() - start, view=view)
+        if not response.streaming:
+            http_response_size.observe(len(response.content), view=view)
+        db_queries.observe(stats.queries, view=view)
+        db_time.observe(stats.db_time, view=view)
+        serializer_time.observe(stats.serializer_time, view=view)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,139 @@
+"""
+Lecturas desde una réplica de solo lectura (alias 'replica').
+
+Las vistas marcadas con ReplicaReadMixin leen de la réplica cuando está
+configurada; las escrituras siempre van a 'default'. Para que un usuario vea
+sus propios cambios a pesar del retraso de replicación, tras cada escritura
+suya sus lecturas vuelven a la principal durante REPLICA_PIN_SECONDS.
+
+La marca va en una cookie firmada con caducidad y no en la caché local: la
+siguiente petición puede atenderla otro worker u otro proceso.
+"""
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_available():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def read_alias():
+    """Alias del que lee la petición actual"""
+    return REPLICA_DB_ALIAS if _use_replica.get() else DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = 'primary_pin'
+PIN_SALT = 'restaurant.replica.pin'
+
+
+def _pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def pin_to_primary(response, user):
+    response.set_signed_cookie(
+        PIN_COOKIE, str(user.pk), salt=PIN_SALT,
+        max_age=_pin_seconds(), httponly=True, samesite='Lax',
+    )
+
+
+def is_pinned(request, user):
+    """Si el usuario escribió hace menos de REPLICA_PIN_SECONDS"""
+    if not user.is_authenticated:
+        return False
+    # max_age comprueba la firma con su fecha: una cookie vieja no vale
+    pinned = request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_SALT, max_age=_pin_seconds()
+    )
+    return pinned == str(user.pk)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return REPLICA_DB_ALIAS if _use_replica.get() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambos alias contienen los mismos datos
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Lecturas de la vista desde la réplica. Con replica_anonymous_only solo las
+    de usuarios anónimos (p. ej. el menú público).
+    """
+    replica_anonymous_only = False
+
+    _replica_token = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # También si la vista lanzó una excepción no controlada
+            if self._replica_token is not None:
+                _use_replica.reset(self._replica_token)
+                self._replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        # Aquí ya se conoce el usuario autenticado
+        super().initial(request, *args, **kwargs)
+        if self._should_use_replica(request):
+            self._replica_token = _use_replica.set(True)
+
+    def _should_use_replica(self, request):
+        if not replica_available() or request.method not in SAFE_METHODS:
+            return False
+        if request.user.is_authenticated:
+            return not self.replica_anonymous_only and not is_pinned(request, request.user)
+        return True
+
+
+class ReadYourWritesMiddleware:
+    """Fija en la principal a quien acaba de escribir con éxito"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._is_write(request, response):
+            self._pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._is_write(request, response):
+            # request.user puede ser perezoso y consultar la base de datos
+            await sync_to_async(self._pin)(request, response)
+        return response
+
+    def _is_write(self, request, response):
+        return (
+            replica_available()
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        )
+
+    def _pin(self, request, response):
+        # DRF copia el usuario autenticado por JWT a la petición de Django
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(response, user)
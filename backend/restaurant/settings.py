@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa
+    'restaurant.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -43,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'restaurant.replica.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'restaurant.urls'
@@ -64,17 +67,81 @@ TEMPLATES = [
 ]
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite para desarrollo; DB_ENGINE=postgres para producción con
+# varios workers (SQLite serializa todas las escrituras)
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='restaurant'),
+            'USER': config('DB_USER', default='restaurant'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Bajo ASGI cada petición síncrona y cada hilo de ASYNC_READ_THREADS
+            # tiene su propia conexión: persistentes se acumulan sin límite, así
+            # que se cierran al terminar la petición. Para reutilizarlas, poner
+            # PgBouncer delante (ver README); DB_CONN_MAX_AGE > 0 solo con WSGI.
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # iterator() usa cursores de servidor (exportaciones y reconstrucción
+            # de resúmenes). Desactivar detrás de PgBouncer en modo transaction.
+            'DISABLE_SERVER_SIDE_CURSORS': config(
+                'DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool
+            ),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+                'application_name': 'restaurant',
+            },
+            'TEST': {
+                'NAME': config('DB_TEST_NAME', default='test_restaurant'),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            # SQLITE_PATH permite usar otro fichero (p. ej. para pruebas de carga)
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Esperar al bloqueo de escritura en vez de fallar de inmediato
+                'timeout': 20,
+            },
+        }
+    }
+
+# Réplica de solo lectura opcional para estadísticas y menú público:
+# en postgres DB_REPLICA_HOST, en sqlite DB_REPLICA_NAME (otro fichero)
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST or DATABASES['default'].get('HOST', ''),
+        'NAME': DB_REPLICA_NAME or DATABASES['default']['NAME'],
+        # En los tests la réplica es la propia base de datos de test
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['restaurant.replica.ReplicaRouter']
+
+# Segundos que las lecturas de un usuario van a la principal tras escribir
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Lecturas más consultadas (órdenes, mesas, menú, cocina) con vistas asíncronas.
+# ASYNC_READ_THREADS > 0 las ejecuta en un pool propio en vez del hilo
+# síncrono compartido: útil con varios núcleos y PostgreSQL.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=True, cast=bool)
+ASYNC_READ_THREADS = config('ASYNC_READ_THREADS', default=0, cast=int)
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.auth.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -88,6 +155,10 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Caché en memoria de usuarios autenticados por token (users.auth); TTL 0 la desactiva
+AUTH_CACHE_SIZE = config('AUTH_CACHE_SIZE', default=1024, cast=int)
+AUTH_CACHE_TTL = config('AUTH_CACHE_TTL', default=60, cast=int)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -99,17 +170,50 @@ CORS_ALLOW_CREDENTIALS = True
 # ASGI for Channels
 ASGI_APPLICATION = 'restaurant.asgi.application'
 
-# Channels layer (usaremos InMemory para desarrollo)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Channels layer: memory (desarrollo, un solo proceso), sqlite (varios workers
+# en la misma máquina, sin Redis) o redis
+CHANNEL_LAYER = config('CHANNEL_LAYER', default='memory')
+
+if CHANNEL_LAYER == 'sqlite':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'restaurant.layers.SQLiteChannelLayer',
+            'CONFIG': {
+                'path': config('CHANNEL_LAYER_PATH', default=str(BASE_DIR / 'channels.sqlite3')),
+                'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+                'expiry': config('CHANNEL_LAYER_EXPIRY', default=60, cast=int),
+            },
+        },
+    }
+elif CHANNEL_LAYER == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [config('REDIS_URL', default='redis://localhost:6379/0')],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Almacén columnar (NumPy) para ?engine=columnar en las estadísticas; vacío lo desactiva
+ANALYTICS_STORE_DIR = config('ANALYTICS_STORE_DIR', default='')
+
+# /metrics (Prometheus); con token, se exige Authorization: Bearer <token>
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Hilos que generan las variantes de las imágenes del menú
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
+
 # Static files
 STATIC_URL = '/static/'
 
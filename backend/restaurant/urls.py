@@ -1,14 +1,24 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from restaurant.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
     path('api/menu/', include('menu.urls')),
     path('api/orders/', include('orders.urls')),
+    path('metrics', metrics_view),
 ]
 
 if settings.DEBUG:
+    from menu.views import serve_image_variant
+    # En producción el servidor web debe dar la misma cabecera a media/menu_items/variants/
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>menu_items/variants/.*)$' % settings.MEDIA_URL.lstrip('/'),
+            serve_image_variant, {'document_root': settings.MEDIA_ROOT}
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
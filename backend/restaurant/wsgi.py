@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'restaurant.settings')
 
 application = get_wsgi_application()
+
+from orders.dispatcher import dispatcher  # noqa: E402
+
+# Publicar ya los eventos que quedaran pendientes de antes de arrancar
+dispatcher.start()
@@ -0,0 +1,169 @@
+"""
+Autenticación JWT con caché de usuarios en memoria, para la API y los WebSocket.
+
+JWTAuthentication cargaba el User en cada petición y los permisos por rol
+volvían a consultar su UserProfile. Aquí el usuario se carga una vez con el
+perfil (select_related) y se guarda por jti del token durante AUTH_CACHE_TTL
+segundos, con como mucho AUTH_CACHE_SIZE tokens en una LRU. La firma y la
+caducidad del token se comprueban siempre; solo se ahorran las consultas.
+
+Al guardar o borrar un User o su UserProfile se descartan sus entradas tras
+el commit. Con varios procesos los demás se enteran al caducar el TTL.
+Los usuarios cacheados se comparten entre peticiones: no modificarlos.
+"""
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import UserProfile
+
+User = get_user_model()
+
+
+class UserCache:
+    """LRU de usuarios autenticados por jti, con caducidad"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # jti -> (user, caduca)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key, (user, _) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, 'AUTH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_CACHE_TTL', 60),
+)
+
+
+def _user_queryset(validated_token):
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    return User.objects.select_related('profile').filter(**{api_settings.USER_ID_FIELD: user_id})
+
+
+def _check_user(user, validated_token):
+    # Las mismas comprobaciones (y errores) que JWTAuthentication.get_user
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+    return user
+
+
+def get_token_user(validated_token):
+    """Usuario (con profile cargado) de un token ya validado, desde la caché si se puede"""
+    key = validated_token.get(api_settings.JTI_CLAIM)
+    user = user_cache.get(key) if key else None
+    if user is None:
+        user = _check_user(_user_queryset(validated_token).first(), validated_token)
+        if key:
+            user_cache.set(key, user)
+        return user
+    return _check_user(user, validated_token)
+
+
+async def aget_token_user(validated_token):
+    """Como get_token_user; en un fallo de caché consulta con el ORM asíncrono"""
+    key = validated_token.get(api_settings.JTI_CLAIM)
+    user = user_cache.get(key) if key else None
+    if user is None:
+        user = _check_user(await _user_queryset(validated_token).afirst(), validated_token)
+        if key:
+            user_cache.set(key, user)
+        return user
+    return _check_user(user, validated_token)
+
+
+async def authenticate_token(raw_token):
+    """Usuario activo de un token de acceso en bruto, o None si no es válido"""
+    try:
+        validated_token = JWTAuthentication().get_validated_token(raw_token)
+        return await aget_token_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario con user_cache"""
+
+    def get_user(self, validated_token):
+        return get_token_user(validated_token)
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Autenticar WebSocket con ?token=<access token>: el navegador no puede
+    enviar cabeceras al abrir el socket. Si el token no es válido se deja el
+    usuario que hubiera (sesión o anónimo) y el consumer decide.
+    """
+
+    async def __call__(self, scope, receive, send):
+        params = dict(parse_qsl(scope.get('query_string', b'').decode()))
+        raw_token = params.get('token')
+        if raw_token:
+            user = await authenticate_token(raw_token.encode())
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: user_cache.invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: user_cache.invalidate_user(instance.user_id))
@@ -1,3 +1,69 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, User
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from orders.consumers import OrderConsumer
+from .auth import JWTAuthMiddleware, user_cache
 
-# Create your tests here.
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user('camarero', password='x', first_name='Ana')
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_second_request_costs_no_queries(self):
+        self.assertEqual(self.client.get('/api/auth/users/me/').data['profile']['role'], 'waiter')
+        # Usuario y perfil salen de la caché
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/users/me/')
+        self.assertEqual(response.data['username'], 'camarero')
+
+        # Otro token del mismo usuario es otra entrada
+        other = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {other}')
+        with self.assertNumQueries(1):
+            self.client.get('/api/auth/users/me/')
+        self.assertEqual(len(user_cache), 2)
+
+    def test_saving_user_or_profile_invalidates(self):
+        self.client.get('/api/auth/users/me/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.role = 'cashier'
+            self.user.profile.save()
+        self.assertEqual(len(user_cache), 0)
+        self.assertEqual(self.client.get('/api/auth/users/me/').data['profile']['role'], 'cashier')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response = self.client.get('/api/auth/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalido')
+        self.assertEqual(self.client.get('/api/auth/users/me/').status_code, 401)
+
+    def test_websocket_authenticates_with_token(self):
+        async def connect(query_string):
+            communicator = WebsocketCommunicator(
+                JWTAuthMiddleware(OrderConsumer.as_asgi()), f'/ws/orders/?{query_string}'
+            )
+            communicator.scope['user'] = AnonymousUser()
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+
+        async def scenario():
+            self.assertFalse(await connect('topic=kitchen'))
+            self.assertFalse(await connect('topic=kitchen&token=invalido'))
+            self.assertTrue(await connect(f'topic=kitchen&token={self.token}'))
+            self.assertTrue(await connect(f'topic=waiter&token={self.token}'))
+
+        async_to_sync(scenario)()
+        self.assertEqual(len(user_cache), 1)
@@ -0,0 +1,115 @@
+import { useEffect, useRef } from 'react';
+import type { Dispatch, SetStateAction } from 'react';
+import type { Category, CustomizationChoice, MenuItem } from '../types';
+
+interface MenuItemDelta {
+    id: number;
+    is_available: boolean;
+    is_visible: boolean;
+    price: MenuItem['price'];
+}
+
+interface ChoiceDelta {
+    id: number;
+    option_id: number;
+    price_extra: CustomizationChoice['price_extra'];
+}
+
+interface MenuDelta {
+    type: 'menu_delta';
+    version: number;
+    items: MenuItemDelta[];
+    choices: ChoiceDelta[];
+}
+
+export const applyMenuDelta = (categories: Category[], delta: MenuDelta): Category[] => {
+    const items = new Map(delta.items.map(item => [item.id, item]));
+    const choices = new Map(delta.choices.map(choice => [choice.id, choice]));
+
+    return categories.map(category => ({
+        ...category,
+        menu_items: category.menu_items.map(item => {
+            const change = items.get(item.id);
+            const patched = change
+                ? { ...item, is_available: change.is_available, is_visible: change.is_visible, price: change.price }
+                : item;
+            if (choices.size === 0) {
+                return patched;
+            }
+            return {
+                ...patched,
+                customization_options: patched.customization_options.map(option => ({
+                    ...option,
+                    choices: option.choices.map(choice => {
+                        const choiceChange = choices.get(choice.id);
+                        return choiceChange ? { ...choice, price_extra: choiceChange.price_extra } : choice;
+                    }),
+                })),
+            };
+        }),
+    }));
+};
+
+// Tema menu: parchear la carta con los deltas y recargarla entera cuando
+// el servidor lo pide o se perdió alguna versión
+export const useMenuUpdates = (
+    setCategories: Dispatch<SetStateAction<Category[]>>,
+    reload: () => void
+) => {
+    const reloadRef = useRef(reload);
+    reloadRef.current = reload;
+
+    useEffect(() => {
+        let ws: WebSocket;
+        let reconnectTimer: ReturnType<typeof setTimeout>;
+        let reloadTimer: ReturnType<typeof setTimeout>;
+        let closed = false;
+        let version: number | null = null;
+
+        // Un borrado en cascada llega como varias recargas seguidas: juntarlas
+        const scheduleReload = () => {
+            clearTimeout(reloadTimer);
+            reloadTimer = setTimeout(() => reloadRef.current(), 300);
+        };
+
+        const connect = () => {
+            ws = new WebSocket('ws://localhost:8000/ws/menu/');
+
+            ws.onmessage = (message) => {
+                const data = JSON.parse(message.data);
+                if (version !== null && data.version <= version) {
+                    // Ya aplicada: p. ej. un delta que llegó antes que menu_version
+                    return;
+                }
+                const missed = version !== null && (
+                    data.type === 'menu_version' || data.version !== version + 1
+                );
+                version = data.version;
+                if (missed || data.type === 'menu_reload') {
+                    scheduleReload();
+                } else if (data.type === 'menu_delta') {
+                    setCategories(prev => applyMenuDelta(prev, data));
+                }
+            };
+
+            ws.onclose = () => {
+                if (!closed) {
+                    reconnectTimer = setTimeout(connect, 2000);
+                }
+            };
+
+            ws.onerror = (error) => {
+                console.error('Menu WebSocket error:', error);
+            };
+        };
+
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(reconnectTimer);
+            clearTimeout(reloadTimer);
+            ws.close();
+        };
+    }, [setCategories]);
+};
@@ -1,47 +1,105 @@
-import { useState, useEffect } from 'react';
-import type { Order } from '../types';
+import { useState, useEffect, useRef } from 'react';
+import type { Order, OrderEvent } from '../types';
+import { ordersAPI } from '../services/api';
 
-export const useWebSocket = () => {
+const applyEvent = (orders: Order[], event: OrderEvent): Order[] => {
+    if (event.type === 'order_created') {
+        if (orders.some(order => order.id === event.order_id)) {
+            return orders;
+        }
+        return [event.changes as Order, ...orders];
+    }
+
+    if (event.type === 'order_deleted') {
+        return orders.filter(order => order.id !== event.order_id);
+    }
+
+    return orders.map(order =>
+        order.id === event.order_id ? { ...order, ...event.changes } : order
+    );
+};
+
+// query selecciona el tema: topic=kitchen | cashier | waiter&waiter_id=N | table&table_id=N&table_token=T
+export const useWebSocket = (query = '') => {
     const [orders, setOrders] = useState<Order[]>([]);
     const [isConnected, setIsConnected] = useState(false);
+    const lastSeq = useRef<number | null>(null);
 
     useEffect(() => {
-        const ws = new WebSocket('ws://localhost:8000/ws/orders/');
+        let ws: WebSocket;
+        let reconnectTimer: ReturnType<typeof setTimeout>;
+        let closed = false;
 
-        ws.onopen = () => {
-            setIsConnected(true);
-            console.log('WebSocket connected');
+        const handleEvent = (event: OrderEvent) => {
+            if (lastSeq.current !== null && event.seq <= lastSeq.current) {
+                return;
+            }
+            lastSeq.current = event.seq;
+            setOrders(prev => applyEvent(prev, event));
         };
 
-        ws.onmessage = (event) => {
-            const data = JSON.parse(event.data);
-
-            if (data.type === 'order_created') {
-                setOrders(prev => [data.order, ...prev]);
+        // Pedir los cambios perdidos desde la última secuencia conocida
+        const resync = async () => {
+            if (lastSeq.current === null) {
+                const response = await ordersAPI.getChanges(undefined, query);
+                lastSeq.current = response.data.last_seq;
+                return;
             }
-
-            if (data.type === 'order_updated') {
-                setOrders(prev =>
-                    prev.map(order =>
-                        order.id === data.order.id ? data.order : order
-                    )
-                );
+            let hasMore = true;
+            while (hasMore) {
+                const response = await ordersAPI.getChanges(lastSeq.current, query);
+                response.data.events.forEach(handleEvent);
+                lastSeq.current = response.data.last_seq;
+                hasMore = response.data.has_more;
             }
         };
 
-        ws.onclose = () => {
-            setIsConnected(false);
-            console.log('WebSocket disconnected');
-        };
+        const connect = () => {
+            // El navegador no manda cabeceras al abrir el socket: el JWT va en la query
+            const params = new URLSearchParams(query);
+            const token = localStorage.getItem('access_token');
+            if (token) {
+                params.set('token', token);
+            }
+            ws = new WebSocket(`ws://localhost:8000/ws/orders/?${params}`);
+
+            ws.onopen = () => {
+                setIsConnected(true);
+                console.log('WebSocket connected');
+                resync().catch(error => console.error('Error resyncing orders:', error));
+            };
 
-        ws.onerror = (error) => {
-            console.error('WebSocket error:', error);
+            ws.onmessage = (message) => {
+                const data = JSON.parse(message.data);
+                // Los cambios de un mismo lote (p. ej. cambios de estado masivos) llegan juntos
+                if (data.type === 'batch') {
+                    data.events.forEach(handleEvent);
+                } else {
+                    handleEvent(data);
+                }
+            };
+
+            ws.onclose = () => {
+                setIsConnected(false);
+                console.log('WebSocket disconnected');
+                if (!closed) {
+                    reconnectTimer = setTimeout(connect, 2000);
+                }
+            };
+
+            ws.onerror = (error) => {
+                console.error('WebSocket error:', error);
+            };
         };
 
+        connect();
+
         return () => {
+            closed = true;
+            clearTimeout(reconnectTimer);
             ws.close();
         };
-    }, []);
+    }, [query]);
 
     return { orders, isConnected, setOrders };
-};
\ No newline at end of file
+};
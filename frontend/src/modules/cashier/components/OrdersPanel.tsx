@@ -16,8 +16,7 @@ export const OrdersPanel: React.FC = () => {
     const loadOrders = async () => {
         try {
             setLoading(true);
-            const response = await ordersAPI.getOrders(statusFilter || undefined);
-            setOrders(response.data);
+            setOrders(await ordersAPI.getAllOrders(statusFilter || undefined));
         } catch (error) {
             console.error('Error loading orders:', error);
         } finally {
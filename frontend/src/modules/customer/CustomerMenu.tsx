@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
 import type { Category, MenuItem } from '../../types';
 import { menuAPI } from '../../services/api';
+import { useMenuUpdates } from '../../hooks/useMenuUpdates';
 import { CustomerHeader } from './components/CustomerHeader';
 import { MenuItemCard } from './components/MenuItemCard';
 import { MenuItemList } from './components/MenuItemList';
@@ -33,6 +34,9 @@ export const CustomerMenu: React.FC = () => {
     }
   };
 
+  // Disponibilidad y precios al momento, sin volver a descargar la carta
+  useMenuUpdates(setCategories, loadCategories);
+
   // Obtener todos los productos de todas las categorías
   const allMenuItems = categories.flatMap(category =>
     category.menu_items.map(item => ({
@@ -20,14 +20,22 @@ export const MenuItemCard: React.FC<MenuItemCardProps> = ({
     return (
         <Card className="hover:shadow-md transition-shadow cursor-pointer h-full flex flex-col">
             {item.image_url ? (
-                <img
-                    src={item.image_url}
-                    alt={item.name}
-                    className="w-full h-48 object-cover rounded-t-lg"
-                    onError={(e) => {
-                        (e.target as HTMLImageElement).src = 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgZmlsbD0iI2YzZjRmNiIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBkeT0iMC4zNWVtIiB0ZXh0LWFuY2hvcj0ibWlkZGxlIiBmb250LWZhbWlseT0ic2Fucy1zZXJpZiIgZm9udC1zaXplPSIxNCIgZmlsbD0iIzljYTNhYSI+SW1hZ2VuIG5vIGRpc3BvbmlibGU8L3RleHQ+PC9zdmc+';
-                    }}
-                />
+                <picture>
+                    {item.image_srcset?.webp && (
+                        <source type="image/webp" srcSet={item.image_srcset.webp} sizes="(min-width: 768px) 33vw, 100vw" />
+                    )}
+                    <img
+                        src={item.image_thumbnail || item.image_url}
+                        srcSet={item.image_srcset?.jpeg}
+                        sizes="(min-width: 768px) 33vw, 100vw"
+                        loading="lazy"
+                        alt={item.name}
+                        className="w-full h-48 object-cover rounded-t-lg"
+                        onError={(e) => {
+                            (e.target as HTMLImageElement).src = 'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iMjAwIiBoZWlnaHQ9IjIwMCIgZmlsbD0iI2YzZjRmNiIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBkeT0iMC4zNWVtIiB0ZXh0LWFuY2hvcj0ibWlkZGxlIiBmb250LWZhbWlseT0ic2Fucy1zZXJpZiIgZm9udC1zaXplPSIxNCIgZmlsbD0iIzljYTNhYSI+SW1hZ2VuIG5vIGRpc3BvbmlibGU8L3RleHQ+PC9zdmc+';
+                        }}
+                    />
+                </picture>
             ) : (
                 <div className="w-full h-48 bg-gray-200 flex items-center justify-center rounded-t-lg">
                     <span className="text-gray-400 text-sm">Imagen no disponible</span>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import type { Table, Order } from '../../types';
+import type { FloorTable, Order } from '../../types';
 import { ordersAPI } from '../../services/api';
 import { useOrderStore } from '../../stores/orderStore';
 import { useAuthStore } from '../../stores/authStore';
@@ -10,7 +10,7 @@ import { OrderCart } from './components/OrderCart';
 import { LoadingSpinner } from '../../components/ui/LoadingSpinner';
 
 export const WaiterDashboard: React.FC = () => {
-    const [tables, setTables] = useState<Table[]>([]);
+    const [tables, setTables] = useState<FloorTable[]>([]);
     const [activeOrders, setActiveOrders] = useState<Order[]>([]);
     const [showCart, setShowCart] = useState(false);
     const [loading, setLoading] = useState(true);
@@ -30,12 +30,12 @@ export const WaiterDashboard: React.FC = () => {
     const loadInitialData = async () => {
         try {
             setLoading(true);
-            const [tablesResponse, ordersResponse] = await Promise.all([
-                ordersAPI.getTables(),
-                ordersAPI.getOrders('pending'),
+            const [tablesResponse, orders] = await Promise.all([
+                ordersAPI.getFloor(),
+                ordersAPI.getAllOrders('pending'),
             ]);
             setTables(tablesResponse.data);
-            setActiveOrders(ordersResponse.data);
+            setActiveOrders(orders);
         } catch (error) {
             console.error('Error loading initial data:', error);
         } finally {
@@ -43,7 +43,13 @@ export const WaiterDashboard: React.FC = () => {
         }
     };
 
-    const handleTableSelect = (table: Table) => {
+    // Ocupación, órdenes abiertas y total de cada mesa, calculados en el servidor
+    const reloadFloor = async () => {
+        const floorResponse = await ordersAPI.getFloor();
+        setTables(floorResponse.data);
+    };
+
+    const handleTableSelect = (table: FloorTable) => {
         setCurrentTable(table);
         setShowCart(true);
     };
@@ -54,9 +60,12 @@ export const WaiterDashboard: React.FC = () => {
             addOrder(response.data);
             clearCart();
             setShowCart(false);
-            // Recargar órdenes activas
-            const ordersResponse = await ordersAPI.getOrders('pending');
-            setActiveOrders(ordersResponse.data);
+            // Recargar órdenes activas y el salón
+            const [orders] = await Promise.all([
+                ordersAPI.getAllOrders('pending'),
+                reloadFloor(),
+            ]);
+            setActiveOrders(orders);
         } catch (error) {
             console.error('Error creating order:', error);
             throw error;
@@ -66,9 +75,12 @@ export const WaiterDashboard: React.FC = () => {
     const handleUpdateOrderStatus = async (orderId: number, status: string) => {
         try {
             await ordersAPI.updateOrderStatus(orderId, status);
-            // Recargar órdenes activas
-            const ordersResponse = await ordersAPI.getOrders('pending');
-            setActiveOrders(ordersResponse.data);
+            // Recargar órdenes activas y el salón
+            const [orders] = await Promise.all([
+                ordersAPI.getAllOrders('pending'),
+                reloadFloor(),
+            ]);
+            setActiveOrders(orders);
         } catch (error) {
             console.error('Error updating order status:', error);
         }
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import type { Category, MenuItem } from '../../../types';
 import { menuAPI } from '../../../services/api';
+import { useMenuUpdates } from '../../../hooks/useMenuUpdates';
 import { useOrderStore } from '../../../stores/orderStore';
 import { Modal } from '../../../components/ui/Modal';
 import { Button } from '../../../components/ui/Button';
@@ -44,6 +45,13 @@ export const MenuModal: React.FC<MenuModalProps> = ({ onClose }) => {
         }
     };
 
+    useMenuUpdates(setCategories, loadCategories);
+
+    // La categoría seleccionada es una copia: seguir a la versión parcheada
+    useEffect(() => {
+        setSelectedCategory(prev => prev && (categories.find(category => category.id === prev.id) ?? prev));
+    }, [categories]);
+
     const handleAddToCart = () => {
         if (!selectedItem) return;
 
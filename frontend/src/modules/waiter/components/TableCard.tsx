@@ -1,9 +1,9 @@
 import React from 'react';
-import type { Table } from '../../../types';
+import type { FloorTable } from '../../../types';
 
 interface TableCardProps {
-    table: Table;
-    onSelect: (table: Table) => void;
+    table: FloorTable;
+    onSelect: (table: FloorTable) => void;
 }
 
 export const TableCard: React.FC<TableCardProps> = ({ table, onSelect }) => {
@@ -48,10 +48,17 @@ export const TableCard: React.FC<TableCardProps> = ({ table, onSelect }) => {
                 </div>
 
                 {/* Capacidad */}
-                <div className="text-xs text-gray-600 mb-4">
+                <div className="text-xs text-gray-600 mb-1">
                     💺 Capacidad: {table.capacity} personas
                 </div>
 
+                {/* Órdenes abiertas */}
+                <div className="text-xs text-gray-600 mb-4">
+                    {table.open_orders > 0
+                        ? `🧾 ${table.open_orders} abiertas · $${table.running_total} · ${table.minutes_seated} min`
+                        : '\u00a0'}
+                </div>
+
                 {/* Botón de Acción */}
                 <button
                     onClick={() => onSelect(table)}
@@ -1,10 +1,10 @@
 import React from 'react';
-import type { Table } from '../../../types';
+import type { FloorTable } from '../../../types';
 import { TableCard } from './TableCard';
 
 interface TableGridProps {
-    tables: Table[];
-    onTableSelect: (table: Table) => void;
+    tables: FloorTable[];
+    onTableSelect: (table: FloorTable) => void;
 }
 
 export const TableGrid: React.FC<TableGridProps> = ({ tables, onTableSelect }) => {
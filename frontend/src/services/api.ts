@@ -5,6 +5,8 @@ const API_BASE_URL = 'http://localhost:8000/api';
 
 export const api = axios.create({
     baseURL: API_BASE_URL,
+    // Cookie primary_pin: leer de la principal justo después de escribir
+    withCredentials: true,
 });
 
 // Interceptor para agregar token a las requests
@@ -87,14 +89,34 @@ export const menuAPI = {
 export const ordersAPI = {
     getTables: () => api.get('/orders/tables/'),
     getTable: (id: number) => api.get(`/orders/tables/${id}/`),
+    getFloor: () => api.get('/orders/tables/floor/'),
     updateTable: (id: number, data: any) => api.put(`/orders/tables/${id}/`, data),
 
     getOrders: (status?: string) =>
         api.get('/orders/orders/', { params: { status } }),
+    // Todas las páginas: sigue el cursor next hasta agotarlo
+    getAllOrders: async (status?: string) => {
+        const orders: any[] = [];
+        let response = await api.get('/orders/orders/', { params: { status, page_size: 200 } });
+        orders.push(...response.data.results);
+        while (response.data.next) {
+            response = await api.get(response.data.next);
+            orders.push(...response.data.results);
+        }
+        return orders;
+    },
     getOrder: (id: number) => api.get(`/orders/orders/${id}/`),
     createOrder: (data: any) => api.post('/orders/orders/', data),
-    updateOrderStatus: (id: number, status: string) =>
-        api.post(`/orders/orders/${id}/update_status/`, { status }),
+    // Con version, el servidor responde 409 si otro usuario cambió la orden antes
+    updateOrderStatus: (id: number, status: string, version?: number) =>
+        api.post(`/orders/orders/${id}/update_status/`, { status, version }),
+    bulkUpdateStatus: (ids: number[], status: string) =>
+        api.post('/orders/orders/bulk_status/', { ids, status }),
+    // query: la misma suscripción que el WebSocket (topic, waiter_id, table_id)
+    getChanges: (since?: number, query = '') =>
+        api.get(`/orders/orders/changes/?${query}`, { params: { since } }),
+    getKitchenQueue: (status?: string) =>
+        api.get('/orders/orders/kitchen/', { params: { status } }),
 };
 
 export const usersAPI = {
@@ -39,6 +39,8 @@ export interface MenuItem {
     image: string;
     image_url: string;
     image_thumbnail?: string;
+    // Listas srcset por formato ("url 200w, url 400w, ...")
+    image_srcset?: { webp?: string; jpeg?: string };
     preparation_time: number;
     is_available: boolean;
     is_visible: boolean;
@@ -70,6 +72,14 @@ export interface Table {
     created_at: string;
 }
 
+// Mesa con la ocupación derivada de sus órdenes abiertas (GET /orders/tables/floor/)
+export interface FloorTable extends Table {
+    open_orders: number;
+    running_total: string;
+    seated_at: string | null;
+    minutes_seated: number | null;
+}
+
 export interface Order {
     id: number;
     table: number;
@@ -82,6 +92,7 @@ export interface Order {
     items: OrderItem[];
     created_at: string;
     updated_at: string;
+    version: number;
 }
 
 export interface OrderItem {
@@ -95,6 +106,13 @@ export interface OrderItem {
     customizations: CustomizationChoice[];
 }
 
+export interface OrderEvent {
+    type: 'order_created' | 'order_updated' | 'order_deleted';
+    seq: number;
+    order_id: number;
+    changes: Partial<Order>;
+}
+
 export type OrderStatus =
     | 'pending'
     | 'confirmed'